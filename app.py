@@ -1,22 +1,57 @@
 import os
+import hashlib
+import secrets
+import threading
 import time
-import random
-from flask import Flask, request, jsonify, send_from_directory, redirect, url_for, session, render_template_string
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+import click
+from flask import Flask, request, jsonify, redirect, url_for, session, render_template, render_template_string
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from models import init_db, verify_user, get_user_by_id, save_image_metadata, get_all_images
+from models import get_images_page, backfill_image_metadata
 from models import create_community_image, get_all_community_images, get_community_image_by_id
+from models import get_community_images_page, get_text_posts_page
+from models import TEXT_POST_SUMMARY_FIELDS, COMMUNITY_IMAGE_SUMMARY_FIELDS
 from models import update_community_image, delete_community_image
-from models import create_text_post, get_all_text_posts, get_text_post_by_id
+from models import create_text_post, get_all_text_posts, get_text_post_by_id, get_text_post_by_slug
 from models import update_text_post, delete_text_post
+from models import get_pool_stats, get_read_pool_stats, get_write_queue_stats, search_content
+from models import get_content_version, get_blob_stats
+from models import get_blobs_without_derivatives, get_blobs_without_metadata, record_file_metadata
+from models import create_upload_session, get_upload_session, advance_upload_session
+from models import delete_upload_session, delete_stale_upload_sessions
+from models import get_job_stats, get_gc_state, has_queued_job
+from models import FILE_DELETION_JOB, queue_file_deletions, process_file_deletions
+from models import get_file_deletion_backlog
+from response_cache import ResponseCache
+from storage import BlobStore, CHUNK_SIZE
+import derivatives
+import image_metadata
+import jobs
+import upload_gc
+from static_files import send_static_file, resolve, StaticFileCache, OFFLOAD_MODES
+import compression
+import pages
+import site_export
+import writing_import
+from streaming_upload import UploadRequest, UploadLimits, UploadRejected, signature_error
+from streaming_upload import SNIFF_BYTES
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: rely on the offset check alone
+    fcntl = None
 
 # Configure app to serve static files from htdocs
 app = Flask(__name__, static_folder='htdocs')
+app.request_class = UploadRequest
 
 # Secret key configuration
 SECRET_KEY = os.environ.get('SECRET_KEY')
 if not SECRET_KEY:
     # Generate a random secret key for development
-    import secrets
     SECRET_KEY = secrets.token_hex(32)
     print("WARNING: Using auto-generated SECRET_KEY. Set SECRET_KEY environment variable in production!")
 
@@ -31,10 +66,50 @@ login_manager.login_view = 'login'
 def load_user(user_id):
     return get_user_by_id(int(user_id))
 
+@app.before_request
+def start_job_worker():
+    # Started per worker process after gunicorn forks; a no-op once running
+    jobs.ensure_worker()
+
 # Configuration
 UPLOAD_FOLDER = os.path.join(app.static_folder, 'static', 'uploads')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB in bytes
+MAX_ALBUM_FILES = 9
+MULTIPART_OVERHEAD = 1024 * 1024  # Allowance for form fields and part headers
+ALBUM_IO_WORKERS = 4  # Threads per worker hashing and writing album files
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Largest PATCH body a resumable upload accepts
+UPLOAD_SESSION_TTL = 24 * 60 * 60  # Seconds an idle resumable upload is kept
+FILE_DELETION_BATCH_SIZE = 100  # Outbox entries released per write transaction
+
+# How files under htdocs are sent when a request reaches Flask: sendfile,
+# x-accel (nginx X-Accel-Redirect) or x-sendfile (see static_files.py)
+HTDOCS_FOLDER = os.path.join(app.root_path, 'htdocs')
+app.config['STATIC_OFFLOAD'] = os.environ.get('TINYRISKS_STATIC_OFFLOAD', 'sendfile')
+app.config['X_ACCEL_PREFIX'] = '/_htdocs/'
+# Static export of the public site (see site_export.py); unset disables the
+# on-write rebuild
+app.config['EXPORT_FOLDER'] = os.environ.get('TINYRISKS_EXPORT_FOLDER') or None
+if app.config['STATIC_OFFLOAD'] not in OFFLOAD_MODES:
+    raise ValueError(f"TINYRISKS_STATIC_OFFLOAD must be one of {', '.join(OFFLOAD_MODES)}")
+
+# Files under htdocs served by the app itself (sendfile mode and error pages)
+static_cache = StaticFileCache(max_entries=512, max_bytes=32 * 1024 * 1024)
+
+# Rendered per-item HTML for the server-rendered pages, keyed by item digest
+fragment_cache = ResponseCache(max_entries=2048, max_bytes=8 * 1024 * 1024)
+
+# gzip/brotli bodies of JSON responses, keyed by ETag (or body hash)
+compressed_cache = compression.CompressedBodyCache(max_entries=256, max_bytes=16 * 1024 * 1024)
+app.config['COMPRESS_MIN_SIZE'] = compression.MIN_SIZE
+
+# Largest body any endpoint accepts: a full album sent in one multipart request
+app.config['MAX_CONTENT_LENGTH'] = MAX_ALBUM_FILES * MAX_FILE_SIZE + MULTIPART_OVERHEAD
+
+# Serialized JSON bodies of public read endpoints, invalidated by content generation
+response_cache = ResponseCache(max_entries=256, max_bytes=32 * 1024 * 1024)
 
 # Ensure upload directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -43,18 +118,393 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def get_blob_store():
+    """Content-addressed store rooted at the current UPLOAD_FOLDER"""
+    return BlobStore(UPLOAD_FOLDER)
+
+def store_upload(store, file):
+    """Save an uploaded file under its content hash and return the stored name"""
+    ext = file.filename.rsplit('.', 1)[1].lower()
+    filename, created = store.save(file.stream, ext)
+    if not created:
+        app.logger.info(f"Upload {file.filename} matches existing blob {filename}")
+    return filename
+
+def streamed_upload(max_files, invalid_type_error):
+    """Enforce upload limits while the multipart body is still being received.
+
+    Caps the request body at max_files * MAX_FILE_SIZE (plus overhead) and
+    parses the form before the view runs, with every file checked against
+    MAX_FILE_SIZE, the file count, allowed_file and its magic bytes as it
+    streams in. The first violation aborts the parse and is answered with
+    a JSON error. invalid_type_error is the message for a disallowed file
+    type ({filename} is substituted); None discards such files unread.
+    Apply below @login_required so anonymous bodies are never parsed.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request.max_content_length = max_files * MAX_FILE_SIZE + MULTIPART_OVERHEAD
+            request.upload_limits = UploadLimits(MAX_FILE_SIZE, max_files, allowed_file, invalid_type_error)
+            try:
+                request.form
+            except UploadRejected as e:
+                return jsonify({'error': e.description}), 400
+            except RequestEntityTooLarge:
+                limit_mb = request.max_content_length // (1024 * 1024)
+                return jsonify({'error': f'Request body exceeds {limit_mb}MB limit'}), 413
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+_album_io_lock = threading.Lock()
+_album_io_pool = None
+_album_io_pid = None
+
+def get_album_io_pool():
+    """Bounded thread pool for album file I/O, created lazily in each worker process"""
+    global _album_io_pool, _album_io_pid
+    with _album_io_lock:
+        if _album_io_pool is None or _album_io_pid != os.getpid():
+            _album_io_pool = ThreadPoolExecutor(max_workers=ALBUM_IO_WORKERS,
+                                                thread_name_prefix='album-io')
+            _album_io_pid = os.getpid()
+        return _album_io_pool
+
+def process_concurrently(func, items, saved):
+    """Run func over items on the album I/O pool, appending results to saved in order.
+
+    Every item is waited for even after one fails, so saved ends up listing
+    everything that was written (for the caller's cleanup) before the first
+    error is re-raised. hashlib and file I/O release the GIL, so the files
+    really are hashed and written in parallel.
+    """
+    if len(items) <= 1:
+        saved.extend(func(item) for item in items)
+        return
+    
+    futures = [get_album_io_pool().submit(func, item) for item in items]
+    error = None
+    for future in futures:
+        try:
+            saved.append(future.result())
+        except Exception as e:
+            error = error or e
+    if error:
+        raise error
+
+def store_album_files(store, files, saved, skip_invalid=False):
+    """Store an album's uploads concurrently, appending names to saved in order.
+
+    Size and content were checked by streamed_upload as the body arrived.
+    Returns an error message (nothing is stored) or None. Files with an
+    unsupported type are an error unless skip_invalid is set. If writing any
+    file fails the exception propagates, with every file that did get
+    written already in saved so the caller's cleanup releases it.
+    """
+    accepted = []
+    for file in files:
+        if file and file.filename and allowed_file(file.filename):
+            accepted.append(file)
+        elif file and file.filename and not skip_invalid:
+            return f'Invalid file type: {file.filename}'
+    
+    process_concurrently(lambda file: store_upload(store, file), accepted, saved)
+    return None
+
+def finalize_uploads(store, upload_ids, saved):
+    """Move completed resumable uploads into the store, appending names to saved.
+
+    Returns an error message (nothing is stored) or None. Each session is
+    consumed: once its file is stored the session is deleted.
+    """
+    uploads = []
+    for upload_id in upload_ids:
+        upload = get_own_upload_session(upload_id)
+        if upload is None:
+            return f'Upload {upload_id} not found'
+        if upload['received'] != upload['length']:
+            return f"Upload {upload['filename']} is incomplete"
+        uploads.append(upload)
+    
+    def adopt(upload):
+        ext = upload['filename'].rsplit('.', 1)[1].lower()
+        part_path = upload_part_path(store, upload['id'])
+        os.truncate(part_path, upload['length'])
+        filename, created = store.adopt(part_path, ext)
+        return filename
+    
+    try:
+        process_concurrently(adopt, uploads, saved)
+    finally:
+        for upload in uploads:
+            if not os.path.exists(upload_part_path(store, upload['id'])):
+                delete_upload_session(upload['id'])
+    return None
+
+def analyze_uploads(store, filenames):
+    """Intrinsic metadata of stored uploads, keyed by filename.
+
+    Files are analyzed concurrently on the album I/O pool; one that cannot be
+    analyzed is logged and left out rather than failing the upload.
+    """
+    def analyze(filename):
+        try:
+            return filename, image_metadata.analyze(store.path(filename))
+        except Exception as e:
+            app.logger.warning(f"Could not analyze {filename}: {e}")
+            return filename, None
+    
+    results = []
+    process_concurrently(analyze, list(dict.fromkeys(filenames)), results)
+    return {filename: metadata for filename, metadata in results if metadata}
+
+@jobs.handler(FILE_DELETION_JOB)
+def file_deletions_job(payload):
+    """Drain the file deletion outbox, one batched transaction at a time"""
+    remove = BlobStore(payload['root']).remove
+    while process_file_deletions(remove, batch_size=FILE_DELETION_BATCH_SIZE):
+        pass
+
+@jobs.handler(site_export.JOB_KIND)
+def site_export_job(payload):
+    """Rebuild the parts of the static export whose content changed"""
+    report = site_export.export_site(app, payload['output'], HTDOCS_FOLDER)
+    app.logger.info(f"Site export: {report['written']} written, {report['removed']} removed")
+
+# Writes that change what the static export contains
+EXPORT_TRIGGERS = {
+    'upload_file',
+    'create_community_image_api', 'update_community_image_api', 'delete_community_image_api',
+    'create_text_post_api', 'update_text_post_api', 'delete_text_post_api',
+}
+# Seconds to wait before exporting, so a burst of writes is exported in one run
+EXPORT_DELAY = 2
+
+def queue_site_export():
+    """Queue an incremental site export unless one is already waiting or export is disabled"""
+    if app.config['EXPORT_FOLDER'] and not has_queued_job(site_export.JOB_KIND):
+        jobs.enqueue(site_export.JOB_KIND, [{'output': app.config['EXPORT_FOLDER']}],
+                     delay=EXPORT_DELAY)
+
+@app.after_request
+def schedule_site_export(response):
+    """Queue an incremental site export after a successful content write"""
+    if request.endpoint in EXPORT_TRIGGERS and response.status_code < 400:
+        try:
+            queue_site_export()
+        except Exception as e:
+            app.logger.warning(f"Failed to queue site export: {e}")
+    return response
+
+@jobs.handler(derivatives.JOB_KIND)
+def derivatives_job(payload):
+    """Generate one image's variants, then re-export so exported pages get their srcsets"""
+    if derivatives.process_image(BlobStore(payload['root']), payload['source']):
+        queue_site_export()
+
+def release_uploads(store, filenames):
+    """Queue deletion of uploads no longer referenced by any row, logging instead of failing"""
+    if not filenames:
+        return
+    try:
+        queue_file_deletions(filenames, store.root)
+        jobs.wake()
+    except Exception as e:
+        app.logger.warning(f"Failed to queue release of uploads {filenames}: {e}")
+
+def cached_json_response(view):
+    """Serve a GET endpoint with conditional-request support and response_cache.
+
+    The key covers the path, query string and whether the caller is logged
+    in (admins see drafts). Both the strong ETag and the cache entry derive
+    from the content generation, so If-None-Match is answered with 304
+    before any row is read, and 200 bodies are only reused while the
+    generation they were rendered at is still current.
+
+    No Last-Modified is sent and If-Modified-Since is ignored: the last write
+    time has one-second resolution, so a second write in the same second
+    would be answered with a wrong 304.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        generation, _ = get_content_version()
+        key = (
+            request.path,
+            tuple(sorted(request.args.items(multi=True))),
+            current_user.is_authenticated,
+        )
+        etag = hashlib.sha1(repr((key, generation)).encode('utf-8')).hexdigest()
+        
+        # Weak comparison: compressed bodies carry the same ETag marked weak
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            cache_status = 'REVALIDATED'
+        else:
+            body = response_cache.get(key, generation)
+            if body is not None:
+                response = app.response_class(body, mimetype='application/json')
+                cache_status = 'HIT'
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.mimetype != 'application/json':
+                    # Errors are neither cached nor given validators
+                    response.headers['X-Cache'] = 'MISS'
+                    return response
+                response_cache.put(key, generation, response.get_data())
+                cache_status = 'MISS'
+        
+        response.set_etag(etag)
+        # Let browsers keep the body but revalidate it on every use
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Cookie')
+        response.headers['X-Cache'] = cache_status
+        return response
+    return wrapper
+
+@app.after_request
+def compress_json_response(response):
+    """gzip/brotli-encode JSON bodies of COMPRESS_MIN_SIZE or more for clients that accept it"""
+    if (response.status_code != 200 or response.mimetype != 'application/json'
+            or response.direct_passthrough or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.content_length is None or response.content_length < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = compression.negotiate(request.accept_encodings, compression.available_encodings())
+    if encoding is None:
+        return response
+    
+    etag, _ = response.get_etag()
+    response.set_data(compressed_cache.compress(response.get_data(), encoding, etag=etag))
+    response.headers['Content-Encoding'] = encoding
+    if etag is not None:
+        # Same resource, different bytes: keep the ETag but only as a weak validator
+        response.set_etag(etag, weak=True)
+    return response
+
+def get_pagination_args():
+    """Read limit/cursor query parameters.
+
+    Returns None when the client asked for neither (unpaginated legacy
+    response), otherwise (limit, cursor). Raises ValueError on bad input.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        return None
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit, cursor or None
+
+def get_field_selection(summary_fields):
+    """Read the fields/view query parameters.
+
+    fields=a,b,c picks columns explicitly; view=summary picks the endpoint's
+    summary projection; neither (or view=full) returns every column (None).
+    Raises ValueError on an unknown view; field names are validated by models.
+    """
+    fields = request.args.get('fields')
+    if fields:
+        return [field.strip() for field in fields.split(',') if field.strip()]
+    view = request.args.get('view', 'full')
+    if view == 'summary':
+        return list(summary_fields)
+    if view != 'full':
+        raise ValueError('view must be "full" or "summary"')
+    return None
+
+def send_htdocs(path, status=200):
+    """Send a file from htdocs using the configured STATIC_OFFLOAD mode"""
+    return send_static_file(HTDOCS_FOLDER, path, mode=app.config['STATIC_OFFLOAD'],
+                            accel_prefix=app.config['X_ACCEL_PREFIX'], status=status,
+                            cache=static_cache)
+
+def render_htdocs(path, **regions):
+    """Serve an htdocs page with its ssr regions filled in by the given callables.
+
+    A region whose callable fails is left as the static markup, so the page
+    script fetches that content itself.
+    """
+    shell = static_cache.get(resolve(HTDOCS_FOLDER, path)).body.decode('utf-8')
+    rendered = {}
+    for name, render in regions.items():
+        try:
+            rendered[name] = render()
+        except Exception as e:
+            app.logger.warning(f"Failed to render {name} region of {path}: {e}")
+    
+    response = app.response_class(pages.fill_regions(shell, rendered), mimetype='text/html')
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/')
 def index():
-    return send_from_directory('htdocs', 'index.html')
+    return render_htdocs(
+        'index.html',
+        community=lambda: pages.render_images(
+            [image_listing_entry(image) for image in get_all_images()], fragment_cache),
+        writing=lambda: pages.render_posts(
+            get_text_posts_page(pages.INDEX_POST_COUNT, published_only=True,
+                                fields=TEXT_POST_SUMMARY_FIELDS)[0], fragment_cache),
+    )
+
+@app.route('/writing')
+def writing_index():
+    return send_htdocs('writing.html')
+
+@app.route('/writing/<slug>')
+def writing_article(slug):
+    """Render a text post by slug, falling back to a hand-written htdocs/writing page"""
+    # Links to the hand-written pages predate the slug routes and may carry .html
+    slug = slug.removesuffix('.html')
+    # Any write changes the generation, so a cached page is never stale; the
+    # key separates admins, who may preview unpublished posts
+    generation, _ = get_content_version()
+    key = ('article', slug, current_user.is_authenticated)
+    body = fragment_cache.get(key, generation)
+    if body is None:
+        post = get_text_post_by_slug(slug)
+        if post is None or not (post['published'] or current_user.is_authenticated):
+            return send_htdocs(f'writing/{slug}.html')
+        recent, _ = get_text_posts_page(pages.RELATED_POST_COUNT + 1, published_only=True,
+                                        fields=TEXT_POST_SUMMARY_FIELDS)
+        related = [other for other in recent if other['id'] != post['id']][:pages.RELATED_POST_COUNT]
+        body = render_template('article.html', post=post, related=related,
+                               paragraphs=pages.paragraphs(post['content']))
+        fragment_cache.put(key, generation, body)
+
+    response = app.response_class(body, mimetype='text/html')
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+@app.route('/gallery')
+@app.route('/gallery.html')
+def gallery():
+    return render_htdocs(
+        'gallery.html',
+        gallery=lambda: pages.render_albums(
+            get_all_community_images(fields=COMMUNITY_IMAGE_SUMMARY_FIELDS), fragment_cache),
+    )
 
 @app.route('/login')
 def login():
-    return send_from_directory('htdocs', 'login.html')
+    return send_htdocs('login.html')
 
 @app.route('/admin')
 @login_required
 def admin_dashboard():
-    return send_from_directory('htdocs', 'admin.html')
+    return send_htdocs('admin.html')
 
 @app.route('/api/login', methods=['POST'])
 def api_login():
@@ -81,66 +531,393 @@ def api_logout():
 
 @app.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory('htdocs', path)
+    return send_htdocs(path)
 
 @app.route('/api/upload', methods=['POST'])
 @login_required
+@streamed_upload(max_files=1, invalid_type_error='Invalid file type')
 def upload_file():
-    if 'image' not in request.files:
+    # The image arrives either in the request body or as a finished resumable upload
+    upload_id = request.form.get('upload')
+    if 'image' not in request.files and not upload_id:
         return jsonify({'error': 'No file part'}), 400
     
-    file = request.files['image']
+    file = request.files.get('image')
     description = request.form.get('description', '')
     
     # Validate description length (max 4000 characters)
     if len(description) > 4000:
         return jsonify({'error': 'Description too long (max 4000 characters)'}), 400
     
-    if file.filename == '':
+    store = get_blob_store()
+    if upload_id:
+        saved = []
+        error = finalize_uploads(store, [upload_id], saved)
+        if error:
+            return jsonify({'error': error}), 400
+        filename = saved[0]
+    elif file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
-        
-    if file and allowed_file(file.filename):
-        # Generate unique filename
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        unique_name = f"img-{int(time.time())}-{random.randint(1000, 9999)}.{ext}"
-        
-        file.save(os.path.join(UPLOAD_FOLDER, unique_name))
-        
+    elif allowed_file(file.filename):
+        filename = store_upload(store, file)
+    else:
+        filename = None
+    
+    if filename:
         # Save metadata to database
-        save_image_metadata(unique_name, description)
+        try:
+            save_image_metadata(filename, description, require_files=store.require,
+                                file_metadata=analyze_uploads(store, [filename]))
+        except Exception as e:
+            release_uploads(store, [filename])
+            return jsonify({'error': str(e)}), 500
+        derivatives.schedule(store, [filename])
         
         return jsonify({
             'success': True, 
-            'file': unique_name,
-            'url': f'/static/uploads/{unique_name}'
+            'file': filename,
+            'url': f'/static/uploads/{filename}'
         })
     
     return jsonify({'error': 'Invalid file type'}), 400
 
+def image_listing_entry(image):
+    """Public JSON shape of an uploaded image"""
+    return {
+        'id': image['id'],
+        'filename': image['filename'],
+        'description': image['description'],
+        'url': f"/static/uploads/{image['filename']}",
+        'time': image['time'],
+        'srcset': image['srcset'],
+        'metadata': image['metadata']
+    }
+
 @app.route('/api/images', methods=['GET'])
+@cached_json_response
 def list_images():
-    images = []
+    """List uploaded images, newest first, or one page of them when limit/cursor is given"""
+    try:
+        pagination = get_pagination_args()
+        if pagination is None:
+            return jsonify([image_listing_entry(image) for image in get_all_images()])
+        images, next_cursor = get_images_page(*pagination)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'items': [image_listing_entry(image) for image in images],
+        'next_cursor': next_cursor
+    })
+
+@app.cli.command('reconcile-images')
+def reconcile_images_command():
+    """Backfill images rows for uploads already on disk."""
+    files = []
     if os.path.exists(UPLOAD_FOLDER):
-        for filename in os.listdir(UPLOAD_FOLDER):
-            if allowed_file(filename):
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                images.append({
-                    'url': f'/static/uploads/{filename}',
-                    'time': os.path.getmtime(filepath)
-                })
+        for filename, mtime in get_blob_store().iter_files():
+            # Variants not recorded yet (e.g. a job interrupted before it
+            # committed) are still not uploads of their own
+            if allowed_file(filename) and not derivatives.is_derivative_name(filename):
+                files.append((filename, mtime))
+    
+    added = backfill_image_metadata(files)
+    for filename in added:
+        print(f"Added {filename}")
+    print(f"Reconciled {len(files)} files on disk, {len(added)} new rows")
+
+@app.cli.command('generate-derivatives')
+def generate_derivatives_command():
+    """Create resized variants for uploads that have none yet."""
+    if not derivatives.available_formats():
+        print("Pillow with WebP/AVIF support is not installed; nothing to do")
+        return
+    store = get_blob_store()
+    for filename in get_blobs_without_derivatives():
+        if not allowed_file(filename) or not store.exists(filename):
+            continue
+        try:
+            created = derivatives.process_image(store, filename)
+        except Exception as e:
+            print(f"Failed {filename}: {e}")
+            continue
+        print(f"{filename}: {len(created)} variants")
+    queue_site_export()
+
+@app.cli.command('run-jobs')
+@click.option('--once', is_flag=True, help='Run the jobs that are due now, then exit.')
+def run_jobs_command(once):
+    """Run background jobs in this process (for TINYRISKS_JOB_WORKER=external)."""
+    if once:
+        print(f"Ran {jobs.run_pending()} jobs")
+        return
+    print("Running jobs; press Ctrl+C to stop")
+    worker = jobs.Worker()
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(1)
+    except KeyboardInterrupt:
+        worker.stop()
+        worker.join()
+
+@app.cli.command('gc-uploads')
+@click.option('--dry-run', is_flag=True, help='List what would be reclaimed without deleting anything.')
+@click.option('--batch-size', default=upload_gc.BATCH_SIZE, show_default=True,
+              help='Files examined per batch.')
+@click.option('--grace', default=upload_gc.GRACE_PERIOD, show_default=True,
+              help='Seconds a new file is protected from collection.')
+@click.option('--background', is_flag=True, help='Queue the pass as background jobs and exit.')
+def gc_uploads_command(dry_run, batch_size, grace, background):
+    """Delete uploads that no row references, resuming from the last run's position."""
+    store = get_blob_store()
+    if dry_run:
+        report = upload_gc.dry_run(store, grace_period=grace, batch_size=batch_size)
+        for filename, size in report['orphans']:
+            print(f"Would remove {filename} ({size} bytes)")
+        print(f"Scanned {report['scanned']} files: {len(report['orphans'])} orphans, "
+              f"{report['bytes']} bytes reclaimable")
+        return
+    if background:
+        upload_gc.schedule(store, batch_size=batch_size, grace_period=grace)
+        print("Queued garbage collection")
+        return
+    
+    scanned = reclaimed = reclaimed_bytes = 0
+    while True:
+        report = upload_gc.collect_batch(store, batch_size=batch_size, grace_period=grace)
+        scanned += report['scanned']
+        reclaimed += report['files_reclaimed']
+        reclaimed_bytes += report['bytes_reclaimed']
+        if report['pass_finished']:
+            break
+        # Leave the writer free for requests between batches
+        time.sleep(upload_gc.BATCH_DELAY)
+    print(f"Scanned {scanned} files, reclaimed {reclaimed} ({reclaimed_bytes} bytes)")
+
+@app.cli.command('compress-static')
+@click.option('--min-size', default=compression.MIN_SIZE, show_default=True,
+              help='Smallest file, in bytes, worth compressing.')
+def compress_static_command(min_size):
+    """Write .gz (and .br, with brotli installed) siblings for compressible files in htdocs."""
+    report = compression.precompress_tree(HTDOCS_FOLDER, min_size=min_size, exclude=[UPLOAD_FOLDER])
+    print(f"Wrote {report['written']} variants ({report['original_bytes']} -> "
+          f"{report['compressed_bytes']} bytes), {report['fresh']} up to date, "
+          f"{report['removed']} removed")
+    if compression.brotli is None:
+        print("brotli is not installed; only gzip variants were written")
+
+@app.cli.command('export-site')
+@click.option('--output', default=None,
+              help='Directory to write to (default: TINYRISKS_EXPORT_FOLDER).')
+@click.option('--full', is_flag=True, help='Rebuild every file, not only those whose content changed.')
+def export_site_command(output, full):
+    """Write the public pages and JSON to a directory nginx can serve directly."""
+    output = output or app.config['EXPORT_FOLDER']
+    if not output:
+        raise click.UsageError('Pass --output or set TINYRISKS_EXPORT_FOLDER')
+    report = site_export.export_site(app, output, HTDOCS_FOLDER, full=full)
+    print(f"Exported to {output}: {report['written']} written, {report['unchanged']} unchanged, "
+          f"{report['removed']} removed, {report['failed']} failed")
+
+@app.cli.command('import-writing')
+@click.option('--draft', is_flag=True, help='Import the posts unpublished.')
+@click.option('--dry-run', is_flag=True, help='Parse the pages and list what would be imported.')
+def import_writing_command(draft, dry_run):
+    """Import the hand-written htdocs/writing pages as text posts served at /writing/<slug>."""
+    imported, skipped, failed = writing_import.import_directory(
+        os.path.join(HTDOCS_FOLDER, 'writing'), published=not draft, dry_run=dry_run)
+    for slug, title in imported:
+        print(f"{'Would import' if dry_run else 'Imported'} {slug}: {title}")
+    for slug, error in failed:
+        print(f"Failed {slug}: {error}")
+    print(f"{len(imported)} imported, {len(skipped)} already present, {len(failed)} failed")
+
+@app.cli.command('analyze-images')
+def analyze_images_command():
+    """Record dimensions, size and placeholders for uploads stored before analysis existed."""
+    store = get_blob_store()
+    filenames = [filename for filename in get_blobs_without_metadata()
+                 if allowed_file(filename) and store.exists(filename)]
+    file_metadata = analyze_uploads(store, filenames)
+    record_file_metadata(file_metadata)
+    if file_metadata:
+        queue_site_export()
+    print(f"Analyzed {len(file_metadata)} of {len(filenames)} uploads")
+
+# Resumable uploads: create a session, PATCH bytes at Upload-Offset, then pass
+# the session id as an `uploads` (album) or `upload` (single image) form field
+def upload_part_path(store, upload_id):
+    return os.path.join(store.incoming_dir(), f'{upload_id}.part')
+
+def remove_upload_part(store, upload_id):
+    try:
+        os.remove(upload_part_path(store, upload_id))
+    except FileNotFoundError:
+        pass
+
+def get_own_upload_session(upload_id):
+    """Return the current user's upload session, or None"""
+    upload = get_upload_session(upload_id)
+    if upload is None or upload['user_id'] != current_user.id:
+        return None
+    return upload
+
+def upload_session_response(upload, status=200):
+    response = jsonify({
+        'id': upload['id'],
+        'filename': upload['filename'],
+        'length': upload['length'],
+        'offset': upload['received']
+    })
+    response.status_code = status
+    response.headers['Upload-Offset'] = str(upload['received'])
+    response.headers['Upload-Length'] = str(upload['length'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def purge_stale_upload_sessions(store):
+    """Drop sessions idle longer than UPLOAD_SESSION_TTL along with their partial files"""
+    for upload_id in delete_stale_upload_sessions(UPLOAD_SESSION_TTL):
+        remove_upload_part(store, upload_id)
+
+@app.route('/api/uploads', methods=['POST'])
+@login_required
+def create_upload_session_api():
+    """Start a resumable upload of one image"""
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get('filename', ''))
+    length = data.get('length')
+    
+    if not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    if not isinstance(length, int) or isinstance(length, bool) or length <= 0:
+        return jsonify({'error': 'length must be a positive integer'}), 400
+    if length > MAX_FILE_SIZE:
+        return jsonify({'error': f'File {filename} exceeds 20MB limit'}), 400
+    
+    store = get_blob_store()
+    purge_stale_upload_sessions(store)
+    
+    upload_id = secrets.token_hex(16)
+    open(upload_part_path(store, upload_id), 'wb').close()
+    create_upload_session(upload_id, current_user.id, filename, length)
+    
+    response = upload_session_response(get_upload_session(upload_id), 201)
+    response.headers['Location'] = f'/api/uploads/{upload_id}'
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@login_required
+def get_upload_session_api(upload_id):
+    """Report how many bytes of an upload the server has (HEAD works too)"""
+    upload = get_own_upload_session(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return upload_session_response(upload)
+
+@app.route('/api/uploads/<upload_id>', methods=['PATCH'])
+@login_required
+def patch_upload_session_api(upload_id):
+    """Append the request body to an upload at the Upload-Offset header.
+
+    The body is streamed to the partial file in CHUNK_SIZE pieces. Whatever
+    arrives before a dropped connection is kept, so the client resumes from
+    the offset a GET/HEAD reports.
+    """
+    upload = get_own_upload_session(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
     
-    # Sort by newest first
-    images.sort(key=lambda x: x['time'], reverse=True)
-    return jsonify(images)
+    chunk_length = request.content_length
+    if chunk_length is None:
+        return jsonify({'error': 'Content-Length header is required'}), 411
+    if chunk_length > MAX_UPLOAD_CHUNK_SIZE:
+        return jsonify({'error': 'Chunk too large'}), 413
+    if offset + chunk_length > upload['length']:
+        return jsonify({'error': 'Chunk extends past the upload length'}), 400
+    
+    store = get_blob_store()
+    with open(upload_part_path(store, upload_id), 'r+b') as part:
+        if fcntl:
+            try:
+                fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another request is writing this upload; report the last known offset
+                return upload_session_response(upload, 409)
+        
+        # Re-read under the lock: a concurrent PATCH may have just finished
+        upload = get_own_upload_session(upload_id)
+        if upload is None:
+            return jsonify({'error': 'Upload not found'}), 404
+        if offset != upload['received']:
+            return upload_session_response(upload, 409)
+        
+        part.seek(offset)
+        written = 0
+        try:
+            while written < chunk_length:
+                chunk = request.stream.read(min(CHUNK_SIZE, chunk_length - written))
+                if not chunk:
+                    break
+                position = offset + written
+                if position < SNIFF_BYTES:
+                    # The signature may straddle PATCHes; check all bytes so far
+                    part.seek(0)
+                    head = part.read(position) + chunk
+                    part.seek(position)
+                    error = signature_error(upload['filename'], head[:SNIFF_BYTES],
+                                            partial=len(head) < upload['length'])
+                    if error:
+                        return jsonify({'error': error}), 400
+                part.write(chunk)
+                written += len(chunk)
+        except ClientDisconnected:
+            app.logger.info(f"Upload {upload_id} disconnected after {written} bytes")
+        part.flush()
+        os.fsync(part.fileno())
+        
+        if not advance_upload_session(upload_id, offset, offset + written):
+            return upload_session_response(get_own_upload_session(upload_id), 409)
+    
+    response = upload_session_response(get_own_upload_session(upload_id))
+    response.status_code = 204
+    return response
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def delete_upload_session_api(upload_id):
+    """Abandon an upload and discard its bytes"""
+    upload = get_own_upload_session(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    
+    store = get_blob_store()
+    delete_upload_session(upload_id)
+    remove_upload_part(store, upload_id)
+    return jsonify({'success': True})
 
 # Community Images CRUD API
 @app.route('/api/community-images', methods=['GET'])
+@cached_json_response
 def get_community_images():
-    """Get all community images"""
-    images = get_all_community_images()
-    return jsonify(images)
+    """Get all community images, or one page of them when limit/cursor is given"""
+    try:
+        fields = get_field_selection(COMMUNITY_IMAGE_SUMMARY_FIELDS)
+        pagination = get_pagination_args()
+        if pagination is None:
+            return jsonify(get_all_community_images(fields=fields))
+        items, next_cursor = get_community_images_page(*pagination, fields=fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': items, 'next_cursor': next_cursor})
 
 @app.route('/api/community-images/<int:image_id>', methods=['GET'])
+@cached_json_response
 def get_community_image(image_id):
     """Get a single community image by ID"""
     image = get_community_image_by_id(image_id)
@@ -150,8 +927,10 @@ def get_community_image(image_id):
 
 @app.route('/api/community-images', methods=['POST'])
 @login_required
+@streamed_upload(max_files=MAX_ALBUM_FILES, invalid_type_error='Invalid file type: {filename}')
 def create_community_image_api():
     """Create a new community image gallery item"""
+    store = get_blob_store()
     saved_filenames = []
     try:
         # Get form data
@@ -163,40 +942,31 @@ def create_community_image_api():
         if not title:
             return jsonify({'error': 'Title is required'}), 400
         
-        # Handle multiple file uploads
+        # Handle multiple file uploads, sent inline or as finished resumable uploads
         files = request.files.getlist('images')
+        upload_ids = request.form.getlist('uploads')
         
-        if not files or len(files) == 0:
+        if not files and not upload_ids:
             return jsonify({'error': 'At least one image is required'}), 400
         
-        if len(files) > 9:
+        if len(files) + len(upload_ids) > MAX_ALBUM_FILES:
             return jsonify({'error': 'Maximum 9 images allowed'}), 400
         
         # Process and save files
-        for file in files:
-            if file and file.filename and allowed_file(file.filename):
-                # Check file size
-                file.seek(0, os.SEEK_END)
-                file_size = file.tell()
-                file.seek(0)
-                
-                if file_size > MAX_FILE_SIZE:
-                    return jsonify({'error': f'File {file.filename} exceeds 20MB limit'}), 400
-                
-                # Generate unique filename
-                ext = file.filename.rsplit('.', 1)[1].lower()
-                unique_name = f"community-{int(time.time())}-{random.randint(1000, 9999)}.{ext}"
-                
-                file.save(os.path.join(UPLOAD_FOLDER, unique_name))
-                saved_filenames.append(unique_name)
-            elif file and file.filename:
-                return jsonify({'error': f'Invalid file type: {file.filename}'}), 400
+        error = store_album_files(store, files, saved_filenames)
+        if not error:
+            error = finalize_uploads(store, upload_ids, saved_filenames)
+        if error:
+            return jsonify({'error': error}), 400
         
         if not saved_filenames:
             return jsonify({'error': 'No valid images uploaded'}), 400
         
         # Save to database
-        image_id = create_community_image(title, caption, description, saved_filenames)
+        image_id = create_community_image(title, caption, description, saved_filenames,
+                                          require_files=store.require,
+                                          file_metadata=analyze_uploads(store, saved_filenames))
+        derivatives.schedule(store, saved_filenames)
         
         return jsonify({
             'success': True,
@@ -205,21 +975,17 @@ def create_community_image_api():
         })
     
     except Exception as e:
-        # Clean up any files that were saved before the error to avoid orphaned uploads
-        for filename in saved_filenames:
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except OSError:
-                # If cleanup fails, log but preserve the original error context
-                pass
+        # Clean up files saved before the error unless another row already uses them
+        release_uploads(store, saved_filenames)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/community-images/<int:image_id>', methods=['PUT'])
 @login_required
+@streamed_upload(max_files=MAX_ALBUM_FILES, invalid_type_error=None)
 def update_community_image_api(image_id):
     """Update an existing community image"""
+    store = get_blob_store()
+    saved_filenames = []
     try:
         # Check if image exists
         existing_image = get_community_image_by_id(image_id)
@@ -236,45 +1002,32 @@ def update_community_image_api(image_id):
         
         # Check if new images are being uploaded
         files = request.files.getlist('images')
+        upload_ids = request.form.getlist('uploads')
         
-        if files and files[0].filename:
+        if (files and files[0].filename) or upload_ids:
             # New images provided
-            if len(files) > 9:
+            if len(files) + len(upload_ids) > MAX_ALBUM_FILES:
                 return jsonify({'error': 'Maximum 9 images allowed'}), 400
             
             # Process and save new files first
-            saved_filenames = []
-            for file in files:
-                if file and file.filename and allowed_file(file.filename):
-                    # Check file size
-                    file.seek(0, os.SEEK_END)
-                    file_size = file.tell()
-                    file.seek(0)
-                    
-                    if file_size > MAX_FILE_SIZE:
-                        return jsonify({'error': f'File {file.filename} exceeds 20MB limit'}), 400
-                    
-                    ext = file.filename.rsplit('.', 1)[1].lower()
-                    unique_name = f"community-{int(time.time())}-{random.randint(1000, 9999)}.{ext}"
-                    
-                    file.save(os.path.join(UPLOAD_FOLDER, unique_name))
-                    saved_filenames.append(unique_name)
+            error = store_album_files(store, files, saved_filenames, skip_invalid=True)
+            if not error:
+                error = finalize_uploads(store, upload_ids, saved_filenames)
+            if error:
+                return jsonify({'error': error}), 400
             
             if not saved_filenames:
                 return jsonify({'error': 'No valid images uploaded'}), 400
             
-            # Update database with new images
-            update_community_image(image_id, title, caption, description, saved_filenames)
-            
-            # Only delete old images after successful database update
-            for old_filename in existing_image['images']:
-                old_path = os.path.join(UPLOAD_FOLDER, old_filename)
-                try:
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
-                except OSError:
-                    # Log but don't fail if old file deletion fails
-                    pass
+            # Update database with new images; files the album drops are queued
+            # for deletion in the same transaction and removed by the job worker
+            # (only those no other album or upload still references)
+            update_community_image(image_id, title, caption, description, saved_filenames,
+                                   require_files=store.require,
+                                   file_metadata=analyze_uploads(store, saved_filenames),
+                                   deletion_root=store.root)
+            jobs.wake()
+            derivatives.schedule(store, saved_filenames)
         else:
             # Keep existing images
             update_community_image(image_id, title, caption, description, existing_image['images'])
@@ -282,6 +1035,7 @@ def update_community_image_api(image_id):
         return jsonify({'success': True, 'id': image_id})
     
     except Exception as e:
+        release_uploads(store, saved_filenames)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/community-images/<int:image_id>', methods=['DELETE'])
@@ -289,19 +1043,11 @@ def update_community_image_api(image_id):
 def delete_community_image_api(image_id):
     """Delete a community image"""
     try:
-        # Get the image to delete files
-        image = get_community_image_by_id(image_id)
-        if not image:
+        # Its files are queued for deletion in the same transaction; the job
+        # worker removes those no other row references
+        if not delete_community_image(image_id, deletion_root=get_blob_store().root):
             return jsonify({'error': 'Image not found'}), 404
-        
-        # Delete associated files
-        for filename in image['images']:
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-            if os.path.exists(filepath):
-                os.remove(filepath)
-        
-        # Delete from database
-        delete_community_image(image_id)
+        jobs.wake()
         
         return jsonify({'success': True})
     
@@ -310,14 +1056,24 @@ def delete_community_image_api(image_id):
 
 # Text Posts CRUD API
 @app.route('/api/text-posts', methods=['GET'])
+@cached_json_response
 def get_text_posts():
-    """Get all text posts"""
+    """Get all text posts, or one page of them when limit/cursor is given"""
     # Admin sees all posts, public only sees published
     published_only = not current_user.is_authenticated
-    posts = get_all_text_posts(published_only=published_only)
-    return jsonify(posts)
+    try:
+        fields = get_field_selection(TEXT_POST_SUMMARY_FIELDS)
+        pagination = get_pagination_args()
+        if pagination is None:
+            return jsonify(get_all_text_posts(published_only=published_only, fields=fields))
+        posts, next_cursor = get_text_posts_page(*pagination, published_only=published_only,
+                                                 fields=fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': posts, 'next_cursor': next_cursor})
 
 @app.route('/api/text-posts/<int:post_id>', methods=['GET'])
+@cached_json_response
 def get_text_post(post_id):
     """Get a single text post by ID"""
     post = get_text_post_by_id(post_id)
@@ -349,18 +1105,26 @@ def create_text_post_api():
         tags = data.get('tags', [])
         reading_time = data.get('reading_time', 0)
         published = data.get('published', False)
+        slug = data.get('slug') or None
         
         # Validate tags is a list
         if not isinstance(tags, list):
             return jsonify({'error': 'Tags must be a list'}), 400
         
-        post_id = create_text_post(title, subtitle, content, category, tags, reading_time, published)
+        if slug is not None and not isinstance(slug, str):
+            return jsonify({'error': 'Slug must be a string'}), 400
+        
+        post_id = create_text_post(title, subtitle, content, category, tags, reading_time, published,
+                                   slug=slug)
         
         return jsonify({
             'success': True,
             'id': post_id
         })
     
+    except ValueError as e:
+        # Malformed or duplicate slug
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -390,15 +1154,23 @@ def update_text_post_api(post_id):
         tags = data.get('tags', [])
         reading_time = data.get('reading_time', 0)
         published = data.get('published', False)
+        slug = data.get('slug') or None
         
         # Validate tags is a list
         if not isinstance(tags, list):
             return jsonify({'error': 'Tags must be a list'}), 400
         
-        update_text_post(post_id, title, subtitle, content, category, tags, reading_time, published)
+        if slug is not None and not isinstance(slug, str):
+            return jsonify({'error': 'Slug must be a string'}), 400
+        
+        update_text_post(post_id, title, subtitle, content, category, tags, reading_time, published,
+                         slug=slug)
         
         return jsonify({'success': True, 'id': post_id})
     
+    except ValueError as e:
+        # Malformed or duplicate slug
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -419,14 +1191,56 @@ def delete_text_post_api(post_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/stats', methods=['GET'])
+@login_required
+def get_stats():
+    """Report runtime statistics for this worker"""
+    return jsonify({
+        'db_pool': get_pool_stats(),
+        'db_read_pool': get_read_pool_stats(),
+        'write_queue': get_write_queue_stats(),
+        'response_cache': response_cache.stats(),
+        'static_cache': static_cache.stats(),
+        'compressed_cache': compressed_cache.stats(),
+        'fragment_cache': fragment_cache.stats(),
+        'storage': get_blob_stats(),
+        'jobs': get_job_stats()['counts'],
+        'gc': get_gc_state(),
+        'file_deletion_backlog': get_file_deletion_backlog()
+    })
+
+@app.route('/api/jobs', methods=['GET'])
+@login_required
+def get_jobs_status():
+    """Background job queue status: counts by state, backlog age and recent failures"""
+    return jsonify(get_job_stats())
+
+# Search API
+@app.route('/api/search', methods=['GET'])
+@cached_json_response
+def search():
+    """Full-text search over text posts and community images"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    # Same visibility rule as /api/text-posts: drafts are admin-only
+    published_only = not current_user.is_authenticated
+    try:
+        limit, cursor = get_pagination_args() or (DEFAULT_PAGE_SIZE, None)
+        results, next_cursor = search_content(query, limit, cursor, published_only=published_only)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': results, 'next_cursor': next_cursor})
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
-    return send_from_directory('htdocs', '404.html'), 404
+    return send_htdocs('404.html', status=404)
 
 @app.errorhandler(500)
 def internal_error(error):
-    return send_from_directory('htdocs', '500.html'), 500
+    return send_htdocs('500.html', status=500)
 
 if __name__ == '__main__':
     # Initialize database on startup
@@ -0,0 +1,222 @@
+"""
+gzip and brotli encodings for htdocs files and JSON responses.
+
+`flask compress-static` writes .gz (and .br, where the brotli package is
+installed) siblings next to every compressible file under htdocs. A sibling
+carries its source's mtime, so one whose mtime differs is stale and is
+ignored until the next build. The app serves fresh siblings to clients whose
+Accept-Encoding allows them (see static_files.send_static_file); nginx does
+the same for the files it serves itself with gzip_static.
+
+JSON responses above MIN_SIZE are compressed as they are sent, with the
+compressed bodies kept in a CompressedBodyCache keyed by the response's ETag,
+so a listing that has not changed is compressed once per encoding.
+
+brotli is optional: without it only gzip is written and negotiated for JSON.
+Precompressed .br files are still served if they exist.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Server preference order for precompressed files
+ENCODINGS = ('br', 'gzip')
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.txt', '.xml', '.map')
+# Below this size the saving does not cover the encoding overhead
+MIN_SIZE = 1024
+# Build-time output is written once, so it gets the slowest, smallest settings
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+DYNAMIC_LEVELS = {'br': 5, 'gzip': 6}
+
+
+def available_encodings():
+    """Encodings this process can produce, in preference order"""
+    return tuple(encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None)
+
+
+def compress(data, encoding, level=None):
+    """Compress data with encoding ('br' or 'gzip')"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=DYNAMIC_LEVELS['br'] if level is None else level)
+    # mtime=0 keeps the output byte-identical for identical input
+    return gzip.compress(data, compresslevel=DYNAMIC_LEVELS['gzip'] if level is None else level,
+                         mtime=0)
+
+
+def negotiate(accept_encodings, offered):
+    """Best of the offered encodings the client accepts, or None for identity.
+
+    accept_encodings is request.accept_encodings; ties in quality go to the
+    earlier entry in offered.
+    """
+    best, best_quality = None, 0
+    for encoding in offered:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(path):
+    return path.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def fresh_variants(full_path, mtime_ns):
+    """Encodings with a precompressed sibling of full_path built from this mtime"""
+    variants = []
+    for encoding in ENCODINGS:
+        try:
+            stat = os.stat(full_path + SUFFIXES[encoding])
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime_ns == mtime_ns:
+            variants.append(encoding)
+    return variants
+
+
+def _write_variant(path, data, source_stat):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.compress-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _remove_variant(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def precompress_tree(root, encodings=None, min_size=MIN_SIZE, exclude=()):
+    """Write missing or stale .gz/.br siblings for compressible files under root.
+
+    Siblings that would not be smaller than their source, and siblings whose
+    source is gone, are removed. Directories in exclude (e.g. the upload
+    folder) are not descended into. Returns counts of files written, already
+    up to date and removed, plus the source and compressed byte totals of
+    what was written.
+    """
+    encodings = available_encodings() if encodings is None else encodings
+    report = {'written': 0, 'fresh': 0, 'removed': 0, 'original_bytes': 0, 'compressed_bytes': 0}
+    exclude = {os.path.abspath(path) for path in exclude}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames
+                             if os.path.abspath(os.path.join(dirpath, name)) not in exclude)
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            base, suffix = os.path.splitext(path)
+            if suffix in SUFFIXES.values():
+                if is_compressible(base) and not os.path.exists(base):
+                    report['removed'] += _remove_variant(path)
+                continue
+            if not is_compressible(name):
+                continue
+
+            source_stat = os.stat(path)
+            data = None
+            for encoding in encodings:
+                variant = path + SUFFIXES[encoding]
+                if source_stat.st_size < min_size:
+                    report['removed'] += _remove_variant(variant)
+                    continue
+                if encoding in fresh_variants(path, source_stat.st_mtime_ns):
+                    report['fresh'] += 1
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                compressed = compress(data, encoding, level=STATIC_LEVELS[encoding])
+                if len(compressed) >= len(data):
+                    report['removed'] += _remove_variant(variant)
+                    continue
+                _write_variant(variant, compressed, source_stat)
+                report['written'] += 1
+                report['original_bytes'] += len(data)
+                report['compressed_bytes'] += len(compressed)
+    return report
+
+
+class CompressedBodyCache:
+    """Thread-safe LRU of compressed response bodies bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'original_bytes': 0,
+            'compressed_bytes': 0,
+        }
+
+    def compress(self, body, encoding, etag=None):
+        """Return body compressed with encoding, reusing an earlier result for the same ETag.
+
+        Without an ETag the key is a hash of the body.
+        """
+        if etag is None:
+            etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        key = (encoding, etag)
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return compressed
+            self._stats['misses'] += 1
+
+        compressed = compress(body, encoding)
+        with self._lock:
+            self._stats['original_bytes'] += len(body)
+            self._stats['compressed_bytes'] += len(compressed)
+            if len(compressed) > self.max_bytes:
+                return compressed
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = compressed
+            self._bytes += len(compressed)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+        return compressed
+
+    def _remove(self, key):
+        self._bytes -= len(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return a snapshot of cache counters and size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        return stats
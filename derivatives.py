@@ -0,0 +1,112 @@
+"""
+Resized, re-encoded variants of uploaded images.
+
+After an upload commits, the app queues a background job (see jobs.py) per
+stored image; its handler in app.py calls process_image(). Each stored image gets WebP (and AVIF, where Pillow can
+encode it) variants at DERIVATIVE_WIDTHS, written next to the original as
+<sha256>-<width>w.<format> and recorded in the image_derivatives table, which
+the list and detail APIs turn into srcset strings.
+
+Pillow is optional. Without it no derivatives are produced and clients keep
+using the originals.
+"""
+import os
+import re
+import tempfile
+from functools import lru_cache
+
+import jobs
+from models import record_derivatives
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+DERIVATIVE_FORMATS = ('avif', 'webp')
+DERIVATIVE_QUALITY = {'avif': 55, 'webp': 80}
+JOB_KIND = 'derivatives'
+# derivative_name() output: <stem>-<width>w.<format>
+_DERIVATIVE_NAME_RE = re.compile(r'-\d+w\.(?:' + '|'.join(DERIVATIVE_FORMATS) + r')$')
+
+
+@lru_cache(maxsize=None)
+def available_formats():
+    """Derivative formats the installed Pillow can encode"""
+    if Image is None:
+        return ()
+    return tuple(fmt for fmt in DERIVATIVE_FORMATS if features.check(fmt))
+
+
+def derivative_name(source, width, fmt):
+    """Stored name of a variant, alongside its source blob"""
+    return f"{source.rsplit('.', 1)[0]}-{width}w.{fmt}"
+
+
+def is_derivative_name(filename):
+    """Whether filename is named like a variant rather than an upload"""
+    return bool(_DERIVATIVE_NAME_RE.search(filename))
+
+
+def generate_derivatives(store, source):
+    """Write the variants of one stored image.
+
+    Returns a list of (width, format, filename, bytes). Widths never exceed
+    the original; an image narrower than every target gets one variant at
+    its own width. Animated images are left alone. A source Pillow cannot
+    decode raises jobs.PermanentJobError, since retrying will not help.
+    """
+    formats = available_formats()
+    if not formats:
+        return []
+
+    try:
+        with Image.open(store.path(source)) as original:
+            if getattr(original, 'is_animated', False):
+                return []
+            original.load()
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    except OSError as e:
+        # UnidentifiedImageError and truncated-file errors are OSErrors
+        raise jobs.PermanentJobError(f'Cannot decode {source}: {e}') from e
+
+    widths = [width for width in DERIVATIVE_WIDTHS if width < image.width] or [image.width]
+    results = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            filename = derivative_name(source, width, fmt)
+            target = store.path(filename)
+            if not os.path.exists(target):
+                fd, temp_path = tempfile.mkstemp(dir=store.incoming_dir())
+                try:
+                    with os.fdopen(fd, 'wb') as out:
+                        resized.save(out, format=fmt.upper(), quality=DERIVATIVE_QUALITY[fmt])
+                    os.replace(temp_path, target)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+            results.append((width, fmt, filename, os.path.getsize(target)))
+    return results
+
+
+def process_image(store, source):
+    """Generate and record the variants of one image, discarding them if it was deleted meanwhile"""
+    derivatives = generate_derivatives(store, source)
+    if derivatives and not record_derivatives(source, derivatives):
+        for _, _, filename, _ in derivatives:
+            store.remove(filename)
+    return derivatives
+
+
+def schedule(store, filenames):
+    """Queue derivative generation for stored images; a no-op without Pillow"""
+    if not available_formats():
+        return
+    jobs.enqueue(JOB_KIND, [{'root': store.root, 'source': source}
+                            for source in dict.fromkeys(filenames)])
@@ -99,7 +99,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function loadData() {
         try {
-            const res = await fetch('/api/community-images');
+            const res = await fetch('/api/community-images?view=summary');
             const data = await res.json();
             
             renderRecentList(data);
@@ -161,6 +161,15 @@ document.addEventListener('DOMContentLoaded', () => {
         elements.btns.save.disabled = true;
 
         try {
+            // Send images ahead of the form as resumable uploads, then reference them by id
+            const files = Array.from(elements.inputs.images.files);
+            if (files.length > 0) {
+                formData.delete('images');
+                const uploadIds = await uploadFiles(files);
+                uploadIds.forEach(uploadId => formData.append('uploads', uploadId));
+                setStatus('Saving...', 'neutral');
+            }
+
             const url = isEdit ? `/api/community-images/${id}` : '/api/community-images';
             const method = isEdit ? 'PUT' : 'POST';
 
@@ -235,6 +244,78 @@ document.addEventListener('DOMContentLoaded', () => {
         setStatus('', 'neutral');
     }
 
+    // --- Resumable Uploads ---
+
+    const UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024;
+    const UPLOAD_PARALLELISM = 3;
+    const UPLOAD_RETRIES = 5;
+
+    // Upload files through /api/uploads, several at a time; resolves to session ids in file order
+    async function uploadFiles(files) {
+        const ids = new Array(files.length);
+        const sent = new Array(files.length).fill(0);
+        const total = files.reduce((sum, file) => sum + file.size, 0);
+        const reportProgress = () => {
+            const done = sent.reduce((sum, n) => sum + n, 0);
+            setStatus(`Uploading... ${total ? Math.floor(done * 100 / total) : 100}%`, 'neutral');
+        };
+
+        let next = 0;
+        const worker = async () => {
+            while (next < files.length) {
+                const index = next++;
+                ids[index] = await uploadFile(files[index], bytes => {
+                    sent[index] = bytes;
+                    reportProgress();
+                });
+            }
+        };
+        reportProgress();
+        await Promise.all(Array.from({ length: Math.min(UPLOAD_PARALLELISM, files.length) }, worker));
+        return ids;
+    }
+
+    async function uploadFile(file, onProgress) {
+        const res = await fetch('/api/uploads', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, length: file.size })
+        });
+        const upload = await res.json();
+        if (!res.ok) throw new Error(upload.error || `Could not start upload of ${file.name}`);
+
+        let offset = 0;
+        let failures = 0;
+        while (offset < file.size) {
+            try {
+                const chunk = file.slice(offset, offset + UPLOAD_CHUNK_SIZE);
+                const patch = await fetch(`/api/uploads/${upload.id}`, {
+                    method: 'PATCH',
+                    headers: {
+                        'Content-Type': 'application/offset+octet-stream',
+                        'Upload-Offset': String(offset)
+                    },
+                    body: chunk
+                });
+                if (patch.status === 404 || patch.status === 413) {
+                    const json = await patch.json();
+                    throw Object.assign(new Error(json.error), { fatal: true });
+                }
+                if (!patch.ok && patch.status !== 409) throw new Error(`Upload failed (${patch.status})`);
+                offset = Number(patch.headers.get('Upload-Offset'));
+                failures = 0;
+            } catch (err) {
+                if (err.fatal || ++failures > UPLOAD_RETRIES) throw err;
+                // Back off, then resume from whatever the server actually has
+                await new Promise(resolve => setTimeout(resolve, 500 * 2 ** failures));
+                const head = await fetch(`/api/uploads/${upload.id}`, { method: 'HEAD' }).catch(() => null);
+                if (head && head.ok) offset = Number(head.headers.get('Upload-Offset'));
+            }
+            onProgress(offset);
+        }
+        return upload.id;
+    }
+
     // --- Helpers ---
 
     function updateFileStatus() {
@@ -277,7 +358,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function loadPosts() {
         try {
-            const res = await fetch('/api/text-posts');
+            const res = await fetch('/api/text-posts?view=summary');
             const data = await res.json();
             renderPostsGrid(data);
         } catch (err) {
@@ -298,7 +379,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 '<span style="padding:4px 8px;background:var(--accent);color:white;border-radius:4px;font-size:0.75rem">Published</span>' :
                 '<span style="padding:4px 8px;background:var(--muted);color:var(--bg);border-radius:4px;font-size:0.75rem">Draft</span>';
             
-            const excerpt = post.content.substring(0, 100) + (post.content.length > 100 ? '...' : '');
+            const excerpt = post.excerpt || '';
             
             return `
             <div class="library-item">
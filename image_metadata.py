@@ -0,0 +1,134 @@
+"""
+Intrinsic metadata of uploaded images, computed once at ingest.
+
+Width and height come from the file header (PNG, GIF, JPEG, WebP) so they are
+available without any imaging library. With Pillow installed the image is
+also decoded at reduced size for its dominant colour and a tiny blurred
+placeholder (a base64 JPEG data URI clients can show, blurred, while the real
+image loads); without it those fields are None.
+"""
+import base64
+import io
+import os
+import struct
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+PLACEHOLDER_SIZE = 16
+_ANALYSIS_SIZE = 64
+# EXIF orientations that rotate the image by 90 degrees
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(f):
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte or byte[0] in (0xD9, 0xDA):
+            return None
+        marker = byte[0]
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            continue
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker in _JPEG_SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack('>xHH', data)
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_dimensions(f):
+    """(width, height) from an image file's header, or None if unrecognized"""
+    f.seek(0)
+    head = f.read(32)
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+        return struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', head[6:10])
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        chunk = head[12:16]
+        if chunk == b'VP8X':
+            width = int.from_bytes(head[24:27], 'little') + 1
+            height = int.from_bytes(head[27:30], 'little') + 1
+            return width, height
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(head[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        return None
+    if head.startswith(b'\xff\xd8'):
+        return _jpeg_size(f)
+    return None
+
+
+def _decode_details(path):
+    """(width, height, dominant_color, placeholder) using Pillow, orientation applied"""
+    with Image.open(path) as image:
+        width, height = image.size
+        if image.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        image.draft('RGB', (_ANALYSIS_SIZE * 2, _ANALYSIS_SIZE * 2))
+        image.thumbnail((_ANALYSIS_SIZE, _ANALYSIS_SIZE))
+        small = ImageOps.exif_transpose(image)
+        if small.mode in ('RGBA', 'LA', 'PA') or 'transparency' in small.info:
+            # Flatten onto white so transparent areas don't read as black
+            rgba = small.convert('RGBA')
+            small = Image.new('RGB', rgba.size, 'white')
+            small.paste(rgba, mask=rgba.getchannel('A'))
+        else:
+            small = small.convert('RGB')
+
+    # Most common colour of a 5-colour quantization, ignoring fine detail
+    quantized = small.quantize(colors=5)
+    palette = quantized.getpalette()
+    _, index = max(quantized.getcolors())
+    red, green, blue = palette[index * 3:index * 3 + 3]
+    dominant_color = f'#{red:02x}{green:02x}{blue:02x}'
+
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = io.BytesIO()
+    small.save(buffer, format='JPEG', quality=60)
+    placeholder = 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+    return width, height, dominant_color, placeholder
+
+
+def analyze(path):
+    """Metadata dict for a stored image: width, height, bytes, dominant_color, placeholder"""
+    metadata = {
+        'width': None,
+        'height': None,
+        'bytes': os.path.getsize(path),
+        'dominant_color': None,
+        'placeholder': None,
+    }
+    with open(path, 'rb') as f:
+        try:
+            dimensions = read_dimensions(f)
+        except (struct.error, ValueError, OSError):
+            dimensions = None
+    if dimensions:
+        metadata['width'], metadata['height'] = dimensions
+
+    if Image is not None:
+        try:
+            (metadata['width'], metadata['height'],
+             metadata['dominant_color'], metadata['placeholder']) = _decode_details(path)
+        except Exception:
+            # Not decodable (or a format Pillow lacks); keep what the header gave us
+            pass
+    return metadata
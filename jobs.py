@@ -0,0 +1,174 @@
+"""
+Durable background jobs stored in the application's SQLite database.
+
+Request handlers enqueue work with enqueue(kind, payloads) and return; a
+worker leases due jobs one at a time and runs the handler registered for
+their kind. A job that raises is retried with exponential backoff until
+max_attempts, after which it stays in the table as failed; a handler that
+raises PermanentJobError fails its job on the spot. A lease that
+outlives VISIBILITY_TIMEOUT (the worker died or hung) makes the job due
+again, so every job runs at least once; handlers must be idempotent.
+
+Where the worker runs is chosen with TINYRISKS_JOB_WORKER:
+
+- thread (default): each app process runs one worker thread, started on
+  its first request or enqueue
+- external: jobs wait for a separate `flask --app app run-jobs` process
+- inline: jobs run in the enqueuing thread right after they are queued
+  (used by the tests; failures are still retried by any later worker)
+"""
+import logging
+import os
+import threading
+import time
+
+from models import enqueue_jobs, claim_job, complete_job, fail_job
+from models import delete_finished_jobs, has_pending_jobs
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKER = os.environ.get('TINYRISKS_JOB_WORKER', 'thread')
+VISIBILITY_TIMEOUT = 300
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 3600
+POLL_INTERVAL = 2.0
+# Done jobs are pruned after a week; failed ones stay until removed by hand
+FINISHED_JOB_RETENTION = 7 * 24 * 3600
+PRUNE_INTERVAL = 3600
+
+_handlers = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot succeed, e.g. the input is unusable"""
+
+
+def handler(kind):
+    """Register the function that runs jobs of a kind; it receives the payload"""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt after `attempts` failures"""
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def run_job(job):
+    """Run one leased job and record its outcome"""
+    try:
+        func = _handlers.get(job['kind'])
+        if func is None:
+            raise LookupError(f"No handler for job kind {job['kind']}")
+        func(job['payload'])
+    except PermanentJobError as e:
+        logger.warning(f"Job {job['id']} ({job['kind']}) failed permanently: {e}")
+        fail_job(job, f'{type(e).__name__}: {e}', 0, final=True)
+        return False
+    except Exception as e:
+        logger.warning(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed: {e}")
+        fail_job(job, f'{type(e).__name__}: {e}', retry_delay(job['attempts']))
+        return False
+    complete_job(job)
+    return True
+
+
+def work_once(job_id=None):
+    """Lease and run the next due job (or job_id); returns False when none was due"""
+    job = claim_job(VISIBILITY_TIMEOUT, job_id=job_id)
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+def run_pending():
+    """Run due jobs in the calling thread until none are left; returns how many ran"""
+    count = 0
+    while work_once():
+        count += 1
+    return count
+
+
+class Worker(threading.Thread):
+    """Polls for due jobs until stopped, waking early when this process enqueues"""
+
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        super().__init__(name='job-worker', daemon=True)
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._last_prune = 0
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            # Cleared before looking for work so a notify() during the look isn't lost
+            self._wake.clear()
+            try:
+                ran = work_once()
+                if not ran and time.time() - self._last_prune > PRUNE_INTERVAL:
+                    self._last_prune = time.time()
+                    delete_finished_jobs(FINISHED_JOB_RETENTION)
+            except Exception as e:
+                logger.warning(f"Job worker error: {e}")
+                ran = False
+            if not ran:
+                self._wake.wait(self.poll_interval)
+
+
+_lock = threading.Lock()
+_worker = None
+_worker_pid = None
+
+
+def ensure_worker():
+    """Start this process's worker thread when JOB_WORKER is 'thread'"""
+    global _worker, _worker_pid
+    if JOB_WORKER != 'thread':
+        return None
+    with _lock:
+        if _worker is None or _worker_pid != os.getpid() or not _worker.is_alive():
+            _worker = Worker()
+            _worker_pid = os.getpid()
+            _worker.start()
+        return _worker
+
+
+def enqueue(kind, payloads, delay=0, max_attempts=5):
+    """Queue one job per payload and hand them to the configured worker"""
+    ids = enqueue_jobs(kind, payloads, delay=delay, max_attempts=max_attempts)
+    if JOB_WORKER == 'inline' and not delay:
+        for job_id in ids:
+            work_once(job_id)
+    elif ids:
+        wake()
+    return ids
+
+
+def wake():
+    """Tell the configured worker that jobs were committed, e.g. by a mutation's own transaction"""
+    if JOB_WORKER == 'inline':
+        run_pending()
+        return
+    worker = ensure_worker()
+    if worker is not None:
+        worker.notify()
+
+
+def wait_until_idle(timeout=None, interval=0.05):
+    """Block until no job is due or running; returns False on timeout"""
+    deadline = None if timeout is None else time.time() + timeout
+    while has_pending_jobs():
+        if deadline is not None and time.time() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
@@ -2,6 +2,18 @@ import sqlite3
 import os
 import json
 import logging
+import threading
+import queue
+import time
+import base64
+import pathlib
+import secrets
+import html
+import re
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from concurrent.futures import Future
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -10,99 +22,903 @@ logger = logging.getLogger(__name__)
 
 DATABASE_PATH = 'tinyrisks.db'
 
+# Funnel all mutations through one writer thread per worker (set
+# TINYRISKS_WRITE_QUEUE=0 to write directly from request threads)
+WRITE_QUEUE_ENABLED = os.environ.get('TINYRISKS_WRITE_QUEUE', '1') != '0'
+WRITE_QUEUE_MAX_BATCH = 64
+
+# Page cache and memory map for read-only connections (negative cache_size is KiB)
+READ_CACHE_SIZE_KIB = 16 * 1024
+READ_MMAP_SIZE = 256 * 1024 * 1024
+
+# Format of SQLite CURRENT_TIMESTAMP values (UTC)
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
 class User(UserMixin):
     def __init__(self, id, username):
         self.id = id
         self.username = username
 
-def get_db_connection():
-    """Create and return database connection"""
-    conn = sqlite3.connect(DATABASE_PATH, timeout=30.0)
+def _configure_connection(conn):
+    """Apply per-connection settings; run once when a connection is opened"""
     conn.row_factory = sqlite3.Row
     # Enable WAL mode for better concurrency
     conn.execute('PRAGMA journal_mode=WAL')
+    # WAL makes NORMAL safe against corruption and avoids an fsync per commit
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
     return conn
 
-def init_db():
-    """Initialize database schema and seed default user"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL
-        )
+def get_db_connection():
+    """Create and return a standalone database connection (caller closes it)"""
+    conn = sqlite3.connect(DATABASE_PATH, timeout=30.0)
+    return _configure_connection(conn)
+
+# Pooled connections stay confined to their thread; check_same_thread is
+# relaxed only so close_all() can close them from another thread
+def _open_read_write(path):
+    return _configure_connection(
+        sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    )
+
+def _open_read_only(path):
+    """Open a connection that cannot write or take write locks"""
+    uri = pathlib.Path(path).absolute().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, timeout=30.0, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA query_only=ON')
+    conn.execute(f'PRAGMA cache_size=-{READ_CACHE_SIZE_KIB}')
+    conn.execute(f'PRAGMA mmap_size={READ_MMAP_SIZE}')
+    return conn
+
+class ConnectionPool:
+    """One long-lived SQLite connection per process and thread.
+
+    gunicorn forks its workers after the app module is imported, so every
+    connection remembers the pid it was opened in; a connection inherited
+    across fork() is dropped (never used or closed) and the child opens its
+    own. Connections are also keyed by DATABASE_PATH so repointing the module
+    (as the tests do) transparently reconnects.
+    """
+
+    def __init__(self, opener):
+        self._opener = opener
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._connections = set()
+        self._stats = {
+            'opened': 0,
+            'reused': 0,
+            'closed': 0,
+            'rollbacks': 0,
+            'dropped_after_fork': 0,
+        }
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _reset_after_fork(self):
+        """Forget connections inherited from the parent process"""
+        with self._lock:
+            self._stats['dropped_after_fork'] += len(self._connections)
+            self._connections = set()
+            self._pid = os.getpid()
+        self._local = threading.local()
+
+    def acquire(self):
+        """Return this thread's connection, opening it on first use"""
+        if os.getpid() != self._pid:
+            self._reset_after_fork()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.path == DATABASE_PATH:
+            self._count('reused')
+            return conn
+
+        if conn is not None:
+            # DATABASE_PATH changed since this thread connected
+            self._discard(conn)
+
+        conn = self._opener(DATABASE_PATH)
+        self._local.conn = conn
+        self._local.path = DATABASE_PATH
+        with self._lock:
+            self._connections.add(conn)
+            self._stats['opened'] += 1
+        return conn
+
+    def release(self, conn):
+        """Hand a connection back, rolling back anything left uncommitted"""
+        if conn.in_transaction:
+            conn.rollback()
+            self._count('rollbacks')
+
+    def _discard(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+            self._stats['closed'] += 1
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to close pooled connection: {e}")
+
+    def close_all(self):
+        """Close every connection opened by this process"""
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            self._discard(conn)
+        self._local = threading.local()
+
+    def stats(self):
+        """Return a snapshot of pool counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_connections'] = len(self._connections)
+        stats['pid'] = self._pid
+        return stats
+
+_pool = ConnectionPool(_open_read_write)
+_read_pool = ConnectionPool(_open_read_only)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_pool._reset_after_fork)
+    os.register_at_fork(after_in_child=_read_pool._reset_after_fork)
+
+@contextmanager
+def db_connection():
+    """Borrow this thread's pooled connection for the duration of a block.
+
+    Any transaction still open when the block exits (normally or through an
+    exception) is rolled back, so a failed query never leaks a write lock.
+    """
+    conn = _pool.acquire()
+    try:
+        yield conn
+    finally:
+        _pool.release(conn)
+
+def _encode_cursor(position):
+    """Encode a JSON-serializable page position as an opaque token"""
+    raw = json.dumps(position).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor):
+    """Decode a cursor from _encode_cursor; raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def _decode_keyset_cursor(cursor):
+    """Decode a (created_at, id) keyset cursor"""
+    position = _decode_cursor(cursor)
+    if (not isinstance(position, list) or len(position) != 2
+            or not isinstance(position[0], str) or not isinstance(position[1], int)):
+        raise ValueError('Invalid cursor')
+    return position
+
+def _fetch_page(cursor, base_query, params, limit, after, order_column='created_at'):
+    """Run a keyset-paginated query ordered by (order_column, id) DESC.
+
+    base_query must end in a WHERE clause (use WHERE 1 when unfiltered) and
+    select order_column and id. Returns (rows, next_cursor); next_cursor is
+    None on the last page.
+    """
+    params = list(params)
+    query = base_query
+    if after:
+        query += f' AND ({order_column}, id) < (?, ?)'
+        params.extend(_decode_keyset_cursor(after))
+    query += f' ORDER BY {order_column} DESC, id DESC LIMIT ?'
+    # Fetch one extra row to learn whether another page exists
+    params.append(limit + 1)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor([rows[-1][order_column], rows[-1]['id']])
+    return rows, next_cursor
+
+@contextmanager
+def read_connection():
+    """Borrow this thread's read-only connection for the duration of a block.
+
+    The block runs inside one read transaction, so multi-statement reads see
+    a single consistent snapshot; WAL readers never wait on the writer.
+    """
+    conn = _read_pool.acquire()
+    try:
+        conn.execute('BEGIN')
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.commit()
+        _read_pool.release(conn)
+
+def get_pool_stats():
+    """Return connection pool statistics for this worker"""
+    return _pool.stats()
+
+def get_read_pool_stats():
+    """Return read-only connection pool statistics for this worker"""
+    return _read_pool.stats()
+
+def close_db_connections():
+    """Close all pooled connections held by this process"""
+    _pool.close_all()
+    _read_pool.close_all()
+
+EXCERPT_LENGTH = 200
+_MARKDOWN_LINK_RE = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+_MARKDOWN_SYMBOLS_RE = re.compile(r'[#*_>`~|]+')
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """Plain-text preview of markdown: links unwrapped, markup stripped, cut at a word"""
+    if not text:
+        return ''
+    plain = _MARKDOWN_LINK_RE.sub(r'\1', text)
+    plain = _MARKDOWN_SYMBOLS_RE.sub('', plain)
+    plain = ' '.join(plain.split())
+    if len(plain) <= length:
+        return plain
+    cut = plain[:length].rsplit(' ', 1)[0] or plain[:length]
+    return cut.rstrip(' ,.;:') + '…'
+
+# Columns a client may request with fields=; id and created_at are always
+# returned because pagination cursors are built from them
+TEXT_POST_FIELDS = ('id', 'slug', 'title', 'subtitle', 'content', 'excerpt', 'category', 'tags',
+                    'reading_time', 'published', 'created_at', 'updated_at')
+TEXT_POST_SUMMARY_FIELDS = ('id', 'slug', 'title', 'subtitle', 'excerpt', 'category', 'tags',
+                            'reading_time', 'published', 'created_at', 'updated_at')
+COMMUNITY_IMAGE_FIELDS = ('id', 'title', 'caption', 'description', 'excerpt', 'images',
+                          'srcsets', 'image_metadata', 'created_at', 'updated_at')
+COMMUNITY_IMAGE_SUMMARY_FIELDS = ('id', 'title', 'caption', 'excerpt', 'images',
+                                  'srcsets', 'image_metadata', 'created_at', 'updated_at')
+# Album fields built from community_image_files rather than selected as columns
+_COMMUNITY_IMAGE_FILE_FIELDS = ('images', 'srcsets', 'image_metadata')
+# Intrinsic metadata stored per blob when an upload is ingested
+FILE_METADATA_FIELDS = ('width', 'height', 'bytes', 'dominant_color', 'placeholder')
+_EMPTY_FILE_METADATA = dict.fromkeys(FILE_METADATA_FIELDS)
+
+# URL prefix of stored uploads, used to build srcset strings
+UPLOAD_URL_PREFIX = '/static/uploads/'
+
+def _select_list(fields, allowed):
+    """Build a SELECT column list for a validated field projection (None = all)"""
+    if fields is None:
+        return '*'
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field: {unknown[0]}")
+    columns = ['id', 'created_at']
+    columns += [field for field in fields
+                if field not in columns and field not in _COMMUNITY_IMAGE_FILE_FIELDS]
+    return ', '.join(columns)
+
+class WriteQueue:
+    """Single writer thread that group-commits queued mutations.
+
+    Callers submit an operation (a function taking a connection) and block
+    until it is committed. The writer drains whatever is queued, up to
+    WRITE_QUEUE_MAX_BATCH, and runs it in one BEGIN IMMEDIATE transaction
+    with a savepoint per operation, so a failing operation is rolled back and
+    reported to its own caller without affecting the rest of the batch.
+    Like the pool, the thread is (re)started lazily after fork().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'submitted': 0,
+            'committed_operations': 0,
+            'failed_operations': 0,
+            'batches': 0,
+            'largest_batch': 0,
+            'max_queue_depth': 0,
+            'commit_ms_total': 0.0,
+            'commit_ms_max': 0.0,
+            'commit_ms_last': 0.0,
+        }
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited across fork: the parent's thread does not exist here
+                self._queue = queue.Queue()
+                self._thread = None
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def in_writer_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, operation, bumps_content=True):
+        """Queue an operation and wait for its result (or exception)"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((operation, future, bumps_content))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], depth)
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_QUEUE_MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        started = time.perf_counter()
+        done = []
+        failed = 0
+        bump = False
+        try:
+            with db_connection() as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                for operation, future, bumps_content in batch:
+                    conn.execute('SAVEPOINT write_op')
+                    try:
+                        result = operation(conn)
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO write_op')
+                        conn.execute('RELEASE write_op')
+                        future.set_exception(e)
+                        failed += 1
+                    else:
+                        conn.execute('RELEASE write_op')
+                        done.append((future, result))
+                        bump = bump or bumps_content
+                if bump:
+                    _bump_content_generation(conn)
+                conn.commit()
+        except BaseException as e:
+            # The transaction itself failed: nothing in the batch was committed
+            logger.error(f"Write batch of {len(batch)} failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            failed = len(batch)
+            done = []
+        
+        for future, result in done:
+            future.set_result(result)
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+            self._stats['committed_operations'] += len(done)
+            self._stats['failed_operations'] += failed
+            self._stats['commit_ms_total'] += elapsed_ms
+            self._stats['commit_ms_max'] = max(self._stats['commit_ms_max'], elapsed_ms)
+            self._stats['commit_ms_last'] = elapsed_ms
+
+    def stats(self):
+        """Return a snapshot of queue counters and commit latency"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['enabled'] = WRITE_QUEUE_ENABLED
+        stats['queue_depth'] = self._queue.qsize()
+        batches = stats['batches']
+        stats['commit_ms_avg'] = stats['commit_ms_total'] / batches if batches else 0.0
+        for key in ('commit_ms_total', 'commit_ms_max', 'commit_ms_last', 'commit_ms_avg'):
+            stats[key] = round(stats[key], 3)
+        return stats
+
+_write_queue = WriteQueue()
+
+def _run_write(operation, bumps_content=True):
+    """Run a mutation (a function taking a connection) and commit it.
+
+    Goes through the writer thread when WRITE_QUEUE_ENABLED, otherwise runs
+    in the calling thread; either way the write lock is taken up front with
+    BEGIN IMMEDIATE rather than upgraded mid-transaction. Pass
+    bumps_content=False for bookkeeping writes that no public response
+    reflects, so they do not invalidate cached reads.
+    """
+    if WRITE_QUEUE_ENABLED and not _write_queue.in_writer_thread():
+        return _write_queue.submit(operation, bumps_content)
+    
+    with db_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        result = operation(conn)
+        if bumps_content:
+            _bump_content_generation(conn)
+        conn.commit()
+    return result
+
+def _bump_content_generation(conn):
+    """Advance the content generation inside the current write transaction"""
+    conn.execute('''
+        UPDATE content_generation
+        SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE id = 1
     ''')
+
+def get_content_version():
+    """Return (token, last_modified) describing the current content generation.
+
+    token is opaque and changes whenever any content is written; it is
+    shared through the database, so every worker sees every other worker's
+    writes. The random epoch keeps tokens from a re-created database from
+    colliding with ones cached against the old file. last_modified is an
+    aware UTC datetime (second resolution) or None.
+    """
+    with read_connection() as conn:
+        row = conn.execute(
+            'SELECT epoch, generation, updated_at FROM content_generation WHERE id = 1'
+        ).fetchone()
+    if not row:
+        return None, None
+    last_modified = None
+    if row['updated_at']:
+        last_modified = datetime.strptime(row['updated_at'], _TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+    return f"{row['epoch']}-{row['generation']}", last_modified
+
+def get_content_generation():
+    """Return an opaque token that changes whenever any content is written"""
+    return get_content_version()[0]
+
+def get_write_queue_stats():
+    """Return write queue depth and commit latency metrics for this worker"""
+    return _write_queue.stats()
+
+def _column_exists(conn, table, column):
+    """Check whether a table has a column"""
+    return any(row['name'] == column for row in conn.execute(f'PRAGMA table_info({table})'))
+
+def _migrate_community_image_files(conn):
+    """Move the legacy community_images.images JSON column into community_image_files.
+
+    Databases created before the child table existed still carry the JSON
+    column; their rows are copied out and the table is rebuilt without it.
+    A no-op once the column is gone.
+    """
+    if not _column_exists(conn, 'community_images', 'images'):
+        return
     
-    # Create images table to store metadata and descriptions
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS images (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            filename TEXT NOT NULL,
-            description TEXT,
-            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    rows = conn.execute('SELECT id, images FROM community_images').fetchall()
+    
+    # Rebuilding the parent table must not cascade into the child table, and
+    # foreign_keys can only be toggled outside a transaction
+    conn.execute('PRAGMA foreign_keys=OFF')
+    try:
+        conn.execute('BEGIN')
+        conn.execute('''
+            CREATE TABLE community_images_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                caption TEXT,
+                description TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('''
+            INSERT INTO community_images_new (id, title, caption, description, created_at, updated_at)
+            SELECT id, title, caption, description, created_at, updated_at FROM community_images
+        ''')
+        conn.execute('DROP TABLE community_images')
+        conn.execute('ALTER TABLE community_images_new RENAME TO community_images')
+        
+        for row in rows:
+            try:
+                filenames = json.loads(row['images'])
+            except (json.JSONDecodeError, TypeError) as e:
+                logger.warning(f"Failed to parse images JSON for item {row['id']} during migration: {e}")
+                filenames = []
+            conn.executemany(
+                'INSERT INTO community_image_files (community_image_id, filename, position) VALUES (?, ?, ?)',
+                [(row['id'], filename, position) for position, filename in enumerate(filenames)]
+            )
+        conn.commit()
+        logger.info(f"Migrated {len(rows)} community images to community_image_files")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute('PRAGMA foreign_keys=ON')
+
+def _migrate_excerpts(conn):
+    """Add the stored excerpt columns to older databases and backfill them"""
+    for table, source in (('text_posts', 'content'), ('community_images', 'description')):
+        if _column_exists(conn, table, 'excerpt'):
+            continue
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN excerpt TEXT')
+        rows = conn.execute(f'SELECT id, {source} FROM {table}').fetchall()
+        conn.executemany(
+            f'UPDATE {table} SET excerpt = ? WHERE id = ?',
+            [(make_excerpt(row[source]), row['id']) for row in rows]
         )
-    ''')
+        conn.commit()
+
+SLUG_MAX_LENGTH = 80
+_SLUG_SEPARATOR_RE = re.compile(r'[^a-z0-9]+')
+
+def slugify(text):
+    """URL path segment for a title: lowercase ASCII words joined by hyphens"""
+    ascii_text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    slug = _SLUG_SEPARATOR_RE.sub('-', ascii_text.lower()).strip('-')
+    return slug[:SLUG_MAX_LENGTH].rstrip('-')
+
+def _unique_slug(conn, text, post_id=None):
+    """slugify(text), suffixed with -2, -3, ... until no other post uses it"""
+    base = slugify(text) or 'post'
+    slug, n = base, 1
+    while conn.execute('SELECT 1 FROM text_posts WHERE slug = ? AND id IS NOT ?',
+                       (slug, post_id)).fetchone():
+        n += 1
+        slug = f'{base}-{n}'
+    return slug
+
+def _claim_slug(conn, slug, post_id=None):
+    """Validate an explicitly chosen slug; raises ValueError if malformed or taken"""
+    if slug != slugify(slug) or not slug:
+        raise ValueError('Slug must be lowercase letters, digits and single hyphens')
+    if conn.execute('SELECT 1 FROM text_posts WHERE slug = ? AND id IS NOT ?',
+                    (slug, post_id)).fetchone():
+        raise ValueError(f'Slug already in use: {slug}')
+    return slug
+
+def _migrate_slugs(conn):
+    """Add text_posts.slug to older databases and derive slugs from titles"""
+    if _column_exists(conn, 'text_posts', 'slug'):
+        return
+    conn.execute('ALTER TABLE text_posts ADD COLUMN slug TEXT')
+    for row in conn.execute('SELECT id, title FROM text_posts ORDER BY id').fetchall():
+        conn.execute('UPDATE text_posts SET slug = ? WHERE id = ?',
+                     (_unique_slug(conn, row['title'], row['id']), row['id']))
+    conn.commit()
+
+# Search index rowids interleave both sources so triggers can address a row
+# directly: text post N is 2N, community image N is 2N + 1
+_SEARCH_INDEX_TRIGGERS = '''
+    CREATE TRIGGER IF NOT EXISTS text_posts_search_insert AFTER INSERT ON text_posts BEGIN
+        INSERT INTO search_index (rowid, kind, title, subtitle, body, tags)
+        VALUES (new.id * 2, 'post', new.title, new.subtitle, new.content, new.tags);
+    END;
+    CREATE TRIGGER IF NOT EXISTS text_posts_search_update
+    AFTER UPDATE OF title, subtitle, content, tags ON text_posts BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+        INSERT INTO search_index (rowid, kind, title, subtitle, body, tags)
+        VALUES (new.id * 2, 'post', new.title, new.subtitle, new.content, new.tags);
+    END;
+    CREATE TRIGGER IF NOT EXISTS text_posts_search_delete AFTER DELETE ON text_posts BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2;
+    END;
+    CREATE TRIGGER IF NOT EXISTS community_images_search_insert AFTER INSERT ON community_images BEGIN
+        INSERT INTO search_index (rowid, kind, title, subtitle, body, tags)
+        VALUES (new.id * 2 + 1, 'album', new.title, new.caption, new.description, NULL);
+    END;
+    CREATE TRIGGER IF NOT EXISTS community_images_search_update
+    AFTER UPDATE OF title, caption, description ON community_images BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+        INSERT INTO search_index (rowid, kind, title, subtitle, body, tags)
+        VALUES (new.id * 2 + 1, 'album', new.title, new.caption, new.description, NULL);
+    END;
+    CREATE TRIGGER IF NOT EXISTS community_images_search_delete AFTER DELETE ON community_images BEGIN
+        DELETE FROM search_index WHERE rowid = old.id * 2 + 1;
+    END;
+'''
+
+# bm25 column weights: kind, title, subtitle/caption, body, tags
+_SEARCH_WEIGHTS = (0.0, 10.0, 5.0, 1.0, 3.0)
+
+def _create_search_index(conn):
+    """Create the FTS5 search index and its sync triggers, backfilling on first run"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'"
+    ).fetchone()
     
-    # Create community_images table for gallery CRUD
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS community_images (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            caption TEXT,
-            description TEXT,
-            images TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            kind UNINDEXED, title, subtitle, body, tags,
+            prefix = '2 3', tokenize = 'unicode61 remove_diacritics 2'
         )
     ''')
+    conn.executescript(_SEARCH_INDEX_TRIGGERS)
     
-    # Create text_posts table for writing/blog CRUD
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS text_posts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            subtitle TEXT,
-            content TEXT NOT NULL,
-            category TEXT,
-            tags TEXT,
-            reading_time INTEGER,
-            published BOOLEAN DEFAULT 0,
+    if not exists:
+        conn.execute('''
+            INSERT INTO search_index (rowid, kind, title, subtitle, body, tags)
+            SELECT id * 2, 'post', title, subtitle, content, tags FROM text_posts
+        ''')
+        conn.execute('''
+            INSERT INTO search_index (rowid, kind, title, subtitle, body, tags)
+            SELECT id * 2 + 1, 'album', title, caption, description, NULL FROM community_images
+        ''')
+        conn.commit()
+
+# Every row naming an upload in images or community_image_files holds one
+# reference on its blob; a blob whose count reaches zero may be deleted
+_BLOB_REFCOUNT_TRIGGERS = '''
+    CREATE TRIGGER IF NOT EXISTS images_blob_ref AFTER INSERT ON images BEGIN
+        INSERT INTO blobs (filename, ref_count) VALUES (new.filename, 1)
+        ON CONFLICT (filename) DO UPDATE SET ref_count = ref_count + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS images_blob_unref AFTER DELETE ON images BEGIN
+        UPDATE blobs SET ref_count = ref_count - 1 WHERE filename = old.filename;
+    END;
+    CREATE TRIGGER IF NOT EXISTS community_image_files_blob_ref
+    AFTER INSERT ON community_image_files BEGIN
+        INSERT INTO blobs (filename, ref_count) VALUES (new.filename, 1)
+        ON CONFLICT (filename) DO UPDATE SET ref_count = ref_count + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS community_image_files_blob_unref
+    AFTER DELETE ON community_image_files BEGIN
+        UPDATE blobs SET ref_count = ref_count - 1 WHERE filename = old.filename;
+    END;
+'''
+
+def _create_blob_refcounts(conn):
+    """Create the blobs table and its refcount triggers, counting existing references on first run"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blobs'"
+    ).fetchone()
+    
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            filename TEXT PRIMARY KEY,
+            ref_count INTEGER NOT NULL DEFAULT 0,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            width INTEGER,
+            height INTEGER,
+            bytes INTEGER,
+            dominant_color TEXT,
+            placeholder TEXT
         )
     ''')
-    
-    # Seed default user: admin/adminpass123
-    try:
-        password_hash = generate_password_hash('adminpass123')
+    conn.executescript(_BLOB_REFCOUNT_TRIGGERS)
+
+    # Blobs tables created before ingest-time metadata lack its columns
+    for column, column_type in zip(FILE_METADATA_FIELDS,
+                                   ('INTEGER', 'INTEGER', 'INTEGER', 'TEXT', 'TEXT')):
+        if not _column_exists(conn, 'blobs', column):
+            conn.execute(f'ALTER TABLE blobs ADD COLUMN {column} {column_type}')
+
+    if not exists:
+        conn.execute('''
+            INSERT INTO blobs (filename, ref_count)
+            SELECT filename, COUNT(*) FROM (
+                SELECT filename FROM images
+                UNION ALL
+                SELECT filename FROM community_image_files
+            ) GROUP BY filename
+        ''')
+        conn.commit()
+
+def init_db():
+    """Initialize database schema and seed default user"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Create users table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL
+            )
+        ''')
+        
+        # Create images table to store metadata and descriptions
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                description TEXT,
+                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create community_images table for gallery CRUD
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS community_images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                caption TEXT,
+                description TEXT,
+                excerpt TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # One row per file in an album, ordered by position
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS community_image_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                community_image_id INTEGER NOT NULL
+                    REFERENCES community_images (id) ON DELETE CASCADE,
+                filename TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                UNIQUE (community_image_id, position)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_community_image_files_filename
+            ON community_image_files (filename)
+        ''')
+        
+        # Create text_posts table for writing/blog CRUD
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS text_posts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                slug TEXT,
+                title TEXT NOT NULL,
+                subtitle TEXT,
+                content TEXT NOT NULL,
+                category TEXT,
+                tags TEXT,
+                reading_time INTEGER,
+                published BOOLEAN DEFAULT 0,
+                excerpt TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Resumable chunked uploads in progress; the bytes live in a .part file
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                received INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Durable background jobs (see jobs.py); run_at and locked_until are Unix times
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                locked_until REAL,
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs (status, run_at)')
+
+        # Transactional outbox of files whose references were dropped; drained
+        # in batches by the file-deletions job
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_deletion_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Progress and totals of the incremental upload garbage collector
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS gc_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                cursor TEXT,
+                passes_completed INTEGER NOT NULL DEFAULT 0,
+                files_scanned INTEGER NOT NULL DEFAULT 0,
+                files_reclaimed INTEGER NOT NULL DEFAULT 0,
+                bytes_reclaimed INTEGER NOT NULL DEFAULT 0,
+                last_run_at TIMESTAMP,
+                last_pass_finished_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO gc_state (id) VALUES (1)')
+        conn.commit()
+
+        _migrate_community_image_files(conn)
+        _migrate_excerpts(conn)
+        _migrate_slugs(conn)
+        
+        # Composite indexes backing keyset pagination on the list endpoints
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_community_images_created
+            ON community_images (created_at, id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_text_posts_published_created
+            ON text_posts (published, created_at, id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_text_posts_created
+            ON text_posts (created_at, id)
+        ''')
+        # /writing/<slug> lookups; NULLs (none after _migrate_slugs) are not unique-checked
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_text_posts_slug
+            ON text_posts (slug)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_images_uploaded
+            ON images (uploaded_at, id)
+        ''')
+        
+        # Resized variants of an uploaded file, keyed by the source blob
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS image_derivatives (
+                source TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                format TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                bytes INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (source, format, width)
+            )
+        ''')
+        
+        _create_search_index(conn)
+        _create_blob_refcounts(conn)
+        
+        # Single-row counter bumped by every write; caches key on it
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS content_generation (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                epoch TEXT NOT NULL,
+                generation INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP
+            )
+        ''')
+        if not _column_exists(conn, 'content_generation', 'updated_at'):
+            cursor.execute('ALTER TABLE content_generation ADD COLUMN updated_at TIMESTAMP')
         cursor.execute(
-            'INSERT INTO users (username, password_hash) VALUES (?, ?)',
-            ('admin', password_hash)
+            'INSERT OR IGNORE INTO content_generation (id, epoch, generation, updated_at) '
+            'VALUES (1, ?, 0, CURRENT_TIMESTAMP)',
+            (secrets.token_hex(8),)
         )
         conn.commit()
-        print("Database initialized and default user 'admin' created")
-    except sqlite3.IntegrityError:
-        # User already exists
-        print("Database already initialized")
-    
-    conn.close()
+        
+        # Seed default user: admin/adminpass123
+        try:
+            password_hash = generate_password_hash('adminpass123')
+            cursor.execute(
+                'INSERT INTO users (username, password_hash) VALUES (?, ?)',
+                ('admin', password_hash)
+            )
+            conn.commit()
+            print("Database initialized and default user 'admin' created")
+        except sqlite3.IntegrityError:
+            # User already exists
+            conn.rollback()
+            print("Database already initialized")
 
 def verify_user(username, password):
     """Verify user credentials"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        'SELECT id, username, password_hash FROM users WHERE username = ?',
-        (username,)
-    )
-    
-    user_data = cursor.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            'SELECT id, username, password_hash FROM users WHERE username = ?',
+            (username,)
+        )
+        
+        user_data = cursor.fetchone()
     
     if user_data and check_password_hash(user_data['password_hash'], password):
         return User(id=user_data['id'], username=user_data['username'])
@@ -110,215 +926,937 @@ def verify_user(username, password):
 
 def get_user_by_id(user_id):
     """Get user by ID for Flask-Login"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT id, username FROM users WHERE id = ?', (user_id,))
-    user_data = cursor.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT id, username FROM users WHERE id = ?', (user_id,))
+        user_data = cursor.fetchone()
     
     if user_data:
         return User(id=user_data['id'], username=user_data['username'])
     return None
 
-def save_image_metadata(filename, description):
-    """Save image metadata to database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def save_image_metadata(filename, description, require_files=None, file_metadata=None):
+    """Save image metadata to database.
+
+    require_files, if given, is called with the referenced filenames inside the
+    write transaction and should raise if any is missing from storage.
+    file_metadata maps filenames to their analyzed intrinsic metadata.
+    """
+    def operation(conn):
+        conn.execute(
+            'INSERT INTO images (filename, description) VALUES (?, ?)',
+            (filename, description)
+        )
+        if require_files:
+            require_files([filename])
+        _record_file_metadata(conn, file_metadata)
     
-    cursor.execute(
-        'INSERT INTO images (filename, description) VALUES (?, ?)',
-        (filename, description)
-    )
-    conn.commit()
-    conn.close()
+    _run_write(operation)
+
+def _image_from_row(row, srcsets, metadata):
+    """Convert an images row to a dict, adding uploaded_at as a Unix timestamp, srcset and metadata"""
+    image = dict(row)
+    try:
+        uploaded = datetime.strptime(image['uploaded_at'], _TIMESTAMP_FORMAT)
+        image['time'] = uploaded.replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        image['time'] = None
+    image['srcset'] = srcsets.get(image['filename'], {})
+    image['metadata'] = metadata.get(image['filename'], _EMPTY_FILE_METADATA)
+    return image
 
 def get_all_images():
-    """Get all images with metadata"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Get all images with metadata, newest first"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM images ORDER BY uploaded_at DESC, id DESC')
+        rows = cursor.fetchall()
+        filenames = [row['filename'] for row in rows]
+        srcsets = _load_srcsets(cursor, filenames)
+        metadata = _load_file_metadata(cursor, filenames)
     
-    cursor.execute('SELECT * FROM images ORDER BY uploaded_at DESC')
-    images = cursor.fetchall()
-    conn.close()
+    return [_image_from_row(row, srcsets, metadata) for row in rows]
+
+def get_images_page(limit, after=None):
+    """Get one page of uploaded images, newest first.
+
+    Returns (images, next_cursor). Raises ValueError for a malformed cursor.
+    """
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        rows, next_cursor = _fetch_page(
+            cursor, 'SELECT * FROM images WHERE 1', (), limit, after,
+            order_column='uploaded_at'
+        )
+        filenames = [row['filename'] for row in rows]
+        srcsets = _load_srcsets(cursor, filenames)
+        metadata = _load_file_metadata(cursor, filenames)
     
-    return images
+    return [_image_from_row(row, srcsets, metadata) for row in rows], next_cursor
 
-# Community Images CRUD operations
-def create_community_image(title, caption, description, images):
-    """Create a new community image gallery item"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def backfill_image_metadata(files):
+    """Insert images rows for files on disk that no table references yet.
+
+    files is an iterable of (filename, mtime) pairs; the file's mtime becomes
+    its uploaded_at. Files belonging to a community album, and resized
+    variants recorded in image_derivatives, are skipped. Returns the list of
+    filenames added.
+    """
+    files = list(files)
     
-    # Store images as JSON array
-    images_json = json.dumps(images)
+    def operation(conn):
+        known = {row['filename'] for row in conn.execute('SELECT filename FROM images')}
+        known.update(row['filename'] for row in conn.execute('SELECT filename FROM community_image_files'))
+        known.update(row['filename'] for row in conn.execute('SELECT filename FROM image_derivatives'))
+        added = []
+        for filename, mtime in sorted(files, key=lambda item: item[1]):
+            if filename in known:
+                continue
+            uploaded_at = datetime.fromtimestamp(mtime, timezone.utc).strftime(_TIMESTAMP_FORMAT)
+            conn.execute(
+                'INSERT INTO images (filename, description, uploaded_at) VALUES (?, ?, ?)',
+                (filename, '', uploaded_at)
+            )
+            known.add(filename)
+            added.append(filename)
+        return added
     
-    cursor.execute(
-        'INSERT INTO community_images (title, caption, description, images) VALUES (?, ?, ?, ?)',
-        (title, caption, description, images_json)
+    return _run_write(operation)
+
+# Community Images CRUD operations
+def _insert_community_image_files(cursor, image_id, filenames):
+    """Insert an album's files in order"""
+    cursor.executemany(
+        'INSERT INTO community_image_files (community_image_id, filename, position) VALUES (?, ?, ?)',
+        [(image_id, filename, position) for position, filename in enumerate(filenames)]
     )
-    conn.commit()
-    image_id = cursor.lastrowid
-    conn.close()
-    
-    return image_id
 
-def get_all_community_images():
-    """Get all community images"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _attach_community_image_files(cursor, rows, all_albums=False, with_files=True,
+                                   with_srcsets=True, with_metadata=True):
+    """Build album dicts from rows, loading every album's files in one query.
+
+    all_albums skips the id filter when rows already covers the whole table.
+    with_files adds `images` (filenames in order); with_srcsets adds
+    `srcsets`, one {format: srcset} dict per image; with_metadata adds
+    `image_metadata`, one intrinsic metadata dict per image.
+    """
+    albums = [dict(row) for row in rows]
+    if not albums or not (with_files or with_srcsets or with_metadata):
+        return albums
     
-    cursor.execute('SELECT * FROM community_images ORDER BY created_at DESC')
-    rows = cursor.fetchall()
-    conn.close()
+    by_id = {}
+    for album in albums:
+        album['images'] = []
+        by_id[album['id']] = album
     
-    # Convert to list of dicts and parse JSON images
-    images = []
-    for row in rows:
-        img = dict(row)
-        try:
-            img['images'] = json.loads(img['images'])
-        except (json.JSONDecodeError, TypeError) as e:
-            # Handle corrupted JSON data gracefully
-            logger.warning(f"Failed to parse images JSON for item {img.get('id')}: {e}")
-            img['images'] = []
-        images.append(img)
+    if all_albums:
+        cursor.execute(
+            'SELECT community_image_id, filename FROM community_image_files '
+            'ORDER BY community_image_id, position'
+        )
+    else:
+        placeholders = ', '.join('?' * len(by_id))
+        cursor.execute(
+            f'SELECT community_image_id, filename FROM community_image_files '
+            f'WHERE community_image_id IN ({placeholders}) '
+            f'ORDER BY community_image_id, position',
+            list(by_id)
+        )
+    for file_row in cursor.fetchall():
+        album = by_id.get(file_row['community_image_id'])
+        if album is not None:
+            album['images'].append(file_row['filename'])
+    
+    if with_srcsets:
+        srcsets = _load_srcsets(cursor, [name for album in albums for name in album['images']])
+        for album in albums:
+            album['srcsets'] = [srcsets.get(name, {}) for name in album['images']]
+    if with_metadata:
+        metadata = _load_file_metadata(cursor, [name for album in albums for name in album['images']])
+        for album in albums:
+            album['image_metadata'] = [metadata.get(name, _EMPTY_FILE_METADATA)
+                                       for name in album['images']]
+    if not with_files:
+        for album in albums:
+            del album['images']
     
-    return images
+    return albums
+
+def create_community_image(title, caption, description, images, require_files=None,
+                           file_metadata=None):
+    """Create a new community image gallery item"""
+    def operation(conn):
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT INTO community_images (title, caption, description, excerpt) VALUES (?, ?, ?, ?)',
+            (title, caption, description, make_excerpt(description))
+        )
+        image_id = cursor.lastrowid
+        _insert_community_image_files(cursor, image_id, images)
+        if require_files:
+            require_files(images)
+        _record_file_metadata(conn, file_metadata)
+        return image_id
+    
+    return _run_write(operation)
+
+def get_all_community_images(fields=None):
+    """Get all community images, optionally projected to a subset of fields"""
+    columns = _select_list(fields, COMMUNITY_IMAGE_FIELDS)
+    with_files = fields is None or 'images' in fields
+    with_srcsets = fields is None or 'srcsets' in fields
+    with_metadata = fields is None or 'image_metadata' in fields
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(f'SELECT {columns} FROM community_images ORDER BY created_at DESC, id DESC')
+        rows = cursor.fetchall()
+        return _attach_community_image_files(cursor, rows, all_albums=True, with_files=with_files,
+                                             with_srcsets=with_srcsets,
+                                             with_metadata=with_metadata)
+
+def get_community_images_page(limit, after=None, fields=None):
+    """Get one page of community images, newest first.
+
+    Returns (items, next_cursor). Raises ValueError for a malformed cursor
+    or unknown field.
+    """
+    columns = _select_list(fields, COMMUNITY_IMAGE_FIELDS)
+    with_files = fields is None or 'images' in fields
+    with_srcsets = fields is None or 'srcsets' in fields
+    with_metadata = fields is None or 'image_metadata' in fields
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        rows, next_cursor = _fetch_page(
+            cursor, f'SELECT {columns} FROM community_images WHERE 1', (), limit, after
+        )
+        albums = _attach_community_image_files(cursor, rows, with_files=with_files,
+                                               with_srcsets=with_srcsets,
+                                               with_metadata=with_metadata)
+        return albums, next_cursor
 
 def get_community_image_by_id(image_id):
     """Get a single community image by ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM community_images WHERE id = ?', (image_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return _attach_community_image_files(cursor, [row])[0]
+
+def get_community_image_id_for_file(filename):
+    """Return the id of the album that owns a file, or None"""
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            'SELECT community_image_id FROM community_image_files WHERE filename = ? LIMIT 1',
+            (filename,)
+        )
+        row = cursor.fetchone()
     
-    cursor.execute('SELECT * FROM community_images WHERE id = ?', (image_id,))
-    row = cursor.fetchone()
-    conn.close()
+    return row['community_image_id'] if row else None
+
+def update_community_image(image_id, title, caption, description, images, require_files=None,
+                           file_metadata=None, deletion_root=None):
+    """Update an existing community image.
+
+    With deletion_root, files the album no longer uses are queued for
+    deletion from that upload root in the same transaction.
+    """
+    def operation(conn):
+        cursor = conn.cursor()
+        cursor.execute(
+            '''UPDATE community_images 
+               SET title = ?, caption = ?, description = ?, excerpt = ?, 
+                   updated_at = CURRENT_TIMESTAMP 
+               WHERE id = ?''',
+            (title, caption, description, make_excerpt(description), image_id)
+        )
+        if cursor.rowcount == 0:
+            return
+        
+        cursor.execute(
+            'SELECT filename FROM community_image_files WHERE community_image_id = ? ORDER BY position',
+            (image_id,)
+        )
+        current = [row['filename'] for row in cursor.fetchall()]
+        # Only touch the file rows when the list actually changed
+        if current != list(images):
+            cursor.execute('DELETE FROM community_image_files WHERE community_image_id = ?', (image_id,))
+            _insert_community_image_files(cursor, image_id, images)
+            if require_files:
+                require_files(images)
+            _record_file_metadata(conn, file_metadata)
+            if deletion_root:
+                _queue_file_deletions(conn, [name for name in current if name not in images],
+                                      deletion_root)
     
-    if row:
-        img = dict(row)
-        try:
-            img['images'] = json.loads(img['images'])
-        except (json.JSONDecodeError, TypeError) as e:
-            # Handle corrupted JSON data gracefully
-            logger.warning(f"Failed to parse images JSON for item {img.get('id')}: {e}")
-            img['images'] = []
-        return img
-    return None
+    _run_write(operation)
+
+def delete_community_image(image_id, deletion_root=None):
+    """Delete a community image; returns False if it did not exist.
 
-def update_community_image(image_id, title, caption, description, images):
-    """Update an existing community image"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    With deletion_root, its files are queued for deletion from that upload
+    root in the same transaction.
+    """
+    def operation(conn):
+        filenames = [row['filename'] for row in conn.execute(
+            'SELECT filename FROM community_image_files WHERE community_image_id = ?', (image_id,)
+        )]
+        cursor = conn.execute('DELETE FROM community_images WHERE id = ?', (image_id,))
+        if cursor.rowcount and deletion_root:
+            _queue_file_deletions(conn, filenames, deletion_root)
+        return cursor.rowcount > 0
     
-    images_json = json.dumps(images)
+    return _run_write(operation)
+
+def release_files(filenames, remove):
+    """Delete uploads that nothing references any more.
+
+    remove(filename) is called inside the write transaction for each blob whose
+    reference count has dropped to zero (or that was never referenced), so an
+    upload committing a new reference to the same content either lands first
+    and keeps the file, or lands after and finds it gone. Returns the removed
+    filenames.
+    """
+    filenames = list(dict.fromkeys(filenames))
+    if not filenames:
+        return []
     
-    cursor.execute(
-        '''UPDATE community_images 
-           SET title = ?, caption = ?, description = ?, images = ?, 
-               updated_at = CURRENT_TIMESTAMP 
-           WHERE id = ?''',
-        (title, caption, description, images_json, image_id)
+    def operation(conn):
+        return _release_files(conn, filenames, remove)
+    
+    return _run_write(operation)
+
+def _release_files(conn, filenames, remove):
+    removed = []
+    for filename in dict.fromkeys(filenames):
+        row = conn.execute(
+            'SELECT ref_count FROM blobs WHERE filename = ?', (filename,)
+        ).fetchone()
+        if row is not None and row['ref_count'] > 0:
+            continue
+        # <sha>.jpg and <sha>.jpeg name the same bytes and so share variants;
+        # keep a variant while another source still lists it
+        derived = [r['filename'] for r in conn.execute(
+            '''SELECT filename FROM image_derivatives d WHERE source = ?
+               AND NOT EXISTS (SELECT 1 FROM image_derivatives o
+                               WHERE o.filename = d.filename AND o.source != d.source)''',
+            (filename,)
+        )]
+        for derived_filename in derived:
+            remove(derived_filename)
+        remove(filename)
+        conn.execute('DELETE FROM image_derivatives WHERE source = ?', (filename,))
+        conn.execute('DELETE FROM blobs WHERE filename = ?', (filename,))
+        removed.append(filename)
+    return removed
+
+# File deletion outbox. Mutations that drop references record the files here
+# in their own transaction, together with a job that drains the outbox, so a
+# deletion is never lost between the commit and the unlink and the request
+# never waits on the filesystem.
+FILE_DELETION_JOB = 'file-deletions'
+
+def _queue_file_deletions(conn, filenames, root):
+    """Record filenames in the outbox and queue a job to drain it, inside the current transaction"""
+    filenames = list(dict.fromkeys(filenames))
+    if not filenames:
+        return
+    conn.executemany('INSERT INTO file_deletion_outbox (filename) VALUES (?)',
+                     [(filename,) for filename in filenames])
+    _enqueue_jobs(conn, FILE_DELETION_JOB, [{'root': root}])
+
+def queue_file_deletions(filenames, root):
+    """Queue files for deletion outside any other mutation (e.g. cleanup after a failed upload)"""
+    def operation(conn):
+        _queue_file_deletions(conn, filenames, root)
+    
+    _run_write(operation, bumps_content=False)
+
+def process_file_deletions(remove, batch_size=100):
+    """Release one batch of outbox entries; returns how many entries were processed.
+
+    The batch's files are released (deleted if still unreferenced) and its
+    outbox rows removed in a single write transaction.
+    """
+    def operation(conn):
+        rows = conn.execute(
+            'SELECT id, filename FROM file_deletion_outbox ORDER BY id LIMIT ?', (batch_size,)
+        ).fetchall()
+        if not rows:
+            return 0
+        _release_files(conn, [row['filename'] for row in rows], remove)
+        conn.execute('DELETE FROM file_deletion_outbox WHERE id <= ?', (rows[-1]['id'],))
+        return len(rows)
+    
+    return _run_write(operation, bumps_content=False)
+
+def get_file_deletion_backlog():
+    """Number of outbox entries waiting to be processed"""
+    with read_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM file_deletion_outbox').fetchone()[0]
+
+def record_derivatives(source, derivatives):
+    """Store the variants generated for a blob.
+
+    derivatives is a list of (width, format, filename, bytes). Returns False,
+    recording nothing, if the blob has meanwhile lost all its references.
+    """
+    def operation(conn):
+        row = conn.execute('SELECT ref_count FROM blobs WHERE filename = ?', (source,)).fetchone()
+        if row is None or row['ref_count'] <= 0:
+            return False
+        conn.executemany(
+            '''INSERT OR REPLACE INTO image_derivatives (source, width, format, filename, bytes)
+               VALUES (?, ?, ?, ?, ?)''',
+            [(source, width, fmt, filename, size) for width, fmt, filename, size in derivatives]
+        )
+        return True
+    
+    return _run_write(operation)
+
+def get_blobs_without_derivatives():
+    """Referenced blobs that have no derivatives recorded yet"""
+    with read_connection() as conn:
+        rows = conn.execute('''
+            SELECT filename FROM blobs
+            WHERE ref_count > 0
+              AND filename NOT IN (SELECT source FROM image_derivatives)
+            ORDER BY created_at
+        ''').fetchall()
+    return [row['filename'] for row in rows]
+
+def _load_srcsets(cursor, sources):
+    """Map each source filename to {format: srcset string} for its derivatives"""
+    sources = list(dict.fromkeys(sources))
+    rows = []
+    # Batched to stay under SQLite's bound-parameter limit on large listings
+    for start in range(0, len(sources), 500):
+        batch = sources[start:start + 500]
+        placeholders = ', '.join('?' * len(batch))
+        cursor.execute(
+            f'SELECT source, format, width, filename FROM image_derivatives '
+            f'WHERE source IN ({placeholders}) ORDER BY source, format, width',
+            batch
+        )
+        rows.extend(cursor.fetchall())
+    
+    srcsets = {}
+    for row in rows:
+        by_format = srcsets.setdefault(row['source'], {})
+        entry = f"{UPLOAD_URL_PREFIX}{row['filename']} {row['width']}w"
+        by_format[row['format']] = f"{by_format[row['format']]}, {entry}" if row['format'] in by_format else entry
+    return srcsets
+
+def _record_file_metadata(conn, file_metadata):
+    """Store analyzed metadata on the blobs rows of the given files"""
+    if not file_metadata:
+        return
+    assignments = ', '.join(f'{field} = ?' for field in FILE_METADATA_FIELDS)
+    conn.executemany(
+        f'UPDATE blobs SET {assignments} WHERE filename = ?',
+        [tuple(metadata.get(field) for field in FILE_METADATA_FIELDS) + (filename,)
+         for filename, metadata in file_metadata.items()]
     )
-    conn.commit()
-    conn.close()
 
-def delete_community_image(image_id):
-    """Delete a community image"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def record_file_metadata(file_metadata):
+    """Store analyzed metadata for existing blobs, keyed by filename"""
+    def operation(conn):
+        _record_file_metadata(conn, file_metadata)
     
-    cursor.execute('DELETE FROM community_images WHERE id = ?', (image_id,))
-    conn.commit()
-    conn.close()
+    _run_write(operation)
+
+def get_blobs_without_metadata():
+    """Referenced blobs that were never analyzed"""
+    with read_connection() as conn:
+        rows = conn.execute(
+            'SELECT filename FROM blobs WHERE ref_count > 0 AND bytes IS NULL ORDER BY created_at'
+        ).fetchall()
+    return [row['filename'] for row in rows]
+
+def _load_file_metadata(cursor, filenames):
+    """Map each filename to its intrinsic metadata dict"""
+    filenames = list(dict.fromkeys(filenames))
+    columns = ', '.join(FILE_METADATA_FIELDS)
+    metadata = {}
+    # Batched like _load_srcsets
+    for start in range(0, len(filenames), 500):
+        batch = filenames[start:start + 500]
+        placeholders = ', '.join('?' * len(batch))
+        cursor.execute(
+            f'SELECT filename, {columns} FROM blobs WHERE filename IN ({placeholders})',
+            batch
+        )
+        for row in cursor.fetchall():
+            metadata[row['filename']] = {field: row[field] for field in FILE_METADATA_FIELDS}
+    return metadata
+
+# Resumable upload sessions. These are bookkeeping writes: they do not bump
+# the content generation, so chunk traffic leaves cached reads intact.
+def create_upload_session(session_id, user_id, filename, length):
+    """Record a new chunked upload of length bytes"""
+    def operation(conn):
+        conn.execute(
+            'INSERT INTO upload_sessions (id, user_id, filename, length) VALUES (?, ?, ?, ?)',
+            (session_id, user_id, filename, length)
+        )
+
+    _run_write(operation, bumps_content=False)
+
+def get_upload_session(session_id):
+    """Return an upload session as a dict, or None"""
+    with read_connection() as conn:
+        row = conn.execute('SELECT * FROM upload_sessions WHERE id = ?', (session_id,)).fetchone()
+    return dict(row) if row else None
+
+def advance_upload_session(session_id, expected, received):
+    """Move a session's received offset from expected to received.
+
+    Returns False if another request advanced the session first.
+    """
+    def operation(conn):
+        cursor = conn.execute(
+            '''UPDATE upload_sessions SET received = ?, updated_at = CURRENT_TIMESTAMP
+               WHERE id = ? AND received = ?''',
+            (received, session_id, expected)
+        )
+        return cursor.rowcount == 1
+
+    return _run_write(operation, bumps_content=False)
+
+def delete_upload_session(session_id):
+    """Forget an upload session"""
+    def operation(conn):
+        conn.execute('DELETE FROM upload_sessions WHERE id = ?', (session_id,))
+
+    _run_write(operation, bumps_content=False)
+
+def delete_stale_upload_sessions(max_age_seconds):
+    """Delete sessions idle for longer than max_age_seconds; returns their ids"""
+    cutoff = datetime.fromtimestamp(time.time() - max_age_seconds, timezone.utc).strftime(_TIMESTAMP_FORMAT)
+
+    def operation(conn):
+        ids = [row['id'] for row in conn.execute(
+            'SELECT id FROM upload_sessions WHERE updated_at < ?', (cutoff,)
+        )]
+        conn.executemany('DELETE FROM upload_sessions WHERE id = ?', [(i,) for i in ids])
+        return ids
+
+    return _run_write(operation, bumps_content=False)
+
+def get_blob_stats():
+    """Counts of stored blobs and the references held on them"""
+    with read_connection() as conn:
+        row = conn.execute('''
+            SELECT COUNT(*) AS blobs,
+                   COALESCE(SUM(ref_count), 0) AS refs,
+                   COALESCE(SUM(ref_count <= 0), 0) AS unreferenced
+            FROM blobs
+        ''').fetchone()
+    return dict(row)
+
+# Upload garbage collection (see upload_gc.py)
+def _upload_is_referenced(conn, filename):
+    """Whether a stored file is a referenced blob or a derivative of one"""
+    row = conn.execute('''
+        SELECT 1 FROM blobs WHERE filename = ? AND ref_count > 0
+        UNION ALL
+        SELECT 1 FROM image_derivatives d JOIN blobs b ON b.filename = d.source
+        WHERE d.filename = ? AND b.ref_count > 0
+        LIMIT 1
+    ''', (filename, filename)).fetchone()
+    return row is not None
+
+def find_unreferenced_uploads(filenames):
+    """The subset of stored files that no row references"""
+    with read_connection() as conn:
+        return [filename for filename in filenames if not _upload_is_referenced(conn, filename)]
+
+def collect_unreferenced_uploads(filenames, remove):
+    """Delete stored files that no row references, with their bookkeeping rows.
+
+    References are re-checked and remove(filename) called inside the write
+    transaction, as in release_files, so a concurrent upload either commits
+    its reference first or finds the file gone. Returns the removed names.
+    """
+    filenames = list(filenames)
+
+    def operation(conn):
+        removed = []
+        for filename in filenames:
+            if _upload_is_referenced(conn, filename):
+                continue
+            remove(filename)
+            conn.execute('DELETE FROM image_derivatives WHERE filename = ? OR source = ?',
+                         (filename, filename))
+            conn.execute('DELETE FROM blobs WHERE filename = ? AND ref_count <= 0', (filename,))
+            removed.append(filename)
+        return removed
+
+    return _run_write(operation, bumps_content=False)
+
+def get_gc_state():
+    """Scan cursor and running totals of the upload garbage collector"""
+    with read_connection() as conn:
+        row = conn.execute('SELECT * FROM gc_state WHERE id = 1').fetchone()
+    state = dict(row)
+    del state['id']
+    return state
+
+def record_gc_progress(cursor, scanned, reclaimed_files, reclaimed_bytes, pass_finished):
+    """Persist the scan cursor (None restarts the next pass) and add to the totals"""
+    def operation(conn):
+        conn.execute('''
+            UPDATE gc_state
+            SET cursor = ?,
+                files_scanned = files_scanned + ?,
+                files_reclaimed = files_reclaimed + ?,
+                bytes_reclaimed = bytes_reclaimed + ?,
+                passes_completed = passes_completed + ?,
+                last_run_at = CURRENT_TIMESTAMP,
+                last_pass_finished_at = CASE WHEN ? THEN CURRENT_TIMESTAMP
+                                             ELSE last_pass_finished_at END
+            WHERE id = 1
+        ''', (cursor, scanned, reclaimed_files, reclaimed_bytes, int(pass_finished),
+              int(pass_finished)))
+
+    _run_write(operation, bumps_content=False)
+
+# Background jobs. Queue bookkeeping does not bump the content generation;
+# whatever a job changes does so through its own writes.
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+def _enqueue_jobs(conn, kind, payloads, delay=0, max_attempts=5):
+    """Insert queued jobs inside an existing write transaction"""
+    run_at = time.time() + delay
+    ids = []
+    for payload in payloads:
+        cursor = conn.execute(
+            'INSERT INTO jobs (kind, payload, max_attempts, run_at) VALUES (?, ?, ?, ?)',
+            (kind, json.dumps(payload), max_attempts, run_at)
+        )
+        ids.append(cursor.lastrowid)
+    return ids
+
+def enqueue_jobs(kind, payloads, delay=0, max_attempts=5):
+    """Queue one job per payload (JSON-serializable); returns their ids"""
+    payloads = list(payloads)
+
+    def operation(conn):
+        return _enqueue_jobs(conn, kind, payloads, delay, max_attempts)
+
+    return _run_write(operation, bumps_content=False)
+
+def _job_from_row(row):
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    return job
+
+def claim_job(visibility_timeout, job_id=None):
+    """Lease the next due job (or job_id, if due) to the caller.
+
+    A job is due when queued with run_at in the past, or running with an
+    expired lease (its worker died or overran). The lease lasts
+    visibility_timeout seconds and counts as an attempt; jobs whose lease
+    expires on their last attempt are marked failed. Returns the job dict,
+    or None when nothing is due.
+    """
+    def operation(conn):
+        now = time.time()
+        conn.execute(
+            '''UPDATE jobs SET status = 'failed', last_error = 'Lease expired on final attempt',
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE status = 'running' AND locked_until <= ? AND attempts >= max_attempts''',
+            (now,)
+        )
+        query = '''SELECT * FROM jobs
+                   WHERE ((status = 'queued' AND run_at <= ?)
+                          OR (status = 'running' AND locked_until <= ?))'''
+        params = [now, now]
+        if job_id is not None:
+            query += ' AND id = ?'
+            params.append(job_id)
+        row = conn.execute(query + ' ORDER BY run_at, id LIMIT 1', params).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            '''UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ?,
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE id = ?''',
+            (now + visibility_timeout, row['id'])
+        )
+        job = _job_from_row(row)
+        job['attempts'] += 1
+        return job
+
+    return _run_write(operation, bumps_content=False)
+
+def complete_job(job):
+    """Mark a leased job done; a no-op if the lease was lost to another worker"""
+    def operation(conn):
+        conn.execute(
+            '''UPDATE jobs SET status = 'done', locked_until = NULL, last_error = NULL,
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE id = ? AND status = 'running' AND attempts = ?''',
+            (job['id'], job['attempts'])
+        )
+
+    _run_write(operation, bumps_content=False)
+
+def fail_job(job, error, retry_delay, final=False):
+    """Record a failed attempt: requeue after retry_delay, or fail for good on the last attempt or when final"""
+    def operation(conn):
+        conn.execute(
+            '''UPDATE jobs
+               SET status = CASE WHEN ? OR attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                   run_at = ?, locked_until = NULL, last_error = ?, updated_at = CURRENT_TIMESTAMP
+               WHERE id = ? AND status = 'running' AND attempts = ?''',
+            (final, time.time() + retry_delay, error, job['id'], job['attempts'])
+        )
+
+    _run_write(operation, bumps_content=False)
+
+def delete_finished_jobs(max_age_seconds):
+    """Remove done jobs older than max_age_seconds; failed jobs are kept for inspection"""
+    def operation(conn):
+        cursor = conn.execute(
+            "DELETE FROM jobs WHERE status = 'done' AND updated_at < datetime('now', ?)",
+            (f'-{int(max_age_seconds)} seconds',)
+        )
+        return cursor.rowcount
+
+    return _run_write(operation, bumps_content=False)
+
+def has_pending_jobs():
+    """Whether any job is due to run or currently running"""
+    now = time.time()
+    with read_connection() as conn:
+        row = conn.execute(
+            '''SELECT 1 FROM jobs
+               WHERE (status = 'queued' AND run_at <= ?) OR status = 'running' LIMIT 1''',
+            (now,)
+        ).fetchone()
+    return row is not None
+
+def has_queued_job(kind):
+    """Whether a job of this kind is waiting to run (not yet claimed)"""
+    with read_connection() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM jobs WHERE kind = ? AND status = 'queued' LIMIT 1", (kind,)
+        ).fetchone()
+    return row is not None
+
+def get_job_stats():
+    """Job counts by status, the age of the oldest due job and the latest failures"""
+    now = time.time()
+    with read_connection() as conn:
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        for row in conn.execute('SELECT status, COUNT(*) AS count FROM jobs GROUP BY status'):
+            counts[row['status']] = row['count']
+        oldest = conn.execute(
+            "SELECT MIN(run_at) AS run_at FROM jobs WHERE status = 'queued' AND run_at <= ?",
+            (now,)
+        ).fetchone()['run_at']
+        failures = conn.execute(
+            '''SELECT id, kind, attempts, last_error, updated_at FROM jobs
+               WHERE status = 'failed' ORDER BY updated_at DESC, id DESC LIMIT 10'''
+        ).fetchall()
+    return {
+        'counts': counts,
+        'oldest_due_seconds': round(now - oldest, 3) if oldest is not None else None,
+        'recent_failures': [dict(row) for row in failures],
+    }
 
 # Text Posts CRUD operations
-def create_text_post(title, subtitle, content, category, tags, reading_time, published=False):
-    """Create a new text post"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
+def create_text_post(title, subtitle, content, category, tags, reading_time, published=False,
+                     slug=None, created_at=None):
+    """Create a new text post.
+
+    slug defaults to a unique slug derived from the title; an explicit slug
+    raises ValueError if malformed or already used. created_at (a
+    'YYYY-MM-DD HH:MM:SS' string) defaults to now.
+    """
     # Store tags as JSON array if provided
     tags_json = json.dumps(tags) if tags else None
     
-    cursor.execute(
-        '''INSERT INTO text_posts (title, subtitle, content, category, tags, reading_time, published) 
-           VALUES (?, ?, ?, ?, ?, ?, ?)''',
-        (title, subtitle, content, category, tags_json, reading_time, published)
-    )
-    conn.commit()
-    post_id = cursor.lastrowid
-    conn.close()
+    def operation(conn):
+        cursor = conn.cursor()
+        post_slug = _claim_slug(conn, slug) if slug else _unique_slug(conn, title)
+        cursor.execute(
+            '''INSERT INTO text_posts (slug, title, subtitle, content, excerpt, category, tags, reading_time,
+                                     published, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), CURRENT_TIMESTAMP)''',
+            (post_slug, title, subtitle, content, make_excerpt(content), category, tags_json,
+             reading_time, published, created_at)
+        )
+        return cursor.lastrowid
     
-    return post_id
+    return _run_write(operation)
 
-def get_all_text_posts(published_only=False):
-    """Get all text posts"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _text_post_from_row(row):
+    """Convert a text_posts row to a dict with the tags list decoded"""
+    post = dict(row)
+    if 'tags' not in post:
+        return post
+    try:
+        post['tags'] = json.loads(post['tags']) if post['tags'] else []
+    except (json.JSONDecodeError, TypeError) as e:
+        logger.warning(f"Failed to parse tags JSON for post {post.get('id')}: {e}")
+        post['tags'] = []
+    return post
+
+def get_all_text_posts(published_only=False, fields=None):
+    """Get all text posts, optionally projected to a subset of fields"""
+    columns = _select_list(fields, TEXT_POST_FIELDS)
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        if published_only:
+            cursor.execute(f'SELECT {columns} FROM text_posts WHERE published = 1 ORDER BY created_at DESC, id DESC')
+        else:
+            cursor.execute(f'SELECT {columns} FROM text_posts ORDER BY created_at DESC, id DESC')
+        
+        rows = cursor.fetchall()
     
+    return [_text_post_from_row(row) for row in rows]
+
+def get_text_posts_page(limit, after=None, published_only=False, fields=None):
+    """Get one page of text posts, newest first.
+
+    Returns (posts, next_cursor). Raises ValueError for a malformed cursor
+    or unknown field.
+    """
+    columns = _select_list(fields, TEXT_POST_FIELDS)
     if published_only:
-        cursor.execute('SELECT * FROM text_posts WHERE published = 1 ORDER BY created_at DESC')
+        base_query = f'SELECT {columns} FROM text_posts WHERE published = 1'
     else:
-        cursor.execute('SELECT * FROM text_posts ORDER BY created_at DESC')
+        base_query = f'SELECT {columns} FROM text_posts WHERE 1'
     
-    rows = cursor.fetchall()
-    conn.close()
+    with read_connection() as conn:
+        rows, next_cursor = _fetch_page(conn.cursor(), base_query, (), limit, after)
     
-    # Convert to list of dicts and parse JSON tags
-    posts = []
-    for row in rows:
-        post = dict(row)
-        try:
-            post['tags'] = json.loads(post['tags']) if post['tags'] else []
-        except (json.JSONDecodeError, TypeError) as e:
-            logger.warning(f"Failed to parse tags JSON for post {post.get('id')}: {e}")
-            post['tags'] = []
-        posts.append(post)
-    
-    return posts
+    return [_text_post_from_row(row) for row in rows], next_cursor
 
 def get_text_post_by_id(post_id):
     """Get a single text post by ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM text_posts WHERE id = ?', (post_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM text_posts WHERE id = ?', (post_id,))
+        row = cursor.fetchone()
     
     if row:
-        post = dict(row)
-        try:
-            post['tags'] = json.loads(post['tags']) if post['tags'] else []
-        except (json.JSONDecodeError, TypeError) as e:
-            logger.warning(f"Failed to parse tags JSON for post {post.get('id')}: {e}")
-            post['tags'] = []
-        return post
+        return _text_post_from_row(row)
     return None
 
-def update_text_post(post_id, title, subtitle, content, category, tags, reading_time, published):
-    """Update an existing text post"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def get_text_post_by_slug(slug):
+    """Get a single text post by its slug"""
+    with read_connection() as conn:
+        row = conn.execute('SELECT * FROM text_posts WHERE slug = ?', (slug,)).fetchone()
     
+    if row:
+        return _text_post_from_row(row)
+    return None
+
+def update_text_post(post_id, title, subtitle, content, category, tags, reading_time, published,
+                     slug=None):
+    """Update an existing text post; slug=None keeps the current slug"""
     tags_json = json.dumps(tags) if tags else None
     
-    cursor.execute(
-        '''UPDATE text_posts 
-           SET title = ?, subtitle = ?, content = ?, category = ?, tags = ?, 
-               reading_time = ?, published = ?, updated_at = CURRENT_TIMESTAMP 
-           WHERE id = ?''',
-        (title, subtitle, content, category, tags_json, reading_time, published, post_id)
-    )
-    conn.commit()
-    conn.close()
+    def operation(conn):
+        if slug is not None:
+            _claim_slug(conn, slug, post_id)
+        conn.execute(
+            '''UPDATE text_posts 
+               SET slug = COALESCE(?, slug), title = ?, subtitle = ?, content = ?, excerpt = ?,
+                   category = ?, tags = ?, reading_time = ?, published = ?,
+                   updated_at = CURRENT_TIMESTAMP 
+               WHERE id = ?''',
+            (slug, title, subtitle, content, make_excerpt(content), category, tags_json,
+             reading_time, published, post_id)
+        )
+    
+    _run_write(operation)
 
 def delete_text_post(post_id):
     """Delete a text post"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    def operation(conn):
+        conn.execute('DELETE FROM text_posts WHERE id = ?', (post_id,))
     
-    cursor.execute('DELETE FROM text_posts WHERE id = ?', (post_id,))
-    conn.commit()
-    conn.close()
+    _run_write(operation)
+
+# Full-text search
+_SEARCH_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_HIGHLIGHT_OPEN = '\x02'
+_HIGHLIGHT_CLOSE = '\x03'
+
+def _build_match_query(query):
+    """Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    Words are quoted so FTS5 operators in user input are treated as text.
+    """
+    tokens = _SEARCH_TOKEN_RE.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def _highlight_to_html(text):
+    """Escape FTS5 highlight output and turn the markers into <mark> tags"""
+    if not text:
+        return ''
+    return (html.escape(text)
+            .replace(_HIGHLIGHT_OPEN, '<mark>')
+            .replace(_HIGHLIGHT_CLOSE, '</mark>'))
+
+def search_content(query, limit, after=None, published_only=True):
+    """Search text posts and community images, best match first.
+
+    Returns (results, next_cursor). Each result has type ('post' or 'album'),
+    id, and HTML-safe title_html/snippet_html with matches wrapped in <mark>.
+    Raises ValueError for a malformed cursor.
+    """
+    match = _build_match_query(query)
+    if not match:
+        return [], None
+    
+    offset = 0
+    if after:
+        offset = _decode_cursor(after)
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError('Invalid cursor')
+    
+    sql = f'''
+        SELECT s.rowid AS rowid, s.kind AS kind,
+               highlight(search_index, 1, ?, ?) AS title_html,
+               snippet(search_index, 3, ?, ?, '…', 16) AS snippet_html
+        FROM search_index s
+        LEFT JOIN text_posts p ON s.kind = 'post' AND p.id = s.rowid / 2
+        WHERE search_index MATCH ?
+          {"AND (s.kind = 'album' OR p.published = 1)" if published_only else ""}
+        ORDER BY bm25(search_index, {", ".join(str(w) for w in _SEARCH_WEIGHTS)})
+        LIMIT ? OFFSET ?
+    '''
+    markers = (_HIGHLIGHT_OPEN, _HIGHLIGHT_CLOSE) * 2
+    
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        # Fetch one extra row to learn whether another page exists
+        cursor.execute(sql, (*markers, match, limit + 1, offset))
+        rows = cursor.fetchall()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(offset + limit)
+    
+    results = [{
+        'type': row['kind'],
+        'id': row['rowid'] // 2,
+        'title_html': _highlight_to_html(row['title_html']),
+        'snippet_html': _highlight_to_html(row['snippet_html']),
+    } for row in rows]
+    return results, next_cursor
@@ -0,0 +1,155 @@
+"""
+Server-side rendering of the home, gallery and article pages.
+
+The htdocs pages stay plain HTML that fetch their content from the API, so
+they keep working when served as static files. When the app serves them it
+fills the regions between <!-- ssr:NAME --> and <!-- /ssr:NAME --> markers
+with the markup the page scripts would otherwise build; the scripts see the
+data-ssr attribute on the rendered elements and only attach their handlers.
+
+Each item's fragment is cached in a ResponseCache under (kind, id), with a
+digest of the item as its generation. Editing a row, or recording its
+derivatives or metadata, changes the digest, so the stale fragment is
+dropped on the next render while fragments of untouched items are reused.
+
+Articles (/writing/<slug>) are whole pages rendered from templates/article.html
+by the app; this module only supplies their paragraphs and related-post count.
+"""
+import hashlib
+import json
+import re
+
+from jinja2 import Environment
+
+# Index page: how many published posts the writing preview lists
+INDEX_POST_COUNT = 3
+# Article page: how many other posts "More Writing" links to
+RELATED_POST_COUNT = 3
+# Cards are one grid column: full width on phones, at most ~400px otherwise
+THUMBNAIL_SIZES = '(max-width: 640px) 100vw, 400px'
+
+_env = Environment(autoescape=True, trim_blocks=True, lstrip_blocks=True)
+
+_SOURCES = '''\
+{% for format in ('avif', 'webp') if srcset and srcset[format] %}
+<source type="image/{{ format }}" srcset="{{ srcset[format] }}" sizes="{{ sizes }}">
+{% endfor %}
+'''
+
+_ALBUM_CARD = _env.from_string('''\
+{% set thumbnail = album.images[0] %}
+{% set metadata = (album.image_metadata or [{}])[0] or {} %}
+<div class="album-card" data-ssr data-images='{{ album.images|tojson }}' data-metadata='{{ (album.image_metadata or [])|tojson }}' style="cursor: pointer; transition: transform 0.3s;" onmouseover="this.style.transform='translateY(-4px)'" onmouseout="this.style.transform='translateY(0)'">
+  <div style="aspect-ratio: 1; overflow: hidden; border-radius: 8px; margin-bottom: 1rem; {{ placeholder_style(metadata) }}">
+    <picture>
+      {% with srcset = (album.srcsets or [{}])[0], sizes = sizes %}''' + _SOURCES + '''{% endwith %}
+      <img src="/static/uploads/{{ thumbnail }}" alt="{{ album.title }}"{% if metadata.width and metadata.height %} width="{{ metadata.width }}" height="{{ metadata.height }}"{% endif %} onload="this.closest('div').style.background = ''" loading="lazy" decoding="async" style="width: 100%; height: 100%; object-fit: cover;">
+    </picture>
+  </div>
+  <h3 style="margin: 0 0 0.5rem 0; color: var(--accent); font-size: 1.2rem;">{{ album.title }}</h3>
+  {% if album.caption %}
+  <p style="margin: 0 0 0.5rem 0; color: var(--ink); font-style: italic; font-size: 0.95rem;">{{ album.caption }}</p>
+  {% endif %}
+  {% if album.excerpt %}
+  <p style="margin: 0; color: var(--muted); font-size: 0.9rem;">{{ album.excerpt }}</p>
+  {% endif %}
+  <div style="margin-top: 0.75rem; font-size: 0.85rem; color: var(--muted);">
+    {{ album.images|length }} image{{ 's' if album.images|length > 1 }}
+  </div>
+</div>
+''')
+
+_NO_ALBUMS = ('<p data-ssr style="grid-column: 1 / -1; color: var(--muted); text-align: center; '
+              'padding: 4rem;">There are no photo albums to display yet.</p>')
+
+_IMAGE_CARD = _env.from_string('''\
+{% set metadata = image.metadata or {} %}
+<div class="work-card" data-ssr style="padding:0;overflow:hidden;grid-column:span 1;">
+  <div style="aspect-ratio:1;overflow:hidden;{% if metadata.dominant_color %}background:{{ metadata.dominant_color }}{% if metadata.placeholder %} url('{{ metadata.placeholder }}') center/cover no-repeat{% endif %};{% endif %}">
+    <picture>
+      {% with srcset = image.srcset, sizes = sizes %}''' + _SOURCES + '''{% endwith %}
+      <img src="{{ image.url }}" alt="Community Upload"{% if metadata.width %} width="{{ metadata.width }}" height="{{ metadata.height }}"{% endif %} onload="this.closest('div').style.background=''" loading="lazy" decoding="async" style="width:100%;height:100%;object-fit:cover;transition:transform .3s" onmouseover="this.style.transform='scale(1.05)'" onmouseout="this.style.transform='scale(1)'">
+    </picture>
+  </div>
+</div>
+''')
+
+_POST_PREVIEW = _env.from_string('''\
+<article data-ssr style="margin-top:1.5rem">
+  <div class="work-meta">{{ (post.created_at or '')[:10] }}{% if post.reading_time %} • {{ post.reading_time }} min read{% endif %}</div>
+  <h4 style="margin:.25rem 0"><a href="/writing/{{ post.slug }}" style="text-decoration:none;color:inherit">{{ post.title }}</a></h4>
+  {% if post.subtitle %}
+  <p style="color:var(--accent);font-size:.9rem;margin:.25rem 0;font-style:italic">{{ post.subtitle }}</p>
+  {% endif %}
+  {% if post.excerpt %}
+  <p class="excerpt">{{ post.excerpt }}</p>
+  {% endif %}
+</article>
+''')
+
+
+def placeholder_style(metadata):
+    """Dominant colour and blurred preview shown behind an image until it loads"""
+    layers = []
+    if metadata.get('placeholder'):
+        layers.append(f"url('{metadata['placeholder']}') center / cover no-repeat")
+    if metadata.get('dominant_color'):
+        layers.append(metadata['dominant_color'])
+    return f"background: {', '.join(layers)};" if layers else ''
+
+
+def _item_digest(item):
+    encoded = json.dumps(item, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _render_items(kind, items, template, cache, **context):
+    """Render each item through its cached fragment, re-rendering only changed items"""
+    fragments = []
+    for item in items:
+        key = (kind, item['id'])
+        version = _item_digest(item)
+        fragment = cache.get(key, version)
+        if fragment is None:
+            fragment = template.render(context, **{kind: item})
+            cache.put(key, version, fragment)
+        fragments.append(fragment)
+    return ''.join(fragments)
+
+
+def render_albums(albums, cache):
+    """Gallery grid cards for community image albums"""
+    albums = [album for album in albums if album.get('images')]
+    if not albums:
+        return _NO_ALBUMS
+    return _render_items('album', albums, _ALBUM_CARD, cache,
+                         sizes=THUMBNAIL_SIZES, placeholder_style=placeholder_style)
+
+
+def render_images(images, cache):
+    """Home page community grid cards for uploaded images (image_listing_entry dicts)"""
+    return _render_items('image', images, _IMAGE_CARD, cache, sizes=THUMBNAIL_SIZES)
+
+
+def render_posts(posts, cache):
+    """Home page writing preview entries for published text posts"""
+    return _render_items('post', posts, _POST_PREVIEW, cache)
+
+
+def paragraphs(text):
+    """Split post content into paragraphs at blank lines"""
+    blocks = re.split(r'\n\s*\n', (text or '').replace('\r\n', '\n'))
+    return [block.strip() for block in blocks if block.strip()]
+
+
+def fill_regions(shell, regions):
+    """Replace the content between each <!-- ssr:NAME --> marker pair with regions[NAME].
+
+    Markers are kept, so a page can be filled again; names without a marker
+    pair in the shell are ignored.
+    """
+    for name, html in regions.items():
+        pattern = re.compile(rf'(<!-- ssr:{re.escape(name)} -->).*?(<!-- /ssr:{re.escape(name)} -->)',
+                             re.DOTALL)
+        shell = pattern.sub(lambda match: match.group(1) + html + match.group(2), shell, count=1)
+    return shell
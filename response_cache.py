@@ -0,0 +1,77 @@
+"""
+Bounded in-process LRU cache for serialized API responses.
+
+Entries are stored together with the content generation they were rendered
+at (see models.get_content_generation); a lookup under a different
+generation is a miss and drops the stale entry, so invalidation needs no
+coordination between gunicorn workers.
+"""
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Thread-safe LRU of response bodies bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'evictions': 0,
+            'stores': 0,
+        }
+
+    def get(self, key, generation):
+        """Return the cached body for key at this generation, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            entry_generation, body = entry
+            if entry_generation != generation:
+                self._remove(key)
+                self._stats['stale'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return body
+
+    def put(self, key, generation, body):
+        """Store a body, evicting least recently used entries to stay in bounds"""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (generation, body)
+            self._bytes += len(body)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return a snapshot of cache counters and size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        return stats
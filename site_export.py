@@ -0,0 +1,202 @@
+"""
+Static export of the public site, for nginx to serve without the app.
+
+`flask export-site` writes what an anonymous visitor can fetch (the rendered
+home, gallery and article pages, the listing APIs and every published post
+and album as JSON) under an output directory, mirroring the URL layout:
+/gallery becomes gallery.html, /writing/cloud-farm becomes
+writing/cloud-farm.html, /api/text-posts/3 becomes
+api/text-posts/3.json and ?view=summary listings get a .summary.json suffix.
+
+Outputs are produced by requesting their URLs through the app's own test
+client, so they are byte-identical to what the app would send; pages the
+app sends straight from htdocs are copied from the file instead, and empty
+or offloaded responses are never written. Each output
+is recorded in a manifest with the version of the rows it was built from:
+a digest of the post or album row (which covers its updated_at, and for
+albums the srcsets and metadata recorded after it), for listings a digest
+of their items plus the htdocs page they fill, and for article pages the
+digests of the post and the posts it links. updated_at alone has
+one-second resolution, so an edit in the same second as the previous one
+would otherwise be missed. Later runs rebuild only outputs whose version
+changed and delete outputs whose row is gone or unpublished. When an export
+folder is configured the app queues an incremental run after each content
+write.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import compression
+import pages
+from models import get_all_community_images, get_all_images, get_all_text_posts
+
+logger = logging.getLogger(__name__)
+
+JOB_KIND = 'site-export'
+# Pages the app sends straight from htdocs; they are copied from the file, since
+# with STATIC_OFFLOAD set the app's response is an empty redirect to nginx
+HTDOCS_PAGES = {'/writing': 'writing.html'}
+# Headers of a response whose body the front-end server is meant to fill in
+OFFLOAD_HEADERS = ('X-Accel-Redirect', 'X-Sendfile')
+MANIFEST_NAME = '.export-manifest.json'
+
+_export_lock = threading.Lock()
+
+
+def output_path(url):
+    """Relative output file for an exported URL"""
+    path, _, query = url.partition('?')
+    if query not in ('', 'view=summary'):
+        raise ValueError(f'Cannot export query string: {query}')
+    base = path.strip('/') or 'index'
+    if not path.startswith('/api/'):
+        return f'{base}.html'
+    return f'{base}.summary.json' if query else f'{base}.json'
+
+
+def _digest(value):
+    encoded = json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _shell_version(htdocs, name):
+    try:
+        return os.stat(os.path.join(htdocs, name)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def plan(htdocs):
+    """Map each URL to export onto the version of the content it is built from"""
+    published = get_all_text_posts(published_only=True)
+    posts = {post['id']: _digest(post) for post in published}
+    albums = {album['id']: _digest(album) for album in get_all_community_images()}
+    images = _digest(get_all_images())
+    post_list = _digest(sorted(posts.items()))
+    album_list = _digest(sorted(albums.items()))
+
+    targets = {
+        '/': _digest([images, post_list, _shell_version(htdocs, 'index.html')]),
+        '/gallery': _digest([album_list, _shell_version(htdocs, 'gallery.html')]),
+        '/api/images': images,
+        '/api/text-posts': post_list,
+        '/api/text-posts?view=summary': post_list,
+        '/api/community-images': album_list,
+        '/api/community-images?view=summary': album_list,
+    }
+    for url, name in HTDOCS_PAGES.items():
+        targets[url] = _shell_version(htdocs, name)
+    for post_id, version in posts.items():
+        targets[f'/api/text-posts/{post_id}'] = version
+    # Article pages also link the latest other posts under "More Writing"
+    latest = [post['id'] for post in published[:pages.RELATED_POST_COUNT + 1]]
+    for post in published:
+        related = [other for other in latest if other != post['id']][:pages.RELATED_POST_COUNT]
+        targets[f'/writing/{post["slug"]}'] = _digest([posts[other] for other in [post['id']] + related])
+    for album_id, version in albums.items():
+        targets[f'/api/community-images/{album_id}'] = version
+    return targets
+
+
+def _write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.export-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _load_manifest(output):
+    try:
+        with open(os.path.join(output, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (ValueError, OSError) as e:
+        logger.warning(f"Unreadable export manifest, rebuilding everything: {e}")
+        return {}
+
+
+def _remove_output(output, relpath):
+    path = os.path.join(output, relpath)
+    for candidate in [path] + [path + suffix for suffix in compression.SUFFIXES.values()]:
+        try:
+            os.remove(candidate)
+        except FileNotFoundError:
+            pass
+
+
+def _fetch(client, htdocs, url):
+    """Body to export for url and None, or None and why it cannot be exported"""
+    if url in HTDOCS_PAGES:
+        try:
+            with open(os.path.join(htdocs, HTDOCS_PAGES[url]), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None, 'missing from htdocs'
+    else:
+        response = client.get(url)
+        if response.status_code != 200:
+            return None, f'status {response.status_code}'
+        offloaded = [header for header in OFFLOAD_HEADERS if header in response.headers]
+        if offloaded:
+            return None, f'body offloaded with {offloaded[0]}'
+        data = response.get_data()
+    if not data:
+        return None, 'empty body'
+    return data, None
+
+
+def export_site(app, output, htdocs, full=False):
+    """Bring the export under output up to date; returns counts of written, unchanged and removed files.
+
+    With full=True every output is rebuilt regardless of the manifest.
+    """
+    with _export_lock:
+        manifest = {} if full else _load_manifest(output)
+        targets = plan(htdocs)
+        client = app.test_client()
+        exported = {}
+        report = {'written': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+        # A fresh app context, so a login cached on g by the request or job
+        # that triggered the export does not leak into what anonymous users get
+        with app.app_context():
+            for url, version in targets.items():
+                relpath = output_path(url)
+                path = os.path.join(output, relpath)
+                if manifest.get(relpath) == version and os.path.exists(path):
+                    exported[relpath] = version
+                    report['unchanged'] += 1
+                    continue
+                data, problem = _fetch(client, htdocs, url)
+                if problem:
+                    # Left to the app; a stale copy must not shadow it
+                    logger.warning(f"Export of {url} skipped: {problem}")
+                    _remove_output(output, relpath)
+                    report['failed'] += 1
+                    continue
+                _write_file(path, data)
+                exported[relpath] = version
+                report['written'] += 1
+
+        for relpath in manifest.keys() - exported.keys():
+            _remove_output(output, relpath)
+            report['removed'] += 1
+
+        _write_file(os.path.join(output, MANIFEST_NAME),
+                    json.dumps(exported, sort_keys=True, indent=1).encode('utf-8'))
+        compression.precompress_tree(output)
+    return report
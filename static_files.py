@@ -0,0 +1,206 @@
+"""
+Serving files from htdocs for the routes that reach Flask.
+
+nginx serves /static/ itself, but the page routes, the catch-all route and
+the error pages go through the app. How their bytes are sent is chosen with
+the STATIC_OFFLOAD setting:
+
+- sendfile (default): the app sends the file. With a StaticFileCache the
+  body comes from memory (small files) or a shared memory map (large ones)
+  with a content-hash ETag; without one, gunicorn's file wrapper uses
+  sendfile(2) so the bytes are not copied through Python
+- x-accel: an empty response with X-Accel-Redirect pointing at an internal
+  nginx location (X_ACCEL_PREFIX) that maps onto htdocs
+- x-sendfile: an X-Sendfile header with the absolute path, for Apache
+  mod_xsendfile or lighttpd
+
+Offloading is only used for 200 responses; error pages are always sent by
+the app, since the front-end server would answer them with its own status.
+
+Files the app sends itself are swapped for a precompressed .br/.gz sibling
+(see compression.py) when the client accepts that encoding.
+"""
+import hashlib
+import mimetypes
+import mmap
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from flask import Response, request
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+import compression
+
+OFFLOAD_MODES = ('sendfile', 'x-accel', 'x-sendfile')
+# Chunk size when streaming a memory-mapped file
+MAPPED_CHUNK_SIZE = 256 * 1024
+
+# body is bytes, or an mmap for files above the cache's max_file_size
+StaticFile = namedtuple('StaticFile', 'body etag mtime_ns size mimetype')
+
+
+class StaticFileCache:
+    """Thread-safe LRU of files under htdocs, revalidated against mtime and size.
+
+    Files up to max_file_size are held in memory, bounded by max_entries and
+    max_bytes. Larger files are memory-mapped instead (bounded by
+    max_mapped), so their pages are shared with the OS page cache. Each
+    file's ETag is a hash of its content, computed once when it is loaded.
+    Every lookup stats the file, so an edited file is reloaded on its next
+    request.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024,
+                 max_file_size=512 * 1024, max_mapped=64):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.max_mapped = max_mapped
+        self._entries = OrderedDict()
+        self._mapped = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'evictions': 0,
+        }
+
+    def get(self, full_path):
+        """Return the StaticFile for an absolute path, loading it if absent or changed"""
+        stat = os.stat(full_path)
+        with self._lock:
+            entries = self._entries if full_path in self._entries else self._mapped
+            entry = entries.get(full_path)
+            if entry is not None:
+                if (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                    entries.move_to_end(full_path)
+                    self._stats['hits'] += 1
+                    return entry
+                self._remove(full_path)
+                self._stats['stale'] += 1
+            self._stats['misses'] += 1
+
+        entry = self._load(full_path)
+        with self._lock:
+            if full_path in self._entries or full_path in self._mapped:
+                self._remove(full_path)
+            self._store(full_path, entry)
+        return entry
+
+    def _load(self, full_path):
+        mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        with open(full_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if 0 < stat.st_size and stat.st_size > self.max_file_size:
+                # The mapping stays valid after the file object is closed; it
+                # is unmapped when the last response streaming it lets go
+                body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                body = f.read()
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        return StaticFile(body, etag, stat.st_mtime_ns, stat.st_size, mimetype)
+
+    def _store(self, full_path, entry):
+        if isinstance(entry.body, mmap.mmap):
+            self._mapped[full_path] = entry
+            while len(self._mapped) > self.max_mapped:
+                self._mapped.popitem(last=False)
+                self._stats['evictions'] += 1
+            return
+        if entry.size > self.max_bytes:
+            return
+        self._entries[full_path] = entry
+        self._bytes += entry.size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+
+    def _remove(self, full_path):
+        if full_path in self._entries:
+            self._bytes -= self._entries.pop(full_path).size
+        else:
+            self._mapped.pop(full_path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._mapped.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return a snapshot of cache counters and size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            stats['mapped'] = len(self._mapped)
+        return stats
+
+
+def _iter_mapped(mapped):
+    for start in range(0, len(mapped), MAPPED_CHUNK_SIZE):
+        yield mapped[start:start + MAPPED_CHUNK_SIZE]
+
+
+def _cached_response(entry, status):
+    """Response for a cached file; 200s honour If-None-Match and If-Modified-Since"""
+    if isinstance(entry.body, mmap.mmap):
+        response = Response(_iter_mapped(entry.body), status=status, mimetype=entry.mimetype,
+                            direct_passthrough=True)
+        response.content_length = entry.size
+    else:
+        response = Response(entry.body, status=status, mimetype=entry.mimetype)
+    if status != 200:
+        return response
+    response.set_etag(entry.etag)
+    response.last_modified = datetime.fromtimestamp(entry.mtime_ns / 1e9, timezone.utc)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def resolve(root, path):
+    """Absolute path of a file under root, or raise NotFound"""
+    full = safe_join(root, path)
+    if full is None or not os.path.isfile(full):
+        raise NotFound()
+    return full
+
+
+def send_static_file(root, path, mode='sendfile', accel_prefix='/_htdocs/', status=200,
+                     cache=None):
+    """Response for the file at path under root, using the given offload mode and cache"""
+    full = resolve(root, path)
+    if mode == 'x-accel' and status == 200:
+        response = Response(mimetype=mimetypes.guess_type(full)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = accel_prefix + quote(path.replace(os.sep, '/'))
+        return response
+    if cache is not None and (mode == 'sendfile' or status != 200):
+        try:
+            entry = cache.get(full)
+            variants = compression.fresh_variants(full, entry.mtime_ns)
+            encoding = compression.negotiate(request.accept_encodings, variants)
+            if encoding is not None:
+                # The sibling's ETag differs from the identity body's, as it must
+                entry = cache.get(full + compression.SUFFIXES[encoding])._replace(
+                    mimetype=entry.mimetype)
+        except FileNotFoundError:
+            raise NotFound()
+        response = _cached_response(entry, status)
+        if variants:
+            response.vary.add('Accept-Encoding')
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    response = send_file(full, request.environ, conditional=status == 200,
+                         use_x_sendfile=mode == 'x-sendfile' and status == 200)
+    response.status_code = status
+    return response
@@ -0,0 +1,175 @@
+"""
+Content-addressed upload storage.
+
+Files are named by the SHA-256 of their bytes and sharded into two levels of
+hash-prefix directories (ab/cd/abcd....png), so no directory grows beyond a
+few entries and identical uploads map to the same file. The extension is
+canonicalised (lowercase, jpeg -> jpg) so the name a client gave the file
+does not split identical bytes into separate blobs. Paths handed out by
+BlobStore are relative to the upload root and are what the database stores;
+they are also valid under /static/uploads/ URLs.
+"""
+import hashlib
+import os
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+INCOMING_DIR = '.incoming'
+_HEX_DIGITS = frozenset('0123456789abcdef')
+# Spellings of one format that must map to the same blob name
+EXTENSION_ALIASES = {'jpeg': 'jpg'}
+
+
+def canonical_extension(ext):
+    """Lowercase file extension with aliases folded onto one spelling"""
+    ext = ext.lower().lstrip('.')
+    return EXTENSION_ALIASES.get(ext, ext)
+
+
+def _is_shard_name(name):
+    return len(name) == 2 and set(name) <= _HEX_DIGITS
+
+
+def _sorted_entries(path, want_dirs):
+    try:
+        entries = [entry for entry in os.scandir(path) if entry.is_dir() == want_dirs]
+    except FileNotFoundError:
+        return []
+    return sorted(entries, key=lambda entry: entry.name)
+
+
+class BlobStore:
+    """Save, look up and remove content-addressed files under a root directory"""
+
+    def __init__(self, root):
+        self.root = root
+
+    @staticmethod
+    def relative_path(digest, ext):
+        """Sharded relative path for a SHA-256 hex digest"""
+        return f"{digest[:2]}/{digest[2:4]}/{digest}.{canonical_extension(ext)}"
+
+    def path(self, relpath):
+        """Absolute path for a stored relative path, refusing to leave the root"""
+        root = os.path.abspath(self.root)
+        full = os.path.abspath(os.path.join(root, relpath))
+        if os.path.commonpath([root, full]) != root:
+            raise ValueError(f"Invalid upload path: {relpath}")
+        return full
+
+    def save(self, stream, ext):
+        """Store a readable binary stream; returns (relpath, created).
+
+        The body is hashed while it is spooled to a temp file inside the root,
+        then moved into place atomically. If a file with the same content
+        already exists the temp file is discarded and created is False.
+        """
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.incoming_dir())
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+            return self._place(temp_path, digest.hexdigest(), ext)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def adopt(self, temp_path, ext):
+        """Move a complete file from incoming_dir() into the store; returns (relpath, created)"""
+        digest = hashlib.sha256()
+        with open(temp_path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return self._place(temp_path, digest.hexdigest(), ext)
+
+    def _place(self, temp_path, digest, ext):
+        relpath = self.relative_path(digest, ext)
+        final = self.path(relpath)
+        if os.path.exists(final):
+            os.remove(temp_path)
+            # Refresh the mtime so the garbage collector's grace period covers
+            # the reference about to be committed to this existing file
+            os.utime(final)
+            return relpath, False
+
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(temp_path, final)
+        return relpath, True
+
+    def incoming_dir(self):
+        """Scratch directory for partial files, on the same filesystem as the store"""
+        incoming = os.path.join(self.root, INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        return incoming
+
+    def exists(self, relpath):
+        return os.path.exists(self.path(relpath))
+
+    def require(self, relpaths):
+        """Raise FileNotFoundError unless every path is present on disk"""
+        for relpath in relpaths:
+            if not self.exists(relpath):
+                raise FileNotFoundError(f"Upload {relpath} is missing from storage")
+
+    def remove(self, relpath):
+        """Delete a stored file; a file that is already gone is not an error"""
+        try:
+            os.remove(self.path(relpath))
+        except FileNotFoundError:
+            pass
+
+    def iter_files(self):
+        """Yield (relpath, mtime) for every stored file, flat legacy names included"""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root and INCOMING_DIR in dirnames:
+                dirnames.remove(INCOMING_DIR)
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                relpath = os.path.relpath(full, self.root).replace(os.sep, '/')
+                yield relpath, os.path.getmtime(full)
+
+    def iter_flat(self, after=None):
+        """Yield (name, size, mtime) for files directly under the root, in name order"""
+        for entry in _sorted_entries(self.root, want_dirs=False):
+            if after and entry.name <= after:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            yield entry.name, stat.st_size, stat.st_mtime
+
+    def iter_sharded(self, after=None):
+        """Yield (relpath, size, mtime) for files in the hash-sharded layout, in path order.
+
+        Only ab/cd/ shard directories are visited, so legacy files elsewhere
+        under the root are never listed. With after, iteration resumes just
+        past that relative path without listing the shards before it.
+        """
+        after_first, after_second = (after[:2], after[3:5]) if after else ('', '')
+        for first in _sorted_entries(self.root, want_dirs=True):
+            if not _is_shard_name(first.name) or first.name < after_first:
+                continue
+            for second in _sorted_entries(first.path, want_dirs=True):
+                if not _is_shard_name(second.name):
+                    continue
+                if (first.name, second.name) < (after_first, after_second):
+                    continue
+                for entry in _sorted_entries(second.path, want_dirs=False):
+                    relpath = f'{first.name}/{second.name}/{entry.name}'
+                    if after and relpath <= after:
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield relpath, stat.st_size, stat.st_mtime
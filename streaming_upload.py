@@ -0,0 +1,174 @@
+"""
+Limits enforced while a multipart upload is being parsed.
+
+Werkzeug asks the request for a stream to write each uploaded file into as it
+reads the body. UploadRequest hands back a guarded stream that counts bytes
+and sniffs the first ones, so an oversized, mislabelled or surplus file stops
+the parse right there instead of after the whole body has been received and
+spooled to disk.
+"""
+import io
+from flask import Request
+from werkzeug.exceptions import BadRequest
+
+# Enough leading bytes to tell the supported formats apart
+SNIFF_BYTES = 16
+
+_IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+# Extensions whose content must carry the matching signature
+IMAGE_TYPES = ('png', 'jpg', 'gif', 'webp')
+
+# Documents, archives, executables, scripts and markup (HTML, SVG, XML)
+_FOREIGN_SIGNATURES = (b'%PDF', b'PK\x03\x04', b'\x7fELF', b'MZ', b'#!', b'<')
+
+
+def sniff_image_type(head):
+    """Name the format a file's leading bytes belong to.
+
+    Returns 'png', 'jpg', 'gif' or 'webp', 'foreign' for a recognized
+    non-image format, or None when the bytes carry no known signature.
+    """
+    for signature, kind in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    stripped = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    if any(stripped.startswith(signature) for signature in _FOREIGN_SIGNATURES):
+        return 'foreign'
+    return None
+
+
+def _could_start(head, ext):
+    """Whether head, shorter than SNIFF_BYTES, is consistent with an ext signature"""
+    if ext == 'webp':
+        return b'RIFF'.startswith(head[:4]) and b'WEBP'.startswith(head[8:12])
+    return any(signature.startswith(head) or head.startswith(signature)
+               for signature, kind in _IMAGE_SIGNATURES if kind == ext)
+
+
+def signature_error(filename, head, partial=False):
+    """Explain why head cannot start a file named filename, or return None.
+
+    A file named as an image must start with that format's signature;
+    another format, a known non-image format or no recognizable signature is
+    an error. With partial=True, head is the first part of a file still
+    being received, and one too short to sniff only has to be consistent
+    with the expected signature so far.
+    """
+    ext = filename.rsplit('.', 1)[-1].lower()
+    if ext == 'jpeg':
+        ext = 'jpg'
+    kind = sniff_image_type(head)
+    if kind == ext:
+        return None
+    if kind is None and ext not in IMAGE_TYPES:
+        return None
+    if kind is None and partial and len(head) < SNIFF_BYTES and _could_start(head, ext):
+        return None
+    return f'File {filename} content does not match its type'
+
+
+class UploadRejected(BadRequest):
+    """An uploaded file broke a limit; description is the client-facing message"""
+
+
+class _DiscardStream(io.BytesIO):
+    """Swallows a file the endpoint will ignore anyway"""
+
+    def write(self, data):
+        return len(data)
+
+
+class _GuardedFileStream:
+    """Wraps Werkzeug's spool file, checking size and signature as data arrives"""
+
+    def __init__(self, stream, filename, max_size):
+        self._stream = stream
+        self._filename = filename
+        self._max_size = max_size
+        self._size = 0
+        self._head = b''
+        self._sniffed = False
+
+    def _sniff(self):
+        self._sniffed = True
+        error = signature_error(self._filename, self._head)
+        if error:
+            raise UploadRejected(error)
+
+    def write(self, data):
+        self._size += len(data)
+        if self._size > self._max_size:
+            raise UploadRejected(
+                f'File {self._filename} exceeds {self._max_size // (1024 * 1024)}MB limit'
+            )
+        if not self._sniffed:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+        return self._stream.write(data)
+
+    def seek(self, *args):
+        # The parser rewinds a file once it is complete; short files are sniffed here
+        if not self._sniffed:
+            self._sniff()
+        return self._stream.seek(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __iter__(self):
+        return iter(self._stream)
+
+
+class UploadLimits:
+    """Per-request rules for the files in a multipart body.
+
+    is_allowed(filename) decides acceptable extensions. Files that fail it
+    are rejected with invalid_type_error (formatted with filename), or
+    silently discarded when invalid_type_error is None.
+    """
+
+    def __init__(self, max_file_size, max_files, is_allowed, invalid_type_error):
+        self.max_file_size = max_file_size
+        self.max_files = max_files
+        self.is_allowed = is_allowed
+        self.invalid_type_error = invalid_type_error
+        self.files = 0
+
+    def open_file(self, filename, open_spool):
+        if not filename:
+            return _DiscardStream()
+        if not self.is_allowed(filename):
+            if self.invalid_type_error is None:
+                return _DiscardStream()
+            raise UploadRejected(self.invalid_type_error.format(filename=filename))
+        self.files += 1
+        if self.files > self.max_files:
+            plural = 's' if self.max_files != 1 else ''
+            raise UploadRejected(f'Maximum {self.max_files} image{plural} allowed')
+        return _GuardedFileStream(open_spool(), filename, self.max_file_size)
+
+
+class UploadRequest(Request):
+    """Request that applies upload_limits, when set, to each file as it is parsed"""
+
+    upload_limits = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        if self.upload_limits is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return self.upload_limits.open_file(
+            filename,
+            lambda: super(UploadRequest, self)._get_file_stream(
+                total_content_length, content_type, filename, content_length
+            )
+        )
@@ -1,3 +1,4 @@
+import io
 import os
 import sys
 import pytest
@@ -7,6 +8,9 @@ import tempfile
 # This is a common pattern for test discovery in Flask applications
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Run background jobs synchronously so tests see their effects immediately
+os.environ.setdefault('TINYRISKS_JOB_WORKER', 'inline')
+
 from app import app as flask_app
 
 @pytest.fixture
@@ -41,6 +45,7 @@ def app():
     yield flask_app
 
     # Restore original paths and cleanup
+    models.close_db_connections()
     app_module.UPLOAD_FOLDER = original_upload_folder
     models.DATABASE_PATH = original_db_path
 
@@ -70,3 +75,34 @@ def logged_in_client(client):
         'password': 'adminpass123'
     })
     return client
+
+# Leading bytes of each image format, so test bodies pass the upload signature check
+PNG = b'\x89PNG\r\n\x1a\n'
+JPEG = b'\xff\xd8\xff\xe0'
+GIF = b'GIF89a'
+WEBP = b'RIFF\x00\x00\x00\x00WEBP'
+IMAGE_HEADERS = {'png': PNG, 'jpg': JPEG, 'jpeg': JPEG, 'gif': GIF, 'webp': WEBP}
+
+
+def image_bytes(name, data=b'image'):
+    """data prefixed with the signature matching name's extension"""
+    return IMAGE_HEADERS[name.rsplit('.', 1)[-1].lower()] + data
+
+@pytest.fixture
+def create_album():
+    """Create a community image album through the API and return its JSON.
+
+    contents are the files' bytes, uploaded after the signature of their
+    format as photo0.png, photo1.png, ... unless names are given; with names
+    alone every file gets the same bytes.
+    """
+    def create(client, title='Album', contents=None, names=None, **fields):
+        if contents is None:
+            contents = [b'image'] * (len(names) if names else 1)
+        names = names or [f'photo{index}.png' for index in range(len(contents))]
+        return client.post('/api/community-images', data={
+            'title': title,
+            **fields,
+            'images': [(io.BytesIO(image_bytes(name, data)), name) for data, name in zip(contents, names)]
+        }, content_type='multipart/form-data').get_json()
+    return create
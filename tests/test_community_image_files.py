@@ -0,0 +1,98 @@
+"""
+Test cases for the community_image_files child table and its migration.
+"""
+import json
+import sqlite3
+
+
+class TestCommunityImageFiles:
+    """Test cases for album file storage."""
+
+    def test_files_keep_upload_order(self, logged_in_client, create_album):
+        """Test that album files come back in the order they were uploaded."""
+        created = create_album(logged_in_client, 'Ordered', names=['a.png', 'b.jpg', 'c.gif'])
+
+        album = logged_in_client.get(f"/api/community-images/{created['id']}").get_json()
+        assert album['images'] == created['images']
+        assert [name.rsplit('.', 1)[1] for name in album['images']] == ['png', 'jpg', 'gif']
+
+    def test_delete_cascades_to_files(self, logged_in_client, create_album):
+        """Test that deleting an album removes its file rows."""
+        import models
+
+        created = create_album(logged_in_client, 'Doomed', names=['a.png', 'b.png'])
+        logged_in_client.delete(f"/api/community-images/{created['id']}")
+
+        with models.db_connection() as conn:
+            count = conn.execute(
+                'SELECT COUNT(*) FROM community_image_files WHERE community_image_id = ?',
+                (created['id'],)
+            ).fetchone()[0]
+        assert count == 0
+
+    def test_owner_lookup_by_filename(self, logged_in_client, create_album):
+        """Test finding the album that owns a file."""
+        import models
+
+        created = create_album(logged_in_client, 'Owner', names=['a.png'])
+        filename = created['images'][0]
+
+        assert models.get_community_image_id_for_file(filename) == created['id']
+        assert models.get_community_image_id_for_file('missing.png') is None
+
+    def test_list_attaches_files_per_album(self, logged_in_client, client, create_album):
+        """Test that list responses attach the right files to each album."""
+        first = create_album(logged_in_client, 'First', names=['a.png'])
+        second = create_album(logged_in_client, 'Second', names=['b.png', 'c.png'])
+
+        albums = {album['id']: album for album in client.get('/api/community-images').get_json()}
+        assert albums[first['id']]['images'] == first['images']
+        assert albums[second['id']]['images'] == second['images']
+
+
+class TestLegacyJsonMigration:
+    """Test cases for migrating the legacy images JSON column."""
+
+    def test_init_db_migrates_json_column(self, app, tmp_path):
+        """Test that init_db moves JSON file lists into community_image_files."""
+        import models
+
+        legacy_path = str(tmp_path / 'legacy.db')
+        conn = sqlite3.connect(legacy_path)
+        conn.execute('''
+            CREATE TABLE community_images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                caption TEXT,
+                description TEXT,
+                images TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute(
+            'INSERT INTO community_images (title, images) VALUES (?, ?)',
+            ('Legacy', json.dumps(['one.png', 'two.png']))
+        )
+        conn.execute(
+            'INSERT INTO community_images (title, images) VALUES (?, ?)',
+            ('Corrupt', 'not json')
+        )
+        conn.commit()
+        conn.close()
+
+        saved_path = models.DATABASE_PATH
+        models.DATABASE_PATH = legacy_path
+        try:
+            models.init_db()
+            # Second run must be a no-op
+            models.init_db()
+
+            albums = {album['title']: album for album in models.get_all_community_images()}
+            assert albums['Legacy']['images'] == ['one.png', 'two.png']
+            assert albums['Corrupt']['images'] == []
+
+            with models.db_connection() as conn:
+                assert not models._column_exists(conn, 'community_images', 'images')
+        finally:
+            models.DATABASE_PATH = saved_path
@@ -3,6 +3,8 @@ Test cases for community image CRUD functionality.
 """
 import io
 
+from tests.conftest import PNG, JPEG
+
 
 class TestCommunityImageCRUD:
     """Test cases for community image CRUD operations."""
@@ -22,8 +24,8 @@ class TestCommunityImageCRUD:
             'caption': 'Test Caption',
             'description': 'Test Description',
             'images': [
-                (io.BytesIO(b'test image 1'), 'test1.png'),
-                (io.BytesIO(b'test image 2'), 'test2.jpg')
+                (io.BytesIO(PNG + b'test image 1'), 'test1.png'),
+                (io.BytesIO(JPEG + b'test image 2'), 'test2.jpg')
             ]
         }
         
@@ -40,7 +42,7 @@ class TestCommunityImageCRUD:
         """Test that creating community images requires authentication."""
         data = {
             'title': 'Test Gallery',
-            'images': [(io.BytesIO(b'test image'), 'test.png')]
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
         }
         
         response = client.post('/api/community-images',
@@ -52,7 +54,7 @@ class TestCommunityImageCRUD:
         """Test that title is required."""
         data = {
             'caption': 'Caption without title',
-            'images': [(io.BytesIO(b'test image'), 'test.png')]
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
         }
         
         response = logged_in_client.post('/api/community-images',
@@ -79,7 +81,7 @@ class TestCommunityImageCRUD:
         """Test that maximum 9 images are allowed."""
         data = {
             'title': 'Test Gallery',
-            'images': [(io.BytesIO(b'test image'), f'test{i}.png') for i in range(10)]
+            'images': [(io.BytesIO(PNG + b'test image'), f'test{i}.png') for i in range(10)]
         }
         
         response = logged_in_client.post('/api/community-images',
@@ -93,7 +95,7 @@ class TestCommunityImageCRUD:
     def test_create_community_image_file_size_limit(self, logged_in_client):
         """Test 20MB file size limit."""
         # Create a file larger than 20MB
-        large_file = io.BytesIO(b'x' * (21 * 1024 * 1024))
+        large_file = io.BytesIO(PNG + b'x' * (21 * 1024 * 1024))
         data = {
             'title': 'Test Gallery',
             'images': [(large_file, 'large.png')]
@@ -112,7 +114,7 @@ class TestCommunityImageCRUD:
         # Create a community image first
         data = {
             'title': 'Test Gallery 1',
-            'images': [(io.BytesIO(b'test image'), 'test.png')]
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
         }
         logged_in_client.post('/api/community-images',
                              data=data,
@@ -132,7 +134,7 @@ class TestCommunityImageCRUD:
         data = {
             'title': 'Test Gallery',
             'caption': 'Test Caption',
-            'images': [(io.BytesIO(b'test image'), 'test.png')]
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
         }
         create_response = logged_in_client.post('/api/community-images',
                                                data=data,
@@ -156,7 +158,7 @@ class TestCommunityImageCRUD:
         # Create a community image
         data = {
             'title': 'Original Title',
-            'images': [(io.BytesIO(b'test image'), 'test.png')]
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
         }
         create_response = logged_in_client.post('/api/community-images',
                                                data=data,
@@ -188,7 +190,7 @@ class TestCommunityImageCRUD:
         # Create a community image
         data = {
             'title': 'To Delete',
-            'images': [(io.BytesIO(b'test image'), 'test.png')]
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
         }
         create_response = logged_in_client.post('/api/community-images',
                                                data=data,
@@ -0,0 +1,156 @@
+"""
+Test cases for precompressed htdocs files and compressed JSON responses.
+"""
+import gzip
+import os
+
+import pytest
+
+
+@pytest.fixture
+def htdocs(app, tmp_path, monkeypatch):
+    """Point HTDOCS_FOLDER at a scratch copy with a compressible page"""
+    import app as app_module
+
+    (tmp_path / '404.html').write_bytes(b'<p>missing</p>')
+    (tmp_path / 'page.html').write_bytes(b'<p>tiny risks</p>' * 200)
+    monkeypatch.setattr(app_module, 'HTDOCS_FOLDER', str(tmp_path))
+    return tmp_path
+
+
+class TestPrecompress:
+    """Test cases for the compress-static build step."""
+
+    def test_writes_fresh_siblings(self, htdocs):
+        """Test that compressible files get .gz siblings carrying their mtime."""
+        import compression
+
+        report = compression.precompress_tree(str(htdocs), encodings=('gzip',))
+
+        variant = htdocs / 'page.html.gz'
+        assert report['written'] == 1
+        assert gzip.decompress(variant.read_bytes()) == (htdocs / 'page.html').read_bytes()
+        assert os.stat(variant).st_mtime_ns == os.stat(htdocs / 'page.html').st_mtime_ns
+        # Below MIN_SIZE: not worth a sibling
+        assert not (htdocs / '404.html.gz').exists()
+
+    def test_second_run_is_incremental(self, htdocs):
+        """Test that unchanged files are skipped and edited ones rebuilt."""
+        import compression
+
+        compression.precompress_tree(str(htdocs), encodings=('gzip',))
+        assert compression.precompress_tree(str(htdocs), encodings=('gzip',))['fresh'] == 1
+
+        (htdocs / 'page.html').write_bytes(b'<p>edited</p>' * 200)
+        os.utime(htdocs / 'page.html', ns=(0, 10 ** 18))
+
+        report = compression.precompress_tree(str(htdocs), encodings=('gzip',))
+        assert report['written'] == 1
+        assert gzip.decompress((htdocs / 'page.html.gz').read_bytes()).startswith(b'<p>edited')
+
+    def test_orphaned_and_excluded(self, htdocs):
+        """Test that siblings of deleted files go and excluded directories are skipped."""
+        import compression
+
+        uploads = htdocs / 'uploads'
+        uploads.mkdir()
+        (uploads / 'notes.txt').write_bytes(b'x' * 4096)
+        (htdocs / 'gone.css.gz').write_bytes(b'stale')
+
+        report = compression.precompress_tree(str(htdocs), encodings=('gzip',), exclude=[str(uploads)])
+
+        assert report['removed'] == 1
+        assert not (uploads / 'notes.txt.gz').exists()
+
+    def test_command(self, app, htdocs):
+        """Test that the CLI command reports what it wrote."""
+        result = app.test_cli_runner().invoke(args=['compress-static'])
+
+        assert 'Wrote' in result.output
+        assert (htdocs / 'page.html.gz').exists()
+
+
+class TestNegotiation:
+    """Test cases for serving precompressed htdocs files."""
+
+    def test_serves_gzip_variant(self, client, htdocs):
+        """Test that a client accepting gzip gets the sibling with its own ETag."""
+        import compression
+
+        compression.precompress_tree(str(htdocs), encodings=('gzip',))
+        plain = client.get('/page.html')
+
+        response = client.get('/page.html', headers={'Accept-Encoding': 'gzip, deflate'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'text/html'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == plain.data
+        assert response.headers['ETag'] != plain.headers['ETag']
+
+    def test_identity_without_accept_encoding(self, client, htdocs):
+        """Test that clients not accepting gzip, or refusing it, get the original."""
+        import compression
+
+        compression.precompress_tree(str(htdocs), encodings=('gzip',))
+
+        for headers in ({}, {'Accept-Encoding': 'gzip;q=0'}):
+            response = client.get('/page.html', headers=headers)
+            assert 'Content-Encoding' not in response.headers
+            assert response.data.startswith(b'<p>tiny risks')
+
+    def test_stale_variant_ignored(self, client, htdocs):
+        """Test that a sibling older than its source is not served."""
+        import compression
+
+        compression.precompress_tree(str(htdocs), encodings=('gzip',))
+        os.utime(htdocs / 'page.html', ns=(0, 10 ** 18))
+
+        response = client.get('/page.html', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+
+
+class TestJSONCompression:
+    """Test cases for compressing API responses on the fly."""
+
+    def _create_posts(self, client, count):
+        for i in range(count):
+            client.post('/api/text-posts', json={
+                'title': f'Post {i}', 'content': 'Words ' * 50, 'published': True
+            })
+
+    def test_large_json_gzipped(self, logged_in_client):
+        """Test that a large listing is gzipped, keeps a weak ETag and still revalidates."""
+        self._create_posts(logged_in_client, 10)
+        plain = logged_in_client.get('/api/text-posts')
+
+        response = logged_in_client.get('/api/text-posts', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.data) == plain.data
+        assert response.headers['ETag'] == 'W/' + plain.headers['ETag']
+        revalidated = logged_in_client.get('/api/text-posts', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']
+        })
+        assert revalidated.status_code == 304
+
+    def test_compressed_once_per_version(self, logged_in_client):
+        """Test that repeat requests reuse the compressed body."""
+        import app as app_module
+
+        self._create_posts(logged_in_client, 10)
+        before = app_module.compressed_cache.stats()
+        for _ in range(3):
+            logged_in_client.get('/api/text-posts', headers={'Accept-Encoding': 'gzip'})
+
+        stats = app_module.compressed_cache.stats()
+        assert stats['misses'] - before['misses'] == 1
+        assert stats['hits'] - before['hits'] == 2
+
+    def test_small_json_left_alone(self, client):
+        """Test that bodies under the threshold are sent uncompressed."""
+        response = client.get('/api/text-posts', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+        assert 'Accept-Encoding' in response.headers['Vary']
@@ -0,0 +1,85 @@
+"""
+Test cases for ETag conditional GET support on the JSON API.
+"""
+from datetime import datetime, timedelta, timezone
+
+
+class TestConditionalGet:
+    """Test cases for 304 handling on cached read endpoints."""
+
+    def test_validators_present(self, client):
+        """Test that JSON reads carry a strong ETag and no second-resolution Last-Modified."""
+        response = client.get('/api/community-images')
+        assert response.status_code == 200
+        etag, weak = response.get_etag()
+        assert etag and not weak
+        assert response.last_modified is None
+        assert 'no-cache' in response.headers['Cache-Control']
+
+    def test_if_none_match_returns_304(self, client):
+        """Test that a matching ETag yields an empty 304."""
+        etag = client.get('/api/text-posts').get_etag()[0]
+
+        response = client.get('/api/text-posts', headers={'If-None-Match': f'"{etag}"'})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.get_etag()[0] == etag
+
+    def test_etag_changes_after_write(self, logged_in_client):
+        """Test that writes invalidate previously issued ETags."""
+        etag = logged_in_client.get('/api/text-posts').get_etag()[0]
+        logged_in_client.post('/api/text-posts', json={'title': 'T', 'content': 'C'})
+
+        response = logged_in_client.get('/api/text-posts', headers={'If-None-Match': f'"{etag}"'})
+        assert response.status_code == 200
+        assert response.get_etag()[0] != etag
+
+    def test_etag_differs_per_query_and_route(self, logged_in_client):
+        """Test that different representations get different ETags."""
+        post_id = logged_in_client.post('/api/text-posts', json={
+            'title': 'T', 'content': 'C', 'published': True
+        }).get_json()['id']
+
+        etags = {
+            logged_in_client.get('/api/text-posts').get_etag()[0],
+            logged_in_client.get('/api/text-posts?view=summary').get_etag()[0],
+            logged_in_client.get(f'/api/text-posts/{post_id}').get_etag()[0],
+        }
+        assert len(etags) == 3
+
+    def test_if_modified_since_ignored(self, logged_in_client):
+        """Test that If-Modified-Since cannot hide a write made in the same second."""
+        logged_in_client.post('/api/text-posts', json={'title': 'First', 'content': 'C'})
+        now = datetime.now(timezone.utc) + timedelta(seconds=5)
+        logged_in_client.post('/api/text-posts', json={'title': 'Second', 'content': 'C'})
+
+        response = logged_in_client.get('/api/text-posts', headers={
+            'If-Modified-Since': now.strftime('%a, %d %b %Y %H:%M:%S GMT')
+        })
+        assert response.status_code == 200
+        assert len(response.get_json()) == 2
+
+    def test_if_none_match_takes_precedence(self, client):
+        """Test that a mismatched ETag wins over a satisfied If-Modified-Since."""
+        future = (datetime.now(timezone.utc) + timedelta(days=1)).strftime('%a, %d %b %Y %H:%M:%S GMT')
+        response = client.get('/api/community-images', headers={
+            'If-None-Match': '"stale"',
+            'If-Modified-Since': future,
+        })
+        assert response.status_code == 200
+
+    def test_detail_route_304(self, logged_in_client, client):
+        """Test conditional requests on a detail route."""
+        post_id = logged_in_client.post('/api/text-posts', json={
+            'title': 'T', 'content': 'C', 'published': True
+        }).get_json()['id']
+
+        etag = client.get(f'/api/text-posts/{post_id}').get_etag()[0]
+        response = client.get(f'/api/text-posts/{post_id}', headers={'If-None-Match': f'"{etag}"'})
+        assert response.status_code == 304
+
+    def test_errors_have_no_etag(self, client):
+        """Test that 404s are not given validators."""
+        response = client.get('/api/community-images/999')
+        assert response.status_code == 404
+        assert response.get_etag() == (None, None)
@@ -0,0 +1,140 @@
+"""
+Test cases for the pooled SQLite connection layer in models.py.
+"""
+import sqlite3
+import threading
+
+import pytest
+
+
+class TestConnectionPool:
+    """Test cases for per-thread connection reuse."""
+
+    def test_connection_reused_within_thread(self, app):
+        """Test that repeated borrows on one thread share a connection."""
+        import models
+
+        with models.db_connection() as first:
+            pass
+        with models.db_connection() as second:
+            pass
+        assert first is second
+
+    def test_threads_get_separate_connections(self, app):
+        """Test that each thread gets its own connection."""
+        import models
+
+        seen = []
+
+        def borrow():
+            with models.db_connection() as conn:
+                seen.append(id(conn))
+
+        with models.db_connection() as main_conn:
+            pass
+        worker = threading.Thread(target=borrow)
+        worker.start()
+        worker.join()
+
+        assert seen and seen[0] != id(main_conn)
+
+    def test_pragmas_applied(self, app):
+        """Test that WAL and foreign keys are enabled on pooled connections."""
+        import models
+
+        with models.db_connection() as conn:
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+
+    def test_failed_write_is_rolled_back(self, app):
+        """Test that an exception mid-transaction does not leak the write."""
+        import models
+
+        with pytest.raises(sqlite3.IntegrityError):
+            with models.db_connection() as conn:
+                conn.execute(
+                    'INSERT INTO images (filename, description) VALUES (?, ?)',
+                    ('orphan.png', '')
+                )
+                conn.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)',
+                             ('admin', 'duplicate'))
+
+        with models.db_connection() as conn:
+            assert not conn.in_transaction
+            count = conn.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+        assert count == 0
+        assert models.get_pool_stats()['rollbacks'] >= 1
+
+    def test_database_path_change_reconnects(self, app, tmp_path):
+        """Test that repointing DATABASE_PATH opens a fresh connection."""
+        import models
+
+        with models.db_connection() as original:
+            pass
+
+        saved_path = models.DATABASE_PATH
+        models.DATABASE_PATH = str(tmp_path / 'other.db')
+        try:
+            with models.db_connection() as other:
+                assert other is not original
+        finally:
+            models.DATABASE_PATH = saved_path
+
+
+class TestReadOnlyConnections:
+    """Test cases for the read-only connection path."""
+
+    def test_read_connection_rejects_writes(self, app):
+        """Test that read connections cannot write."""
+        import models
+
+        with pytest.raises(sqlite3.OperationalError):
+            with models.read_connection() as conn:
+                conn.execute("INSERT INTO images (filename) VALUES ('nope.png')")
+
+    def test_read_connection_pragmas(self, app):
+        """Test that read connections are query_only with cache and mmap tuned."""
+        import models
+
+        with models.read_connection() as conn:
+            assert conn.execute('PRAGMA query_only').fetchone()[0] == 1
+            assert conn.execute('PRAGMA mmap_size').fetchone()[0] == models.READ_MMAP_SIZE
+            assert conn.execute('PRAGMA cache_size').fetchone()[0] == -models.READ_CACHE_SIZE_KIB
+
+    def test_getters_use_read_pool(self, app):
+        """Test that get_* functions go through the read-only pool."""
+        import models
+
+        models.get_all_text_posts()
+        before = models.get_read_pool_stats()
+        models.get_all_text_posts()
+        models.get_all_community_images()
+        after = models.get_read_pool_stats()
+        assert after['reused'] - before['reused'] == 2
+
+    def test_reads_see_committed_writes(self, app):
+        """Test that the read path observes writes committed by the writer."""
+        import models
+
+        models.get_all_text_posts()
+        post_id = models.create_text_post('Fresh', None, 'Body', None, [], 1, True)
+        assert models.get_text_post_by_id(post_id)['title'] == 'Fresh'
+
+
+class TestStatsEndpoint:
+    """Test cases for the /api/stats endpoint."""
+
+    def test_stats_requires_auth(self, client):
+        """Test that stats are not public."""
+        response = client.get('/api/stats')
+        assert response.status_code in [302, 401]
+
+    def test_stats_reports_pool(self, logged_in_client):
+        """Test that pool counters are reported."""
+        response = logged_in_client.get('/api/stats')
+        assert response.status_code == 200
+        pool = response.get_json()['db_pool']
+        assert pool['opened'] >= 1
+        assert pool['reused'] >= 1
+        assert 'open_connections' in pool
+        assert 'db_read_pool' in response.get_json()
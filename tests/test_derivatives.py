@@ -0,0 +1,187 @@
+"""
+Test cases for the background image derivative pipeline.
+"""
+import io
+import os
+
+import pytest
+
+from tests.conftest import PNG
+
+
+def _fake_generate(store, source):
+    """Stand-in for Pillow: writes two small WebP variants"""
+    import derivatives
+
+    results = []
+    for width in (320, 640):
+        filename = derivatives.derivative_name(source, width, 'webp')
+        with open(store.path(filename), 'wb') as f:
+            f.write(b'webp' * width)
+        results.append((width, 'webp', filename, width * 4))
+    return results
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    import derivatives
+
+    monkeypatch.setattr(derivatives, 'available_formats', lambda: ('webp',))
+    monkeypatch.setattr(derivatives, 'generate_derivatives', _fake_generate)
+    return derivatives
+
+
+class TestDerivativePipeline:
+    """Test cases for generating, exposing and removing derivatives."""
+
+    def test_srcsets_empty_without_pillow(self, logged_in_client, client, monkeypatch, create_album):
+        """Test that without an encoder nothing is scheduled and srcsets stay empty."""
+        import derivatives
+        import jobs
+
+        monkeypatch.setattr(derivatives, 'available_formats', lambda: ())
+        created = create_album(logged_in_client, contents=[b'one', b'two'])
+        jobs.wait_until_idle(timeout=10)
+
+        album = client.get(f"/api/community-images/{created['id']}").get_json()
+        assert album['srcsets'] == [{}, {}]
+
+    def test_album_exposes_srcsets(self, logged_in_client, client, fake_pipeline, create_album):
+        """Test that generated variants show up as srcset strings after upload."""
+        import jobs
+
+        created = create_album(logged_in_client)
+        jobs.wait_until_idle(timeout=10)
+
+        album = client.get(f"/api/community-images/{created['id']}").get_json()
+        base = created['images'][0].rsplit('.', 1)[0]
+        assert album['srcsets'] == [{
+            'webp': f'/static/uploads/{base}-320w.webp 320w, /static/uploads/{base}-640w.webp 640w'
+        }]
+
+        summary = client.get('/api/community-images?view=summary').get_json()
+        assert summary[0]['srcsets'] == album['srcsets']
+
+    def test_srcsets_projection(self, logged_in_client, client, fake_pipeline, create_album):
+        """Test selecting srcsets without the image list."""
+        import jobs
+
+        create_album(logged_in_client)
+        jobs.wait_until_idle(timeout=10)
+
+        items = client.get('/api/community-images?fields=srcsets').get_json()
+        assert 'images' not in items[0]
+        assert 'webp' in items[0]['srcsets'][0]
+
+    def test_single_upload_exposes_srcset(self, logged_in_client, client, fake_pipeline):
+        """Test that /api/images entries carry a srcset after upload."""
+        import jobs
+
+        logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(PNG + b'single image'), 'photo.png')
+        }, content_type='multipart/form-data')
+        jobs.wait_until_idle(timeout=10)
+
+        images = client.get('/api/images').get_json()
+        assert images[0]['srcset']['webp'].endswith('640w')
+
+    def test_release_removes_derivatives(self, logged_in_client, fake_pipeline, create_album):
+        """Test that deleting the last reference removes the variants as well."""
+        import app as app_module
+        import jobs
+        import models
+
+        created = create_album(logged_in_client)
+        jobs.wait_until_idle(timeout=10)
+        base = created['images'][0].rsplit('.', 1)[0]
+        variant = os.path.join(app_module.UPLOAD_FOLDER, f'{base}-320w.webp')
+        assert os.path.exists(variant)
+
+        logged_in_client.delete(f"/api/community-images/{created['id']}")
+
+        assert not os.path.exists(variant)
+        with models.db_connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM image_derivatives').fetchone()[0] == 0
+
+    def test_shared_variants_survive_release(self, app):
+        """Test that releasing <sha>.jpeg keeps variants still listed for <sha>.jpg."""
+        import models
+
+        digest = 'ab' * 32
+        variant = f'{digest}-320w.webp'
+        with models.db_connection() as conn:
+            conn.executemany('INSERT INTO blobs (filename, ref_count) VALUES (?, 1)',
+                             [(f'{digest}.jpg',), (f'{digest}.jpeg',)])
+            conn.commit()
+        for source in (f'{digest}.jpg', f'{digest}.jpeg'):
+            assert models.record_derivatives(source, [(320, 'webp', variant, 10)])
+        with models.db_connection() as conn:
+            conn.execute('UPDATE blobs SET ref_count = 0 WHERE filename = ?', (f'{digest}.jpeg',))
+            conn.commit()
+
+        removed = []
+        models.release_files([f'{digest}.jpeg'], removed.append)
+
+        assert removed == [f'{digest}.jpeg']
+        with models.db_connection() as conn:
+            rows = conn.execute('SELECT source FROM image_derivatives WHERE filename = ?',
+                                (variant,)).fetchall()
+        assert [row['source'] for row in rows] == [f'{digest}.jpg']
+
+    def test_variants_for_deleted_image_discarded(self, app, fake_pipeline):
+        """Test that variants finished after their source was deleted are not kept."""
+        import app as app_module
+
+        store = app_module.get_blob_store()
+        source, _ = store.save(io.BytesIO(b'orphan'), 'png')
+
+        created = fake_pipeline.process_image(store, source)
+
+        assert created
+        for _, _, filename, _ in created:
+            assert not store.exists(filename)
+
+    def test_real_variants_with_pillow(self, app):
+        """Test that Pillow produces downscaled variants no wider than the original."""
+        pytest.importorskip('PIL')
+        from PIL import Image
+        import app as app_module
+        import derivatives
+
+        if not derivatives.available_formats():
+            pytest.skip('Pillow cannot encode WebP or AVIF here')
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(buffer, format='PNG')
+        buffer.seek(0)
+        store = app_module.get_blob_store()
+        source, _ = store.save(buffer, 'png')
+
+        created = derivatives.generate_derivatives(store, source)
+
+        assert {width for width, _, _, _ in created} == {320, 640}
+        for width, fmt, filename, size in created:
+            with Image.open(store.path(filename)) as variant:
+                assert variant.width == width
+            assert size == os.path.getsize(store.path(filename))
+
+    def test_undecodable_image_fails_without_retry(self, app, monkeypatch):
+        """Test that a derivatives job for a file Pillow cannot read fails on its first attempt."""
+        pytest.importorskip('PIL')
+        import app as app_module
+        import derivatives
+        import jobs
+        import models
+
+        if not derivatives.available_formats():
+            pytest.skip('Pillow cannot encode WebP or AVIF here')
+        monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+        store = app_module.get_blob_store()
+        source, _ = store.save(io.BytesIO(b'not really a png'), 'png')
+        derivatives.schedule(store, [source])
+
+        assert jobs.run_pending() == 1
+        with models.db_connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE kind = 'derivatives'").fetchone()
+        assert row['status'] == 'failed'
+        assert row['attempts'] == 1
+        assert 'Cannot decode' in row['last_error']
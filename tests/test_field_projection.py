@@ -0,0 +1,109 @@
+"""
+Test cases for fields= / view=summary projection on the list endpoints.
+"""
+import io
+
+from tests.conftest import PNG
+
+
+class TestTextPostProjection:
+    """Test cases for projecting /api/text-posts."""
+
+    def test_summary_omits_content(self, logged_in_client):
+        """Test that view=summary drops the body and adds the excerpt."""
+        logged_in_client.post('/api/text-posts', json={
+            'title': 'Long read',
+            'content': '# Heading\n\n' + 'word ' * 200,
+            'tags': ['a'],
+            'published': True
+        })
+
+        posts = logged_in_client.get('/api/text-posts?view=summary').get_json()
+        assert len(posts) == 1
+        post = posts[0]
+        assert 'content' not in post
+        assert post['title'] == 'Long read'
+        assert post['tags'] == ['a']
+        assert post['excerpt'].startswith('Heading word')
+        assert post['excerpt'].endswith('…')
+        assert len(post['excerpt']) <= 201
+
+    def test_explicit_fields(self, logged_in_client):
+        """Test that fields= returns only the requested columns plus id and created_at."""
+        logged_in_client.post('/api/text-posts', json={'title': 'T', 'content': 'C'})
+
+        post = logged_in_client.get('/api/text-posts?fields=title').get_json()[0]
+        assert set(post) == {'id', 'created_at', 'title'}
+
+    def test_unknown_field_rejected(self, client):
+        """Test that unknown or unsafe field names are rejected."""
+        assert client.get('/api/text-posts?fields=title,password_hash').status_code == 400
+        assert client.get('/api/text-posts?fields=id;DROP TABLE users').status_code == 400
+        assert client.get('/api/text-posts?view=tiny').status_code == 400
+
+    def test_summary_with_pagination(self, logged_in_client):
+        """Test that projection composes with cursor pagination."""
+        for i in range(3):
+            logged_in_client.post('/api/text-posts', json={'title': f'P{i}', 'content': 'C'})
+
+        first = logged_in_client.get('/api/text-posts?view=summary&limit=2').get_json()
+        assert all('content' not in post for post in first['items'])
+        second = logged_in_client.get(
+            f"/api/text-posts?view=summary&limit=2&cursor={first['next_cursor']}"
+        ).get_json()
+        assert len(second['items']) == 1
+
+    def test_excerpt_follows_updates(self, logged_in_client):
+        """Test that the stored excerpt is recomputed on update."""
+        post_id = logged_in_client.post('/api/text-posts', json={
+            'title': 'T', 'content': 'Before'
+        }).get_json()['id']
+        logged_in_client.put(f'/api/text-posts/{post_id}', json={
+            'title': 'T', 'content': 'After [a link](http://example.com)'
+        })
+
+        post = logged_in_client.get(f'/api/text-posts/{post_id}').get_json()
+        assert post['excerpt'] == 'After a link'
+
+
+class TestCommunityImageProjection:
+    """Test cases for projecting /api/community-images."""
+
+    def test_summary_keeps_files_and_excerpt(self, logged_in_client, client):
+        """Test that album summaries keep the file list but drop the description."""
+        logged_in_client.post('/api/community-images', data={
+            'title': 'Album',
+            'description': '**Bold** description',
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
+        }, content_type='multipart/form-data')
+
+        album = client.get('/api/community-images?view=summary').get_json()[0]
+        assert 'description' not in album
+        assert album['excerpt'] == 'Bold description'
+        assert len(album['images']) == 1
+
+    def test_fields_without_images_skips_files(self, logged_in_client, client):
+        """Test that leaving images out of fields omits the file list."""
+        logged_in_client.post('/api/community-images', data={
+            'title': 'Album',
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
+        }, content_type='multipart/form-data')
+
+        album = client.get('/api/community-images?fields=title').get_json()[0]
+        assert set(album) == {'id', 'created_at', 'title'}
+
+
+class TestMakeExcerpt:
+    """Test cases for the excerpt helper."""
+
+    def test_short_text_unchanged(self):
+        """Test that short plain text passes through."""
+        from models import make_excerpt
+        assert make_excerpt('Hello   world') == 'Hello world'
+        assert make_excerpt(None) == ''
+
+    def test_cuts_at_word_boundary(self):
+        """Test that long text is cut at a word boundary with an ellipsis."""
+        from models import make_excerpt
+        excerpt = make_excerpt('alpha beta gamma delta', length=12)
+        assert excerpt == 'alpha beta…'
@@ -0,0 +1,105 @@
+"""
+Test cases for the transactional outbox of file deletions.
+"""
+import io
+import os
+
+import pytest
+
+from tests.conftest import PNG
+
+
+def _outbox():
+    import models
+    with models.db_connection() as conn:
+        return [row['filename'] for row in
+                conn.execute('SELECT filename FROM file_deletion_outbox ORDER BY id')]
+
+
+@pytest.fixture
+def deferred(monkeypatch):
+    """Leave queued jobs for an explicit run instead of running them inline"""
+    import jobs
+    monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+    return jobs
+
+
+class TestFileDeletionOutbox:
+    """Test cases for recording and draining file deletions."""
+
+    def test_delete_records_outbox(self, logged_in_client, deferred, create_album):
+        """Test that deleting an album queues its files instead of unlinking them."""
+        import app as app_module
+
+        created = create_album(logged_in_client, contents=[b'one', b'two'])
+        paths = [os.path.join(app_module.UPLOAD_FOLDER, name) for name in created['images']]
+
+        response = logged_in_client.delete(f"/api/community-images/{created['id']}")
+
+        assert response.status_code == 200
+        assert _outbox() == created['images']
+        assert all(os.path.exists(path) for path in paths)
+
+        deferred.run_pending()
+
+        assert _outbox() == []
+        assert not any(os.path.exists(path) for path in paths)
+
+    def test_delete_missing_album(self, logged_in_client, deferred):
+        """Test that deleting an unknown album is a 404 and queues nothing."""
+        response = logged_in_client.delete('/api/community-images/999')
+
+        assert response.status_code == 404
+        assert _outbox() == []
+
+    def test_update_queues_only_dropped_files(self, logged_in_client, deferred, create_album):
+        """Test that an update queues the files it replaced, not the ones it kept."""
+        created = create_album(logged_in_client, contents=[b'old'])
+
+        logged_in_client.put(f"/api/community-images/{created['id']}", data={
+            'title': 'Album',
+            'images': [(io.BytesIO(PNG + b'new'), 'photo.png')]
+        }, content_type='multipart/form-data')
+
+        assert _outbox() == created['images']
+
+    def test_failed_mutation_queues_nothing(self, logged_in_client, deferred, create_album):
+        """Test that outbox rows roll back with the mutation that wrote them."""
+        import models
+
+        created = create_album(logged_in_client, contents=[b'kept'])
+
+        def missing(filenames):
+            raise FileNotFoundError('gone')
+
+        with pytest.raises(FileNotFoundError):
+            models.update_community_image(created['id'], 'Album', '', '', ['other.png'],
+                                          require_files=missing, deletion_root='/uploads')
+
+        assert _outbox() == []
+        assert models.get_community_image_by_id(created['id'])['images'] == created['images']
+
+    def test_shared_files_survive(self, logged_in_client, deferred, create_album):
+        """Test that a file still used by another album is not deleted when drained."""
+        import app as app_module
+
+        first = create_album(logged_in_client, contents=[b'shared'])
+        create_album(logged_in_client, contents=[b'shared'])
+
+        logged_in_client.delete(f"/api/community-images/{first['id']}")
+        deferred.run_pending()
+
+        assert _outbox() == []
+        assert os.path.exists(os.path.join(app_module.UPLOAD_FOLDER, first['images'][0]))
+
+    def test_drained_in_batches(self, app, deferred):
+        """Test that the outbox is processed a bounded batch per transaction."""
+        import models
+
+        models.queue_file_deletions([f'missing{i}.png' for i in range(5)], '/uploads')
+        removed = []
+
+        batches = [models.process_file_deletions(removed.append, batch_size=2) for _ in range(4)]
+
+        assert batches == [2, 2, 1, 0]
+        assert removed == [f'missing{i}.png' for i in range(5)]
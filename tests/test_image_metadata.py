@@ -0,0 +1,138 @@
+"""
+Test cases for ingest-time image metadata (dimensions, size, placeholders).
+"""
+import io
+import struct
+
+import pytest
+
+from tests.conftest import PNG
+
+
+def _png(width, height):
+    """PNG signature and IHDR chunk, enough for header parsing"""
+    ihdr = struct.pack('>II5B', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', len(ihdr)) + b'IHDR' + ihdr + b'\x00' * 4
+
+
+def _jpeg(width, height):
+    """JPEG with an APP0 segment before its SOF0 frame header"""
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof0 = b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x01\x11\x00'
+    return b'\xff\xd8' + app0 + sof0 + b'\xff\xd9'
+
+
+def _gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00' * 8
+
+
+def _webp(width, height):
+    """Extended-format (VP8X) WebP header"""
+    body = b'WEBPVP8X' + struct.pack('<I', 10) + b'\x00' * 4
+    body += (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little')
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+class TestReadDimensions:
+    """Test cases for dependency-free header parsing."""
+
+    @pytest.mark.parametrize('build', [_png, _jpeg, _gif, _webp])
+    def test_formats(self, build):
+        """Test that each supported format yields its width and height."""
+        import image_metadata
+
+        assert image_metadata.read_dimensions(io.BytesIO(build(640, 480))) == (640, 480)
+
+    def test_unrecognized(self):
+        """Test that unknown or truncated content has no dimensions."""
+        import image_metadata
+
+        assert image_metadata.read_dimensions(io.BytesIO(b'not an image')) is None
+        assert image_metadata.read_dimensions(io.BytesIO(b'\xff\xd8\xff\xe0')) is None
+
+
+class TestIngestMetadata:
+    """Test cases for metadata recorded at upload and returned by the APIs."""
+
+    def test_single_upload_metadata(self, logged_in_client, client):
+        """Test that /api/images entries carry the analyzed dimensions and size."""
+        data = _png(800, 600)
+        logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(data), 'photo.png')
+        }, content_type='multipart/form-data')
+
+        metadata = client.get('/api/images').get_json()[0]['metadata']
+        assert metadata['width'] == 800
+        assert metadata['height'] == 600
+        assert metadata['bytes'] == len(data)
+
+    def test_album_metadata_aligned_with_images(self, logged_in_client, client):
+        """Test that album responses list metadata in the same order as images."""
+        # A PNG signature with no IHDR chunk after it
+        opaque = PNG + b'opaque bytes'
+        created = logged_in_client.post('/api/community-images', data={
+            'title': 'Sizes',
+            'images': [(io.BytesIO(_jpeg(300, 200)), 'a.jpg'),
+                       (io.BytesIO(opaque), 'b.png')]
+        }, content_type='multipart/form-data').get_json()
+
+        album = client.get(f"/api/community-images/{created['id']}").get_json()
+        first, second = album['image_metadata']
+        assert (first['width'], first['height']) == (300, 200)
+        assert second['width'] is None
+        assert second['bytes'] == len(opaque)
+
+        projected = client.get('/api/community-images?fields=image_metadata').get_json()
+        assert 'images' not in projected[0]
+        assert projected[0]['image_metadata'] == album['image_metadata']
+
+    def test_update_records_new_files(self, logged_in_client, client):
+        """Test that files added by an album update are analyzed too."""
+        created = logged_in_client.post('/api/community-images', data={
+            'title': 'Album',
+            'images': [(io.BytesIO(_gif(10, 10)), 'a.gif')]
+        }, content_type='multipart/form-data').get_json()
+
+        logged_in_client.put(f"/api/community-images/{created['id']}", data={
+            'title': 'Album',
+            'images': [(io.BytesIO(_webp(1920, 1080)), 'b.webp')]
+        }, content_type='multipart/form-data')
+
+        album = client.get(f"/api/community-images/{created['id']}").get_json()
+        assert album['image_metadata'][0]['width'] == 1920
+
+    def test_analyze_command_backfills(self, app, logged_in_client):
+        """Test that analyze-images fills in metadata for blobs stored without it."""
+        import models
+
+        logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(_png(50, 40)), 'photo.png')
+        }, content_type='multipart/form-data')
+        with models.db_connection() as conn:
+            conn.execute('UPDATE blobs SET width = NULL, height = NULL, bytes = NULL')
+            conn.commit()
+        assert len(models.get_blobs_without_metadata()) == 1
+
+        result = app.test_cli_runner().invoke(args=['analyze-images'])
+
+        assert 'Analyzed 1 of 1' in result.output
+        assert models.get_blobs_without_metadata() == []
+
+    def test_placeholder_with_pillow(self, app):
+        """Test that Pillow adds a dominant colour and a data URI placeholder."""
+        pytest.importorskip('PIL')
+        from PIL import Image
+        import app as app_module
+        import image_metadata
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (200, 100), (255, 0, 0)).save(buffer, format='PNG')
+        buffer.seek(0)
+        store = app_module.get_blob_store()
+        filename, _ = store.save(buffer, 'png')
+
+        metadata = image_metadata.analyze(store.path(filename))
+
+        assert (metadata['width'], metadata['height']) == (200, 100)
+        assert metadata['dominant_color'] == '#ff0000'
+        assert metadata['placeholder'].startswith('data:image/jpeg;base64,')
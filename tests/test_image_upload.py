@@ -8,6 +8,8 @@ import time
 import pytest
 from werkzeug.datastructures import FileStorage
 
+from tests.conftest import PNG, JPEG, WEBP
+
 
 class TestImageUpload:
     """Test cases for image upload functionality."""
@@ -16,7 +18,7 @@ class TestImageUpload:
         """Test successful upload of a valid image file."""
         # Create a fake image file
         data = {
-            'image': (io.BytesIO(b'fake image content'), 'test_image.png')
+            'image': (io.BytesIO(PNG + b'fake image content'), 'test_image.png')
         }
 
         response = logged_in_client.post('/api/upload', 
@@ -34,7 +36,7 @@ class TestImageUpload:
     def test_upload_jpg_image(self, logged_in_client, app):
         """Test uploading a JPG image."""
         data = {
-            'image': (io.BytesIO(b'fake jpg content'), 'photo.jpg')
+            'image': (io.BytesIO(JPEG + b'fake jpg content'), 'photo.jpg')
         }
 
         response = logged_in_client.post('/api/upload',
@@ -49,7 +51,7 @@ class TestImageUpload:
     def test_upload_jpeg_image(self, logged_in_client, app):
         """Test uploading a JPEG image."""
         data = {
-            'image': (io.BytesIO(b'fake jpeg content'), 'photo.jpeg')
+            'image': (io.BytesIO(JPEG + b'fake jpeg content'), 'photo.jpeg')
         }
 
         response = logged_in_client.post('/api/upload',
@@ -59,7 +61,8 @@ class TestImageUpload:
         assert response.status_code == 200
         json_data = response.get_json()
         assert json_data['success'] is True
-        assert json_data['file'].endswith('.jpeg')
+        # Stored under the canonical spelling of the extension
+        assert json_data['file'].endswith('.jpg')
 
     def test_upload_gif_image(self, logged_in_client, app):
         """Test uploading a GIF image."""
@@ -79,7 +82,7 @@ class TestImageUpload:
     def test_upload_webp_image(self, logged_in_client, app):
         """Test uploading a WEBP image."""
         data = {
-            'image': (io.BytesIO(b'fake webp content'), 'modern.webp')
+            'image': (io.BytesIO(WEBP + b'fake webp content'), 'modern.webp')
         }
 
         response = logged_in_client.post('/api/upload',
@@ -165,10 +168,10 @@ class TestImageUpload:
     def test_upload_creates_unique_filenames(self, logged_in_client):
         """Test that multiple uploads create unique filenames."""
         data1 = {
-            'image': (io.BytesIO(b'image1'), 'same_name.png')
+            'image': (io.BytesIO(PNG + b'image1'), 'same_name.png')
         }
         data2 = {
-            'image': (io.BytesIO(b'image2'), 'same_name.png')
+            'image': (io.BytesIO(PNG + b'image2'), 'same_name.png')
         }
 
         response1 = logged_in_client.post('/api/upload',
@@ -192,7 +195,7 @@ class TestImageUpload:
     def test_upload_file_case_insensitive_extension(self, logged_in_client):
         """Test that file extensions are case-insensitive."""
         data = {
-            'image': (io.BytesIO(b'fake content'), 'IMAGE.PNG')
+            'image': (io.BytesIO(PNG + b'fake content'), 'IMAGE.PNG')
         }
 
         response = logged_in_client.post('/api/upload',
@@ -222,7 +225,7 @@ class TestImageListing:
         """Test listing images after uploading one."""
         # Upload an image first
         data = {
-            'image': (io.BytesIO(b'test image'), 'test.png')
+            'image': (io.BytesIO(PNG + b'test image'), 'test.png')
         }
         upload_response = logged_in_client.post('/api/upload',
                                      data=data,
@@ -244,7 +247,7 @@ class TestImageListing:
         # Upload multiple images
         for i in range(3):
             data = {
-                'image': (io.BytesIO(f'image{i}'.encode()), f'test{i}.png')
+                'image': (io.BytesIO(PNG + f'image{i}'.encode()), f'test{i}.png')
             }
             response = logged_in_client.post('/api/upload',
                                   data=data,
@@ -268,7 +271,7 @@ class TestImageListing:
         # Upload images with slight delay
         for i in range(3):
             data = {
-                'image': (io.BytesIO(f'image{i}'.encode()), f'test{i}.png')
+                'image': (io.BytesIO(PNG + f'image{i}'.encode()), f'test{i}.png')
             }
             logged_in_client.post('/api/upload',
                        data=data,
@@ -282,3 +285,108 @@ class TestImageListing:
         # Verify sorting (newest first)
         for i in range(len(json_data) - 1):
             assert json_data[i]['time'] >= json_data[i + 1]['time']
+
+
+class TestImageListingFromDatabase:
+    """Test cases for the database-backed /api/images listing."""
+
+    def test_listing_ignores_untracked_files(self, client, app):
+        """Test that files on disk without a row are not listed."""
+        import app as app_module
+        with open(os.path.join(app_module.UPLOAD_FOLDER, 'stray.png'), 'wb') as f:
+            f.write(b'stray')
+
+        assert client.get('/api/images').get_json() == []
+
+    def test_listing_excludes_album_files(self, logged_in_client):
+        """Test that community album uploads are not part of /api/images."""
+        logged_in_client.post('/api/community-images', data={
+            'title': 'Album',
+            'images': [(io.BytesIO(PNG + b'album image'), 'album.png')]
+        }, content_type='multipart/form-data')
+
+        assert logged_in_client.get('/api/images').get_json() == []
+
+    def test_listing_includes_description(self, logged_in_client):
+        """Test that listing entries carry the stored metadata."""
+        logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(PNG + b'image'), 'test.png'),
+            'description': 'A sketch'
+        }, content_type='multipart/form-data')
+
+        entry = logged_in_client.get('/api/images').get_json()[0]
+        assert entry['description'] == 'A sketch'
+        assert entry['url'] == f"/static/uploads/{entry['filename']}"
+
+    def test_listing_pagination(self, logged_in_client):
+        """Test cursor pagination over uploads."""
+        for i in range(3):
+            logged_in_client.post('/api/upload', data={
+                'image': (io.BytesIO(PNG + f'image{i}'.encode()), f'test{i}.png')
+            }, content_type='multipart/form-data')
+
+        first = logged_in_client.get('/api/images?limit=2').get_json()
+        assert len(first['items']) == 2
+        second = logged_in_client.get(f"/api/images?limit=2&cursor={first['next_cursor']}").get_json()
+        assert len(second['items']) == 1
+        assert second['next_cursor'] is None
+
+
+class TestReconcileImagesCommand:
+    """Test cases for the reconcile-images CLI command."""
+
+    def test_backfills_untracked_files(self, runner, logged_in_client, app):
+        """Test that stray uploads get rows and tracked files are left alone."""
+        import app as app_module
+
+        logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(PNG + b'tracked'), 'tracked.png')
+        }, content_type='multipart/form-data')
+        logged_in_client.post('/api/community-images', data={
+            'title': 'Album',
+            'images': [(io.BytesIO(PNG + b'album image'), 'album.png')]
+        }, content_type='multipart/form-data')
+
+        stray = os.path.join(app_module.UPLOAD_FOLDER, 'img-1-0001.png')
+        with open(stray, 'wb') as f:
+            f.write(b'stray')
+        os.utime(stray, (1_600_000_000, 1_600_000_000))
+        with open(os.path.join(app_module.UPLOAD_FOLDER, 'notes.txt'), 'w') as f:
+            f.write('not an image')
+
+        result = runner.invoke(args=['reconcile-images'])
+        assert result.exit_code == 0
+        assert 'Added img-1-0001.png' in result.output
+        assert '1 new rows' in result.output
+
+        listing = logged_in_client.get('/api/images').get_json()
+        assert len(listing) == 2
+        backfilled = [entry for entry in listing if entry['filename'] == 'img-1-0001.png'][0]
+        assert backfilled['time'] == 1_600_000_000
+
+        # Running again adds nothing
+        result = runner.invoke(args=['reconcile-images'])
+        assert '0 new rows' in result.output
+
+    def test_skips_derivatives(self, runner, logged_in_client, app):
+        """Test that resized variants on disk are not added as images of their own."""
+        import app as app_module
+        import derivatives
+        from models import record_derivatives
+
+        logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(PNG + b'source'), 'source.png')
+        }, content_type='multipart/form-data')
+        source = logged_in_client.get('/api/images').get_json()[0]['filename']
+        store = app_module.get_blob_store()
+        recorded = derivatives.derivative_name(source, 320, 'webp')
+        unrecorded = derivatives.derivative_name(source, 640, 'webp')
+        for filename in (recorded, unrecorded):
+            with open(store.path(filename), 'wb') as f:
+                f.write(b'variant')
+        record_derivatives(source, [(320, 'webp', recorded, 7)])
+
+        result = runner.invoke(args=['reconcile-images'])
+
+        assert '0 new rows' in result.output
+        assert len(logged_in_client.get('/api/images').get_json()) == 1
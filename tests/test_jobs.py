@@ -0,0 +1,163 @@
+"""
+Test cases for the SQLite-backed background job queue.
+"""
+import io
+import os
+import time
+
+from tests.conftest import PNG
+
+
+def _job_row(job_id):
+    import models
+    with models.db_connection() as conn:
+        return dict(conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+
+def _register(monkeypatch, kind, func):
+    import jobs
+    monkeypatch.setitem(jobs._handlers, kind, func)
+
+
+class TestJobQueue:
+    """Test cases for enqueueing, leasing, retrying and completing jobs."""
+
+    def test_run_pending(self, app, monkeypatch):
+        """Test that queued jobs run once with their payload and are marked done."""
+        import jobs
+
+        seen = []
+        _register(monkeypatch, 'record', seen.append)
+        monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+
+        ids = jobs.enqueue('record', [{'n': 1}, {'n': 2}])
+
+        assert seen == []
+        assert jobs.run_pending() == 2
+        assert seen == [{'n': 1}, {'n': 2}]
+        assert [_job_row(job_id)['status'] for job_id in ids] == ['done', 'done']
+
+    def test_failure_retries_with_backoff(self, app, monkeypatch):
+        """Test that a failing job is requeued with a growing delay, then fails for good."""
+        import jobs
+        import models
+
+        def explode(payload):
+            raise RuntimeError('disk on fire')
+
+        _register(monkeypatch, 'explode', explode)
+        monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+        [job_id] = jobs.enqueue('explode', [{}], max_attempts=2)
+
+        assert jobs.run_pending() == 1
+        row = _job_row(job_id)
+        assert row['status'] == 'queued'
+        assert row['attempts'] == 1
+        assert 'disk on fire' in row['last_error']
+        assert row['run_at'] >= time.time() + jobs.RETRY_BASE_DELAY - 1
+
+        # Not due yet, so nothing runs until the backoff has passed
+        assert jobs.run_pending() == 0
+        with models.db_connection() as conn:
+            conn.execute('UPDATE jobs SET run_at = 0')
+            conn.commit()
+        jobs.run_pending()
+
+        assert _job_row(job_id)['status'] == 'failed'
+        assert jobs.retry_delay(3) == jobs.RETRY_BASE_DELAY * 4
+
+    def test_permanent_error_not_retried(self, app, monkeypatch):
+        """Test that a PermanentJobError fails the job on its first attempt."""
+        import jobs
+
+        def reject(payload):
+            raise jobs.PermanentJobError('unusable input')
+
+        _register(monkeypatch, 'reject', reject)
+        monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+        [job_id] = jobs.enqueue('reject', [{}], max_attempts=5)
+
+        assert jobs.run_pending() == 1
+        row = _job_row(job_id)
+        assert row['status'] == 'failed'
+        assert row['attempts'] == 1
+        assert 'unusable input' in row['last_error']
+
+    def test_expired_lease_is_reclaimed(self, app, monkeypatch):
+        """Test that a job whose worker vanished runs again, ignoring the stale lease."""
+        import jobs
+        import models
+
+        _register(monkeypatch, 'noop', lambda payload: None)
+        monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+        [job_id] = jobs.enqueue('noop', [{}])
+
+        abandoned = models.claim_job(visibility_timeout=-1)
+        assert abandoned['id'] == job_id
+        assert models.claim_job(visibility_timeout=60)['attempts'] == 2
+
+        # The first worker finishing late must not overwrite the new lease
+        models.complete_job(abandoned)
+        assert _job_row(job_id)['status'] == 'running'
+
+    def test_worker_thread(self, app, monkeypatch):
+        """Test that a worker thread picks up jobs as they are enqueued."""
+        import jobs
+
+        seen = []
+        _register(monkeypatch, 'record', seen.append)
+        monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+        worker = jobs.Worker(poll_interval=0.05)
+        worker.start()
+        try:
+            jobs.enqueue('record', [{'n': 1}])
+            worker.notify()
+            assert jobs.wait_until_idle(timeout=10)
+        finally:
+            worker.stop()
+            worker.join(5)
+
+        assert seen == [{'n': 1}]
+
+
+class TestDeferredWork:
+    """Test cases for request work moved onto the queue."""
+
+    def test_delete_defers_file_removal(self, app, logged_in_client, monkeypatch):
+        """Test that album files are removed by the job worker, not the request."""
+        import app as app_module
+        import derivatives
+        import jobs
+
+        monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+        # Only the deletion job should be queued, with or without Pillow
+        monkeypatch.setattr(derivatives, 'available_formats', lambda: ())
+        created = logged_in_client.post('/api/community-images', data={
+            'title': 'Album',
+            'images': [(io.BytesIO(PNG + b'deferred'), 'photo.png')]
+        }, content_type='multipart/form-data').get_json()
+        path = os.path.join(app_module.UPLOAD_FOLDER, created['images'][0])
+
+        response = logged_in_client.delete(f"/api/community-images/{created['id']}")
+
+        assert response.status_code == 200
+        assert os.path.exists(path)
+        result = app.test_cli_runner().invoke(args=['run-jobs', '--once'])
+        assert 'Ran 1 jobs' in result.output
+        assert not os.path.exists(path)
+
+    def test_status_view(self, client, logged_in_client, monkeypatch):
+        """Test that /api/jobs reports counts and failures to admins only."""
+        import jobs
+
+        monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+        jobs.enqueue('unknown-kind', [{}], max_attempts=1)
+        jobs.run_pending()
+
+        status = logged_in_client.get('/api/jobs').get_json()
+        assert status['counts']['failed'] == 1
+        assert 'No handler' in status['recent_failures'][0]['last_error']
+        assert logged_in_client.get('/api/stats').get_json()['jobs']['failed'] == 1
+
+        logged_in_client.post('/api/logout')
+        assert client.get('/api/jobs').status_code in [302, 401]
@@ -0,0 +1,103 @@
+"""
+Test cases for the server-rendered home and gallery pages.
+"""
+import io
+
+from tests.conftest import PNG
+
+
+class TestGalleryPage:
+    """Test cases for rendering album cards into gallery.html."""
+
+    def test_empty_gallery(self, client):
+        """Test that an empty gallery renders the empty state instead of the loading message."""
+        response = client.get('/gallery')
+
+        assert response.status_code == 200
+        assert b'There are no photo albums to display yet.' in response.data
+        assert b'Loading gallery...' not in response.data
+
+    def test_albums_rendered(self, logged_in_client, client, create_album):
+        """Test that albums appear as cards the page script can take over."""
+        created = create_album(logged_in_client, 'Harbour <at> dusk', [b'one', b'two'], caption='A caption')
+
+        response = client.get('/gallery.html')
+
+        html = response.data.decode('utf-8')
+        assert 'class="album-card" data-ssr' in html
+        assert 'Harbour &lt;at&gt; dusk' in html
+        assert f"/static/uploads/{created['images'][0]}" in html
+        assert '2 images' in html
+        assert '<!-- ssr:gallery -->' in html
+
+    def test_update_rerenders_only_changed_item(self, logged_in_client, client, create_album):
+        """Test that an edited album's fragment is replaced while others are reused."""
+        import app as app_module
+
+        first = create_album(logged_in_client, 'First', [b'first'], caption='A caption')
+        create_album(logged_in_client, 'Second', [b'second'], caption='A caption')
+        client.get('/gallery')
+        before = app_module.fragment_cache.stats()
+
+        logged_in_client.put(f"/api/community-images/{first['id']}", data={
+            'title': 'First, renamed', 'caption': 'A caption'
+        }, content_type='multipart/form-data')
+        html = client.get('/gallery').data.decode('utf-8')
+
+        stats = app_module.fragment_cache.stats()
+        assert 'First, renamed' in html
+        assert stats['hits'] - before['hits'] == 1
+        assert stats['stale'] - before['stale'] == 1
+
+    def test_conditional_get(self, client):
+        """Test that an unchanged rendered page revalidates with 304."""
+        etag = client.get('/gallery').headers['ETag']
+
+        response = client.get('/gallery', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+
+
+class TestIndexPage:
+    """Test cases for rendering uploads and posts into index.html."""
+
+    def test_uploads_and_posts_rendered(self, logged_in_client, client):
+        """Test that the community grid and writing preview are filled in."""
+        upload = logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(PNG + b'upload'), 'photo.png')
+        }, content_type='multipart/form-data').get_json()
+        logged_in_client.post('/api/text-posts', json={
+            'title': 'Published post', 'content': 'Body', 'published': True
+        })
+        logged_in_client.post('/api/text-posts', json={
+            'title': 'Draft post', 'content': 'Body', 'published': False
+        })
+
+        html = client.get('/').data.decode('utf-8')
+
+        assert f"/static/uploads/{upload['file']}" in html
+        assert 'Published post' in html
+        assert 'Draft post' not in html
+
+    def test_region_failure_falls_back_to_shell(self, client, monkeypatch):
+        """Test that a failing region leaves the static markup for the script to fill."""
+        import app as app_module
+
+        def broken():
+            raise RuntimeError('database unavailable')
+
+        monkeypatch.setattr(app_module, 'get_all_images', broken)
+
+        response = client.get('/')
+
+        assert response.status_code == 200
+        assert b'<!-- ssr:community --><!-- /ssr:community -->' in response.data
+
+    def test_fill_regions(self):
+        """Test that only the content between a marker pair is replaced."""
+        from pages import fill_regions
+
+        shell = 'a<!-- ssr:x -->old<!-- /ssr:x -->b<!-- ssr:y --><!-- /ssr:y -->'
+
+        assert fill_regions(shell, {'x': 'new', 'z': 'ignored'}) == \
+            'a<!-- ssr:x -->new<!-- /ssr:x -->b<!-- ssr:y --><!-- /ssr:y -->'
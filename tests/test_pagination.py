@@ -0,0 +1,133 @@
+"""
+Test cases for keyset (cursor) pagination on the list endpoints.
+"""
+import io
+
+from tests.conftest import PNG
+
+
+def _create_posts(client, count, published=True):
+    for i in range(count):
+        client.post('/api/text-posts', json={
+            'title': f'Post {i}',
+            'content': f'Content {i}',
+            'published': published
+        })
+
+
+class TestTextPostPagination:
+    """Test cases for paginating /api/text-posts."""
+
+    def test_unpaginated_response_is_list(self, logged_in_client):
+        """Test that omitting limit/cursor keeps the plain list response."""
+        _create_posts(logged_in_client, 2)
+        response = logged_in_client.get('/api/text-posts')
+        assert isinstance(response.get_json(), list)
+
+    def test_pages_cover_all_posts_once(self, logged_in_client):
+        """Test that walking the cursors yields every post exactly once, newest first."""
+        _create_posts(logged_in_client, 5)
+
+        seen = []
+        cursor = None
+        while True:
+            url = '/api/text-posts?limit=2'
+            if cursor:
+                url += f'&cursor={cursor}'
+            data = logged_in_client.get(url).get_json()
+            assert len(data['items']) <= 2
+            seen.extend(post['id'] for post in data['items'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        assert len(seen) == 5
+        assert len(set(seen)) == 5
+        # Posts created within the same second tie-break on id
+        assert seen == sorted(seen, reverse=True)
+
+    def test_last_page_has_no_cursor(self, logged_in_client):
+        """Test that a page holding the remaining rows ends pagination."""
+        _create_posts(logged_in_client, 2)
+        data = logged_in_client.get('/api/text-posts?limit=2').get_json()
+        assert len(data['items']) == 2
+        assert data['next_cursor'] is None
+
+    def test_public_pages_only_published(self, client, logged_in_client):
+        """Test that paginated public listings respect the published filter."""
+        _create_posts(logged_in_client, 2, published=True)
+        _create_posts(logged_in_client, 2, published=False)
+        logged_in_client.post('/api/logout')
+
+        data = client.get('/api/text-posts?limit=10').get_json()
+        assert len(data['items']) == 2
+        assert all(post['published'] for post in data['items'])
+
+    def test_invalid_limit(self, client):
+        """Test that out-of-range or non-numeric limits are rejected."""
+        assert client.get('/api/text-posts?limit=0').status_code == 400
+        assert client.get('/api/text-posts?limit=1000').status_code == 400
+        assert client.get('/api/text-posts?limit=abc').status_code == 400
+
+    def test_invalid_cursor(self, client):
+        """Test that a malformed cursor is rejected."""
+        response = client.get('/api/text-posts?limit=5&cursor=not-a-cursor')
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+
+
+class TestCommunityImagePagination:
+    """Test cases for paginating /api/community-images."""
+
+    def test_pages_cover_all_albums(self, logged_in_client, client):
+        """Test cursor pagination across community albums."""
+        for i in range(3):
+            logged_in_client.post('/api/community-images', data={
+                'title': f'Album {i}',
+                'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
+            }, content_type='multipart/form-data')
+
+        first = client.get('/api/community-images?limit=2').get_json()
+        assert len(first['items']) == 2
+        assert first['next_cursor']
+
+        second = client.get(f"/api/community-images?limit=2&cursor={first['next_cursor']}").get_json()
+        assert len(second['items']) == 1
+        assert second['next_cursor'] is None
+
+        titles = [item['title'] for item in first['items'] + second['items']]
+        assert sorted(titles) == ['Album 0', 'Album 1', 'Album 2']
+
+    def test_cursor_without_limit_uses_default(self, client):
+        """Test that an empty cursor value still returns an envelope."""
+        data = client.get('/api/community-images?cursor=').get_json()
+        assert data == {'items': [], 'next_cursor': None}
+
+
+class TestPaginationIndexes:
+    """Test cases for the indexes created by init_db."""
+
+    def test_indexes_exist(self, app):
+        """Test that the composite keyset indexes are created."""
+        import models
+
+        with models.db_connection() as conn:
+            names = {row['name'] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )}
+        assert 'idx_community_images_created' in names
+        assert 'idx_text_posts_published_created' in names
+
+    def test_public_page_query_uses_index(self, app):
+        """Test that the published page query is served from the composite index."""
+        import models
+
+        with models.db_connection() as conn:
+            plan = conn.execute(
+                'EXPLAIN QUERY PLAN SELECT * FROM text_posts WHERE published = 1 '
+                'AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT 3',
+                ('2030-01-01 00:00:00', 1)
+            ).fetchall()
+        detail = ' '.join(row['detail'] for row in plan)
+        assert 'idx_text_posts_published_created' in detail
+        assert 'TEMP B-TREE' not in detail
@@ -0,0 +1,129 @@
+"""
+Test cases for the generation-invalidated JSON response cache.
+"""
+import io
+
+from response_cache import ResponseCache
+
+from tests.conftest import PNG
+
+
+class TestResponseCacheEndpoints:
+    """Test cases for caching public read endpoints."""
+
+    def test_repeat_get_is_served_from_cache(self, client):
+        """Test that an unchanged listing is a cache hit the second time."""
+        first = client.get('/api/text-posts')
+        second = client.get('/api/text-posts')
+        assert first.headers['X-Cache'] == 'MISS'
+        assert second.headers['X-Cache'] == 'HIT'
+        assert first.data == second.data
+
+    def test_write_invalidates(self, logged_in_client, client):
+        """Test that any write makes cached listings stale."""
+        client.get('/api/community-images')
+        assert client.get('/api/community-images').headers['X-Cache'] == 'HIT'
+
+        logged_in_client.post('/api/community-images', data={
+            'title': 'New album',
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
+        }, content_type='multipart/form-data')
+
+        response = client.get('/api/community-images')
+        assert response.headers['X-Cache'] == 'MISS'
+        assert len(response.get_json()) == 1
+
+    def test_admin_and_public_cached_separately(self, logged_in_client, client):
+        """Test that drafts cached for an admin never leak to anonymous users."""
+        logged_in_client.post('/api/text-posts', json={
+            'title': 'Draft', 'content': 'C', 'published': False
+        })
+        assert len(logged_in_client.get('/api/text-posts').get_json()) == 1
+
+        logged_in_client.post('/api/logout')
+        assert client.get('/api/text-posts').get_json() == []
+
+    def test_query_string_is_part_of_key(self, logged_in_client):
+        """Test that different parameters are cached as different entries."""
+        logged_in_client.post('/api/text-posts', json={'title': 'T', 'content': 'C'})
+
+        full = logged_in_client.get('/api/text-posts').get_json()[0]
+        summary = logged_in_client.get('/api/text-posts?view=summary').get_json()[0]
+        assert 'content' in full
+        assert 'content' not in summary
+
+    def test_errors_not_cached(self, client):
+        """Test that non-200 responses are not stored."""
+        client.get('/api/text-posts/999')
+        assert client.get('/api/text-posts/999').headers['X-Cache'] == 'MISS'
+
+    def test_stats_reports_cache(self, logged_in_client):
+        """Test that /api/stats includes cache counters."""
+        logged_in_client.get('/api/search?q=anything')
+        logged_in_client.get('/api/search?q=anything')
+        stats = logged_in_client.get('/api/stats').get_json()['response_cache']
+        assert stats['hits'] >= 1
+        assert stats['misses'] >= 1
+        assert 'evictions' in stats
+
+
+class TestContentGeneration:
+    """Test cases for the shared content generation counter."""
+
+    def test_every_write_bumps_generation(self, app):
+        """Test that each write function advances the generation."""
+        import models
+
+        seen = {models.get_content_generation()}
+
+        def bumped():
+            generation = models.get_content_generation()
+            assert generation not in seen
+            seen.add(generation)
+
+        post_id = models.create_text_post('T', None, 'C', None, [], 1, True)
+        bumped()
+        models.update_text_post(post_id, 'T2', None, 'C', None, [], 1, True)
+        bumped()
+        models.delete_text_post(post_id)
+        bumped()
+        image_id = models.create_community_image('A', None, None, ['a.png'])
+        bumped()
+        models.update_community_image(image_id, 'B', None, None, ['a.png'])
+        bumped()
+        models.delete_community_image(image_id)
+        bumped()
+        models.save_image_metadata('x.png', '')
+        bumped()
+
+
+class TestResponseCacheUnit:
+    """Test cases for the ResponseCache class."""
+
+    def test_lru_eviction_by_entries(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = ResponseCache(max_entries=2)
+        cache.put('a', 1, b'A')
+        cache.put('b', 1, b'B')
+        cache.get('a', 1)
+        cache.put('c', 1, b'C')
+
+        assert cache.get('b', 1) is None
+        assert cache.get('a', 1) == b'A'
+        assert cache.stats()['evictions'] == 1
+
+    def test_eviction_by_bytes(self):
+        """Test that the byte budget is enforced."""
+        cache = ResponseCache(max_entries=10, max_bytes=10)
+        cache.put('a', 1, b'x' * 6)
+        cache.put('b', 1, b'y' * 6)
+        assert cache.get('a', 1) is None
+        assert cache.stats()['bytes'] == 6
+
+    def test_stale_generation_is_miss(self):
+        """Test that an entry from an older generation is dropped."""
+        cache = ResponseCache()
+        cache.put('a', 1, b'A')
+        assert cache.get('a', 2) is None
+        assert cache.stats()['stale'] == 1
+        assert cache.stats()['entries'] == 0
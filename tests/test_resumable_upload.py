@@ -0,0 +1,166 @@
+"""
+Test cases for the resumable chunked upload API.
+"""
+import hashlib
+import os
+
+from tests.conftest import PNG, JPEG
+
+# Ten bytes that can start a .png upload
+DATA = PNG + b'01'
+
+
+def _start(client, filename='photo.png', length=10):
+    return client.post('/api/uploads', json={'filename': filename, 'length': length})
+
+
+def _patch(client, upload_id, offset, data):
+    return client.patch(f'/api/uploads/{upload_id}', data=data, headers={
+        'Upload-Offset': str(offset),
+        'Content-Type': 'application/offset+octet-stream'
+    })
+
+
+def _upload(client, data, filename='photo.png', chunk_size=4):
+    upload_id = _start(client, filename, len(data)).get_json()['id']
+    for offset in range(0, len(data), chunk_size):
+        assert _patch(client, upload_id, offset, data[offset:offset + chunk_size]).status_code == 204
+    return upload_id
+
+
+class TestUploadSessions:
+    """Test cases for creating, resuming and abandoning upload sessions."""
+
+    def test_create_session(self, logged_in_client):
+        """Test that a new session starts at offset 0."""
+        response = _start(logged_in_client, length=1234)
+
+        assert response.status_code == 201
+        json_data = response.get_json()
+        assert json_data['offset'] == 0
+        assert json_data['length'] == 1234
+        assert response.headers['Location'] == f"/api/uploads/{json_data['id']}"
+
+    def test_create_requires_login(self, client):
+        """Test that anonymous clients cannot start uploads."""
+        response = _start(client)
+        assert response.status_code in [302, 401]
+
+    def test_create_validates_file(self, logged_in_client):
+        """Test that file type and declared size are checked up front."""
+        assert _start(logged_in_client, filename='notes.txt').status_code == 400
+
+        response = _start(logged_in_client, length=21 * 1024 * 1024)
+        assert response.status_code == 400
+        assert '20mb' in response.get_json()['error'].lower()
+
+        assert _start(logged_in_client, length=0).status_code == 400
+
+    def test_patch_advances_offset(self, logged_in_client):
+        """Test that PATCH appends at the offset and reports the new one."""
+        upload_id = _start(logged_in_client, length=10).get_json()['id']
+
+        response = _patch(logged_in_client, upload_id, 0, DATA[:5])
+        assert response.status_code == 204
+        assert response.headers['Upload-Offset'] == '5'
+
+        head = logged_in_client.head(f'/api/uploads/{upload_id}')
+        assert head.headers['Upload-Offset'] == '5'
+        assert head.headers['Upload-Length'] == '10'
+
+    def test_wrong_offset_conflicts(self, logged_in_client):
+        """Test that a PATCH at a stale offset is rejected with the current offset."""
+        upload_id = _start(logged_in_client, length=10).get_json()['id']
+        _patch(logged_in_client, upload_id, 0, DATA[:5])
+
+        response = _patch(logged_in_client, upload_id, 0, DATA[:5])
+        assert response.status_code == 409
+        assert response.headers['Upload-Offset'] == '5'
+
+    def test_chunk_past_length_rejected(self, logged_in_client):
+        """Test that a session never receives more than its declared length."""
+        upload_id = _start(logged_in_client, length=4).get_json()['id']
+
+        response = _patch(logged_in_client, upload_id, 0, DATA[:5])
+        assert response.status_code == 400
+
+    def test_delete_session(self, logged_in_client, app):
+        """Test that abandoning an upload removes its partial file."""
+        import app as app_module
+
+        upload_id = _start(logged_in_client).get_json()['id']
+        part = os.path.join(app_module.UPLOAD_FOLDER, '.incoming', f'{upload_id}.part')
+        assert os.path.exists(part)
+
+        assert logged_in_client.delete(f'/api/uploads/{upload_id}').status_code == 200
+        assert not os.path.exists(part)
+        assert logged_in_client.get(f'/api/uploads/{upload_id}').status_code == 404
+
+    def test_chunks_do_not_invalidate_cache(self, logged_in_client):
+        """Test that upload bookkeeping leaves the content generation alone."""
+        import models
+
+        before = models.get_content_generation()
+        _upload(logged_in_client, DATA)
+        assert models.get_content_generation() == before
+
+
+class TestFinalizeUploads:
+    """Test cases for turning finished uploads into albums and images."""
+
+    def test_create_album_from_uploads(self, logged_in_client):
+        """Test that an album can be created from upload session ids, in order."""
+        first = _upload(logged_in_client, PNG + b'first image', 'a.png')
+        second = _upload(logged_in_client, JPEG + b'second image', 'b.jpg')
+
+        response = logged_in_client.post('/api/community-images', data={
+            'title': 'Chunked',
+            'uploads': [first, second]
+        })
+
+        assert response.status_code == 200
+        images = response.get_json()['images']
+        assert images[0].endswith(hashlib.sha256(PNG + b'first image').hexdigest() + '.png')
+        assert images[1].endswith(hashlib.sha256(JPEG + b'second image').hexdigest() + '.jpg')
+        assert logged_in_client.get(f'/api/uploads/{first}').status_code == 404
+
+    def test_incomplete_upload_rejected(self, logged_in_client):
+        """Test that an album cannot use an upload still missing bytes."""
+        upload_id = _start(logged_in_client, length=10).get_json()['id']
+        _patch(logged_in_client, upload_id, 0, DATA[:5])
+
+        response = logged_in_client.post('/api/community-images', data={
+            'title': 'Too soon',
+            'uploads': [upload_id]
+        })
+
+        assert response.status_code == 400
+        assert 'incomplete' in response.get_json()['error']
+
+    def test_update_album_from_uploads(self, logged_in_client):
+        """Test replacing an album's images with uploaded sessions."""
+        created = logged_in_client.post('/api/community-images', data={
+            'title': 'Album',
+            'uploads': [_upload(logged_in_client, PNG + b'old image')]
+        }).get_json()
+
+        response = logged_in_client.put(f"/api/community-images/{created['id']}", data={
+            'title': 'Album',
+            'uploads': [_upload(logged_in_client, PNG + b'new image')]
+        })
+
+        assert response.status_code == 200
+        album = logged_in_client.get(f"/api/community-images/{created['id']}").get_json()
+        assert album['images'][0].endswith(hashlib.sha256(PNG + b'new image').hexdigest() + '.png')
+
+    def test_single_image_from_upload(self, logged_in_client):
+        """Test that /api/upload accepts a finished session instead of a file."""
+        upload_id = _upload(logged_in_client, PNG + b'single image')
+
+        response = logged_in_client.post('/api/upload', data={
+            'upload': upload_id,
+            'description': 'Chunked'
+        })
+
+        assert response.status_code == 200
+        assert response.get_json()['url'].startswith('/static/uploads/')
@@ -0,0 +1,123 @@
+"""
+Test cases for the /api/search full-text search endpoint.
+"""
+import io
+
+from tests.conftest import PNG
+
+
+def _create_post(client, title, content, published=True, **extra):
+    payload = {'title': title, 'content': content, 'published': published}
+    payload.update(extra)
+    return client.post('/api/text-posts', json=payload).get_json()['id']
+
+
+class TestSearch:
+    """Test cases for searching posts and albums."""
+
+    def test_search_requires_query(self, client):
+        """Test that an empty query is rejected."""
+        response = client.get('/api/search?q=')
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+
+    def test_search_finds_post_by_content(self, logged_in_client):
+        """Test that post bodies are searchable and highlighted."""
+        post_id = _create_post(logged_in_client, 'Tidal Tower', 'A lighthouse built from barnacles')
+
+        data = logged_in_client.get('/api/search?q=barnacles').get_json()
+        assert len(data['items']) == 1
+        result = data['items'][0]
+        assert result['type'] == 'post'
+        assert result['id'] == post_id
+        assert '<mark>barnacles</mark>' in result['snippet_html']
+
+    def test_search_prefix_matching(self, logged_in_client):
+        """Test that partial words match as prefixes."""
+        _create_post(logged_in_client, 'Mycelium Metro', 'Fungal transit networks')
+
+        data = logged_in_client.get('/api/search?q=myce').get_json()
+        assert len(data['items']) == 1
+        assert '<mark>Mycelium</mark>' in data['items'][0]['title_html']
+
+    def test_search_finds_tags_and_subtitle(self, logged_in_client):
+        """Test that tags and subtitle are indexed."""
+        _create_post(logged_in_client, 'Ice Archive', 'Frozen records',
+                     subtitle='Glacial memory', tags=['cryosphere'])
+
+        assert len(logged_in_client.get('/api/search?q=glacial').get_json()['items']) == 1
+        assert len(logged_in_client.get('/api/search?q=cryosphere').get_json()['items']) == 1
+
+    def test_title_match_ranks_first(self, logged_in_client):
+        """Test that bm25 weighting ranks title hits above body hits."""
+        body_id = _create_post(logged_in_client, 'Unrelated', 'Mentions lantern once')
+        title_id = _create_post(logged_in_client, 'Lantern', 'Something else entirely')
+
+        items = logged_in_client.get('/api/search?q=lantern').get_json()['items']
+        assert [item['id'] for item in items] == [title_id, body_id]
+
+    def test_search_finds_albums(self, logged_in_client):
+        """Test that community images are searchable."""
+        logged_in_client.post('/api/community-images', data={
+            'title': 'Storm Observatory',
+            'caption': 'Lightning studies',
+            'images': [(io.BytesIO(PNG + b'test image'), 'test.png')]
+        }, content_type='multipart/form-data')
+
+        items = logged_in_client.get('/api/search?q=lightning').get_json()['items']
+        assert len(items) == 1
+        assert items[0]['type'] == 'album'
+
+    def test_public_search_hides_drafts(self, client, logged_in_client):
+        """Test that unpublished posts are hidden from anonymous searches."""
+        _create_post(logged_in_client, 'Public cathedral', 'swamp', published=True)
+        _create_post(logged_in_client, 'Draft cathedral', 'swamp', published=False)
+
+        assert len(logged_in_client.get('/api/search?q=cathedral').get_json()['items']) == 2
+
+        logged_in_client.post('/api/logout')
+        items = client.get('/api/search?q=cathedral').get_json()['items']
+        assert len(items) == 1
+
+    def test_index_follows_updates_and_deletes(self, logged_in_client):
+        """Test that triggers keep the index in sync with writes."""
+        post_id = _create_post(logged_in_client, 'Cloud Farm', 'Harvesting vapour')
+
+        logged_in_client.put(f'/api/text-posts/{post_id}', json={
+            'title': 'Cloud Farm', 'content': 'Harvesting fog', 'published': True
+        })
+        assert logged_in_client.get('/api/search?q=vapour').get_json()['items'] == []
+        assert len(logged_in_client.get('/api/search?q=fog').get_json()['items']) == 1
+
+        logged_in_client.delete(f'/api/text-posts/{post_id}')
+        assert logged_in_client.get('/api/search?q=fog').get_json()['items'] == []
+
+    def test_search_pagination(self, logged_in_client):
+        """Test paging through search results with a cursor."""
+        for i in range(3):
+            _create_post(logged_in_client, f'Wind village {i}', 'turbines')
+
+        first = logged_in_client.get('/api/search?q=turbines&limit=2').get_json()
+        assert len(first['items']) == 2
+        second = logged_in_client.get(
+            f"/api/search?q=turbines&limit=2&cursor={first['next_cursor']}"
+        ).get_json()
+        assert len(second['items']) == 1
+        assert second['next_cursor'] is None
+
+        ids = {item['id'] for item in first['items'] + second['items']}
+        assert len(ids) == 3
+
+    def test_search_operators_are_literal(self, logged_in_client):
+        """Test that FTS5 syntax in the query cannot cause errors."""
+        _create_post(logged_in_client, 'Sound Space', 'echo')
+        response = logged_in_client.get('/api/search?q="NEAR(echo OR *')
+        assert response.status_code == 200
+
+    def test_snippet_is_html_escaped(self, logged_in_client):
+        """Test that stored markup is escaped in highlighted output."""
+        _create_post(logged_in_client, 'Markup', '<script>alert(1)</script> coral')
+
+        item = logged_in_client.get('/api/search?q=coral').get_json()['items'][0]
+        assert '<script>' not in item['snippet_html']
+        assert '&lt;script&gt;' in item['snippet_html']
@@ -0,0 +1,184 @@
+"""
+Test cases for the incremental static site export.
+"""
+import io
+import json
+import os
+
+import pytest
+
+from tests.conftest import PNG
+
+
+@pytest.fixture
+def export(app, tmp_path):
+    """Run an export into a scratch directory and return its report"""
+    import app as app_module
+    import site_export
+
+    def run(full=False):
+        return site_export.export_site(app, str(tmp_path), app_module.HTDOCS_FOLDER, full=full)
+
+    run.output = tmp_path
+    return run
+
+
+def _post(client, title, published=True):
+    return client.post('/api/text-posts', json={
+        'title': title, 'content': 'Words ' * 20, 'published': published
+    }).get_json()
+
+
+class TestExport:
+    """Test cases for what the export writes and removes."""
+
+    def test_writes_pages_and_json(self, logged_in_client, export):
+        """Test that listings, pages and published items are exported as the app serves them."""
+        post = _post(logged_in_client, 'Exported')
+        draft = _post(logged_in_client, 'Draft', published=False)
+        album = logged_in_client.post('/api/community-images', data={
+            'title': 'Album', 'images': [(io.BytesIO(PNG + b'image'), 'photo.png')]
+        }, content_type='multipart/form-data').get_json()
+
+        report = export()
+
+        output = export.output
+        assert report['failed'] == 0
+        assert b'Exported' in (output / 'index.html').read_bytes()
+        assert b'album-card' in (output / 'gallery.html').read_bytes()
+        assert b'Exported' in (output / 'writing' / 'exported.html').read_bytes()
+        assert not (output / 'writing' / 'draft.html').exists()
+        titles = [p['title'] for p in json.loads((output / 'api' / 'text-posts.json').read_bytes())]
+        assert titles == ['Exported']
+        assert (output / 'api' / 'text-posts.summary.json').exists()
+        assert (output / 'api' / 'text-posts' / f"{post['id']}.json").exists()
+        assert not (output / 'api' / 'text-posts' / f"{draft['id']}.json").exists()
+        assert (output / 'api' / 'community-images' / f"{album['id']}.json").exists()
+
+    def test_second_run_rebuilds_nothing(self, logged_in_client, export):
+        """Test that an unchanged site is left alone."""
+        _post(logged_in_client, 'Stable')
+        first = export()
+
+        second = export()
+
+        assert second['written'] == 0
+        assert second['unchanged'] == first['written']
+
+    def test_only_changed_rows_rebuilt(self, logged_in_client, export):
+        """Test that editing one post rebuilds it and the listings, not its neighbours."""
+        edited = _post(logged_in_client, 'Edited')
+        _post(logged_in_client, 'Untouched')
+        export()
+        logged_in_client.put(f"/api/text-posts/{edited['id']}", json={
+            'title': 'Edited again', 'content': 'Words ' * 20, 'published': True
+        })
+
+        report = export()
+
+        # The post itself, both post listings, the home page, its article
+        # and the other article, which links it under "More Writing"
+        assert report['written'] == 6
+        exported = json.loads((export.output / 'api' / 'text-posts' / f"{edited['id']}.json").read_bytes())
+        assert exported['title'] == 'Edited again'
+
+    def test_unpublished_and_deleted_removed(self, logged_in_client, export):
+        """Test that outputs of rows that are gone or unpublished are deleted."""
+        post = _post(logged_in_client, 'Short lived')
+        export()
+        path = export.output / 'api' / 'text-posts' / f"{post['id']}.json"
+        assert path.exists()
+
+        logged_in_client.delete(f"/api/text-posts/{post['id']}")
+        report = export()
+
+        # Its JSON and its article page
+        assert report['removed'] == 2
+        assert not path.exists()
+
+    def test_offloaded_pages_copied_from_htdocs(self, app, logged_in_client, export):
+        """Test that static offload does not leave empty pages in the export."""
+        import app as app_module
+
+        _post(logged_in_client, 'Offloaded')
+        original = app.config['STATIC_OFFLOAD']
+        app.config['STATIC_OFFLOAD'] = 'x-accel'
+        try:
+            report = export()
+        finally:
+            app.config['STATIC_OFFLOAD'] = original
+
+        assert report['failed'] == 0
+        with open(os.path.join(app_module.HTDOCS_FOLDER, 'writing.html'), 'rb') as f:
+            assert (export.output / 'writing.html').read_bytes() == f.read()
+        for path in export.output.rglob('*'):
+            if path.is_file() and not path.name.startswith('.'):
+                assert path.stat().st_size > 0, path
+
+    def test_output_paths(self):
+        """Test the URL to file mapping and that other query strings are refused."""
+        from site_export import output_path
+
+        assert output_path('/') == 'index.html'
+        assert output_path('/gallery') == 'gallery.html'
+        assert output_path('/api/text-posts/3') == 'api/text-posts/3.json'
+        assert output_path('/api/community-images?view=summary') == 'api/community-images.summary.json'
+        with pytest.raises(ValueError):
+            output_path('/api/text-posts?limit=5')
+
+
+class TestExportTriggers:
+    """Test cases for the on-write export job and the command."""
+
+    def test_write_queues_one_export(self, app, logged_in_client, tmp_path):
+        """Test that content writes queue a single delayed export when a folder is configured."""
+        import models
+
+        app.config['EXPORT_FOLDER'] = str(tmp_path)
+        try:
+            _post(logged_in_client, 'One')
+            _post(logged_in_client, 'Two')
+        finally:
+            app.config['EXPORT_FOLDER'] = None
+
+        with models.db_connection() as conn:
+            rows = conn.execute("SELECT payload FROM jobs WHERE kind = 'site-export'").fetchall()
+        assert [json.loads(row['payload']) for row in rows] == [{'output': str(tmp_path)}]
+
+    def test_finished_derivatives_queue_export(self, app, logged_in_client, tmp_path, monkeypatch):
+        """Test that variants recorded after the write's export still queue another one."""
+        import derivatives
+        import jobs
+        import models
+
+        monkeypatch.setattr(jobs, 'JOB_WORKER', 'external')
+        monkeypatch.setattr(derivatives, 'available_formats', lambda: ('webp',))
+        monkeypatch.setattr(derivatives, 'generate_derivatives',
+                            lambda store, source: [(320, 'webp', f'{source}-320w.webp', 1)])
+        logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(PNG + b'exported later'), 'photo.png')
+        }, content_type='multipart/form-data')
+        assert not models.has_queued_job('site-export')
+
+        app.config['EXPORT_FOLDER'] = str(tmp_path)
+        try:
+            assert jobs.run_pending() == 1
+        finally:
+            app.config['EXPORT_FOLDER'] = None
+
+        assert models.has_queued_job('site-export')
+
+    def test_no_export_folder_no_job(self, logged_in_client):
+        """Test that writes queue nothing when export is not configured."""
+        import models
+
+        _post(logged_in_client, 'Unexported')
+
+        assert not models.has_queued_job('site-export')
+
+    def test_command(self, app, tmp_path):
+        """Test that export-site writes to --output and reports counts."""
+        result = app.test_cli_runner().invoke(args=['export-site', '--output', str(tmp_path)])
+
+        assert 'written' in result.output
+        assert os.path.exists(tmp_path / 'index.html')
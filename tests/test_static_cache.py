@@ -0,0 +1,124 @@
+"""
+Test cases for the in-memory cache of htdocs files.
+"""
+import mmap
+import os
+
+from static_files import StaticFileCache
+
+
+def _write(path, data, mtime=None):
+    with open(path, 'wb') as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+class TestStaticFileCache:
+    """Test cases for loading, revalidating and evicting files."""
+
+    def test_hit_after_first_load(self, tmp_path):
+        """Test that an unchanged file is loaded once and then served from memory."""
+        cache = StaticFileCache()
+        path = _write(tmp_path / 'page.html', b'<p>hello</p>')
+
+        first = cache.get(path)
+        second = cache.get(path)
+
+        assert first is second
+        assert first.body == b'<p>hello</p>'
+        assert first.mimetype == 'text/html'
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_changed_file_reloaded(self, tmp_path):
+        """Test that a new mtime invalidates the entry and changes the ETag."""
+        cache = StaticFileCache()
+        path = _write(tmp_path / 'style.css', b'a{}', mtime=1000)
+        before = cache.get(path)
+
+        _write(path, b'b{}', mtime=2000)
+        after = cache.get(path)
+
+        assert after.body == b'b{}'
+        assert after.etag != before.etag
+        assert cache.stats()['stale'] == 1
+
+    def test_etag_is_content_hash(self, tmp_path):
+        """Test that identical content gets the same ETag wherever it lives."""
+        cache = StaticFileCache()
+        first = cache.get(_write(tmp_path / 'a.txt', b'same', mtime=1000))
+        second = cache.get(_write(tmp_path / 'b.txt', b'same', mtime=2000))
+
+        assert first.etag == second.etag
+
+    def test_large_files_are_mapped(self, tmp_path):
+        """Test that files above max_file_size are memory-mapped, not counted in bytes."""
+        cache = StaticFileCache(max_file_size=16)
+        entry = cache.get(_write(tmp_path / 'big.js', b'x' * 64))
+
+        assert isinstance(entry.body, mmap.mmap)
+        assert entry.body[:] == b'x' * 64
+        assert cache.stats()['mapped'] == 1
+        assert cache.stats()['bytes'] == 0
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test that the byte budget evicts the oldest entry first."""
+        cache = StaticFileCache(max_bytes=10)
+        a = _write(tmp_path / 'a.txt', b'aaaa')
+        b = _write(tmp_path / 'b.txt', b'bbbb')
+        c = _write(tmp_path / 'c.txt', b'cccc')
+
+        cache.get(a)
+        cache.get(b)
+        cache.get(a)
+        cache.get(c)
+
+        stats = cache.stats()
+        assert stats['evictions'] == 1
+        assert stats['bytes'] == 8
+        cache.get(a)
+        assert cache.stats()['hits'] == 2
+
+
+class TestStaticCacheRoutes:
+    """Test cases for conditional requests on htdocs routes."""
+
+    def test_etag_and_not_modified(self, client):
+        """Test that a matching If-None-Match gets an empty 304."""
+        first = client.get('/static/css/base.css')
+        etag = first.headers['ETag']
+
+        second = client.get('/static/css/base.css', headers={'If-None-Match': etag})
+
+        assert first.status_code == 200
+        assert first.headers['Cache-Control'] == 'no-cache'
+        assert second.status_code == 304
+        assert second.data == b''
+
+    def test_stale_etag_gets_body(self, client):
+        """Test that an outdated ETag is answered with the full file."""
+        response = client.get('/', headers={'If-None-Match': '"outdated"'})
+
+        assert response.status_code == 200
+        assert response.data
+
+    def test_error_page_from_cache(self, client):
+        """Test that 404.html keeps its status and carries no validators."""
+        import app as app_module
+
+        client.get('/no-such-page.html')
+        response = client.get('/no-such-page.html')
+
+        assert response.status_code == 404
+        assert 'ETag' not in response.headers
+        assert app_module.static_cache.stats()['hits'] >= 1
+
+    def test_stats_exposed(self, logged_in_client):
+        """Test that /api/stats reports the static cache counters."""
+        logged_in_client.get('/login')
+
+        stats = logged_in_client.get('/api/stats').get_json()['static_cache']
+
+        assert stats['entries'] >= 1
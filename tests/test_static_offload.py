@@ -0,0 +1,84 @@
+"""
+Test cases for offloading htdocs files to the front-end server.
+"""
+import os
+
+import pytest
+
+
+@pytest.fixture
+def offload(app):
+    """Set STATIC_OFFLOAD for one test"""
+    original = app.config['STATIC_OFFLOAD']
+
+    def set_mode(mode):
+        app.config['STATIC_OFFLOAD'] = mode
+
+    yield set_mode
+    app.config['STATIC_OFFLOAD'] = original
+
+
+class TestStaticOffload:
+    """Test cases for the sendfile, x-accel and x-sendfile modes."""
+
+    def test_sendfile_sends_body(self, client, offload):
+        """Test that the default mode returns the file itself."""
+        offload('sendfile')
+
+        response = client.get('/static/css/base.css')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/css'
+        assert b'fullscreen-image-container' in response.data
+        assert 'X-Accel-Redirect' not in response.headers
+
+    def test_x_accel_redirect(self, client, offload):
+        """Test that x-accel mode answers with an empty body and an internal redirect."""
+        offload('x-accel')
+
+        response = client.get('/writing.html')
+
+        assert response.status_code == 200
+        assert response.headers['X-Accel-Redirect'] == '/_htdocs/writing.html'
+        assert response.mimetype == 'text/html'
+        assert response.data == b''
+
+    def test_x_accel_quotes_path(self, client, offload):
+        """Test that nested paths are URL-quoted under the internal prefix."""
+        offload('x-accel')
+
+        response = client.get('/static/css/base.css')
+
+        assert response.headers['X-Accel-Redirect'] == '/_htdocs/static/css/base.css'
+
+    def test_x_sendfile(self, client, offload):
+        """Test that x-sendfile mode names the absolute file path."""
+        import app as app_module
+
+        offload('x-sendfile')
+
+        response = client.get('/login')
+
+        assert response.headers['X-Sendfile'] == os.path.join(app_module.HTDOCS_FOLDER, 'login.html')
+        assert response.data == b''
+
+    def test_error_pages_not_offloaded(self, client, offload):
+        """Test that 404 pages keep their status and body in every mode."""
+        for mode in ('x-accel', 'x-sendfile'):
+            offload(mode)
+
+            response = client.get('/no-such-page.html')
+
+            assert response.status_code == 404
+            assert 'X-Accel-Redirect' not in response.headers
+            assert 'X-Sendfile' not in response.headers
+            assert response.data
+
+    def test_traversal_rejected(self, client, offload):
+        """Test that paths escaping htdocs are not served or offloaded."""
+        offload('x-accel')
+
+        response = client.get('/..%2fapp.py')
+
+        assert response.status_code == 404
+        assert 'X-Accel-Redirect' not in response.headers
@@ -0,0 +1,209 @@
+"""
+Test cases for content-addressed upload storage and blob reference counting.
+"""
+import hashlib
+import io
+import os
+
+from tests.conftest import PNG
+
+
+def _upload_path(filename):
+    import app as app_module
+    return os.path.join(app_module.UPLOAD_FOLDER, filename)
+
+
+def _ref_count(filename):
+    import models
+    with models.db_connection() as conn:
+        row = conn.execute('SELECT ref_count FROM blobs WHERE filename = ?', (filename,)).fetchone()
+    return row['ref_count'] if row else None
+
+
+class TestContentAddressedStorage:
+    """Test cases for hashed, sharded file names."""
+
+    def test_upload_named_by_sha256(self, logged_in_client):
+        """Test that uploads are stored under a sharded SHA-256 path."""
+        data = PNG + b'hashed image bytes'
+        digest = hashlib.sha256(data).hexdigest()
+
+        response = logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(data), 'Photo.PNG')
+        }, content_type='multipart/form-data')
+
+        json_data = response.get_json()
+        assert json_data['file'] == f'{digest[:2]}/{digest[2:4]}/{digest}.png'
+        assert json_data['url'] == f'/static/uploads/{json_data["file"]}'
+        with open(_upload_path(json_data['file']), 'rb') as f:
+            assert f.read() == data
+
+    def test_reupload_reuses_blob(self, logged_in_client, create_album):
+        """Test that uploading the same bytes twice stores one file with two references."""
+        first = create_album(logged_in_client, 'First', [b'shared bytes'])
+        second = create_album(logged_in_client, 'Second', [b'shared bytes'])
+
+        filename = first['images'][0]
+        assert second['images'] == [filename]
+        assert _ref_count(filename) == 2
+
+        shard_dir = os.path.dirname(_upload_path(filename))
+        assert os.listdir(shard_dir) == [os.path.basename(filename)]
+
+    def test_jpeg_spellings_share_one_blob(self, logged_in_client):
+        """Test that .jpg, .jpeg and .JPG names for the same bytes store one file."""
+        data = b'\xff\xd8\xff\xe0 same jpeg bytes'
+        digest = hashlib.sha256(data).hexdigest()
+
+        stored = set()
+        for name in ('a.jpg', 'b.jpeg', 'C.JPG'):
+            response = logged_in_client.post('/api/upload', data={
+                'image': (io.BytesIO(data), name)
+            }, content_type='multipart/form-data')
+            stored.add(response.get_json()['file'])
+
+        assert stored == {f'{digest[:2]}/{digest[2:4]}/{digest}.jpg'}
+        assert _ref_count(stored.pop()) == 3
+
+    def test_no_temp_files_left_behind(self, logged_in_client, create_album):
+        """Test that spooled uploads are moved or removed."""
+        import storage
+
+        create_album(logged_in_client, 'Once', [b'same'])
+        create_album(logged_in_client, 'Twice', [b'same'])
+
+        incoming = _upload_path(storage.INCOMING_DIR)
+        assert os.listdir(incoming) == []
+
+    def test_path_cannot_escape_root(self, tmp_path):
+        """Test that stored names are confined to the upload root."""
+        import pytest
+        from storage import BlobStore
+
+        with pytest.raises(ValueError):
+            BlobStore(str(tmp_path)).path('../outside.png')
+
+
+class TestBlobReferenceCounting:
+    """Test cases for deleting files only when nothing references them."""
+
+    def test_shared_blob_survives_album_delete(self, logged_in_client, create_album):
+        """Test that deleting one album keeps a file another album still uses."""
+        first = create_album(logged_in_client, 'First', [b'shared', b'only first'])
+        second = create_album(logged_in_client, 'Second', [b'shared'])
+        shared, only_first = first['images']
+
+        logged_in_client.delete(f"/api/community-images/{first['id']}")
+
+        assert os.path.exists(_upload_path(shared))
+        assert _ref_count(shared) == 1
+        assert not os.path.exists(_upload_path(only_first))
+        assert _ref_count(only_first) is None
+
+        logged_in_client.delete(f"/api/community-images/{second['id']}")
+        assert not os.path.exists(_upload_path(shared))
+
+    def test_update_releases_replaced_files(self, logged_in_client, create_album):
+        """Test that replacing an album's files deletes only the unreferenced old ones."""
+        album = create_album(logged_in_client, 'Album', [b'old', b'kept'])
+        old, kept = album['images']
+
+        logged_in_client.put(f"/api/community-images/{album['id']}", data={
+            'title': 'Album',
+            'images': [(io.BytesIO(PNG + b'kept'), 'kept.png'), (io.BytesIO(PNG + b'new'), 'new.png')]
+        }, content_type='multipart/form-data')
+
+        assert not os.path.exists(_upload_path(old))
+        assert os.path.exists(_upload_path(kept))
+        assert _ref_count(kept) == 1
+
+    def test_images_table_holds_references(self, logged_in_client, create_album):
+        """Test that a single-image upload keeps an album's file alive."""
+        album = create_album(logged_in_client, 'Album', [b'both'])
+        logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(PNG + b'both'), 'both.png')
+        }, content_type='multipart/form-data')
+
+        logged_in_client.delete(f"/api/community-images/{album['id']}")
+
+        assert os.path.exists(_upload_path(album['images'][0]))
+
+    def test_missing_blob_rejects_reference(self, logged_in_client):
+        """Test that a write referencing a file removed from storage is rolled back."""
+        import pytest
+        import models
+        from app import get_blob_store
+
+        store = get_blob_store()
+        with pytest.raises(FileNotFoundError):
+            models.save_image_metadata('ab/cd/gone.png', '', require_files=store.require)
+        assert models.get_all_images() == []
+        assert _ref_count('ab/cd/gone.png') is None
+
+    def test_existing_references_backfilled(self, app):
+        """Test that init_db counts references held by rows written before the blobs table."""
+        import models
+
+        with models.db_connection() as conn:
+            for trigger in ('images_blob_ref', 'images_blob_unref',
+                            'community_image_files_blob_ref', 'community_image_files_blob_unref'):
+                conn.execute(f'DROP TRIGGER {trigger}')
+            conn.execute('DROP TABLE blobs')
+            conn.execute("INSERT INTO images (filename, description) VALUES ('img-1.png', '')")
+            conn.execute("INSERT INTO images (filename, description) VALUES ('img-1.png', '')")
+            conn.commit()
+
+        models.init_db()
+
+        assert _ref_count('img-1.png') == 2
+
+
+class TestConcurrentAlbumStorage:
+    """Test cases for hashing and writing album files on the I/O pool."""
+
+    def test_files_written_in_parallel(self, logged_in_client, monkeypatch, create_album):
+        """Test that album files are stored on several threads and keep their order."""
+        import threading
+        import time
+        from storage import BlobStore
+
+        threads = set()
+        original_save = BlobStore.save
+
+        def slow_save(self, stream, ext):
+            threads.add(threading.current_thread().name)
+            time.sleep(0.05)
+            return original_save(self, stream, ext)
+
+        monkeypatch.setattr(BlobStore, 'save', slow_save)
+        contents = [f'image {i}'.encode() for i in range(4)]
+        created = create_album(logged_in_client, 'Parallel', contents)
+
+        assert len(threads) > 1
+        assert created['images'] == [
+            BlobStore.relative_path(hashlib.sha256(PNG + data).hexdigest(), 'png') for data in contents
+        ]
+
+    def test_failure_removes_every_written_file(self, logged_in_client, monkeypatch):
+        """Test that one failing file leaves none of the album's new files behind."""
+        from storage import BlobStore
+
+        original_save = BlobStore.save
+
+        def failing_save(self, stream, ext):
+            data = stream.read()
+            if data == PNG + b'bad':
+                raise OSError('disk full')
+            return original_save(self, io.BytesIO(data), ext)
+
+        monkeypatch.setattr(BlobStore, 'save', failing_save)
+        response = logged_in_client.post('/api/community-images', data={
+            'title': 'Partial',
+            'images': [(io.BytesIO(PNG + b'good one'), 'a.png'), (io.BytesIO(PNG + b'bad'), 'b.png'),
+                       (io.BytesIO(PNG + b'good two'), 'c.png')]
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 500
+        for data in (b'good one', b'good two'):
+            digest = hashlib.sha256(PNG + data).hexdigest()
+            assert not os.path.exists(_upload_path(BlobStore.relative_path(digest, 'png')))
@@ -0,0 +1,180 @@
+"""
+Test cases for upload limits enforced while the request body is parsed.
+"""
+import io
+
+from werkzeug.test import EnvironBuilder
+
+from tests.conftest import PNG, GIF
+
+
+class CountingStream(io.BytesIO):
+    """Request body that remembers how much of it the app read"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+
+def _post_counting(client, path, data):
+    environ = EnvironBuilder(method='POST', data=data).get_environ()
+    body = environ['wsgi.input'].read()
+    stream = CountingStream(body)
+    response = client.post(path, input_stream=stream, content_length=len(body),
+                           content_type=environ['CONTENT_TYPE'])
+    return response, stream, len(body)
+
+
+class TestEarlyRejection:
+    """Test cases for aborting bad uploads before the body is fully read."""
+
+    def test_oversized_file_stops_reading(self, logged_in_client):
+        """Test that parsing stops soon after a file passes the 20MB limit."""
+        response, stream, total = _post_counting(logged_in_client, '/api/community-images', {
+            'title': 'Too big',
+            'images': [(io.BytesIO(PNG + b'x' * (21 * 1024 * 1024)), 'large.png'),
+                       (io.BytesIO(PNG + b'x' * (10 * 1024 * 1024)), 'second.png')]
+        })
+
+        assert response.status_code == 400
+        assert '20mb' in response.get_json()['error'].lower()
+        assert stream.consumed < 21 * 1024 * 1024
+        assert stream.consumed < total
+
+    def test_invalid_type_stops_reading(self, logged_in_client):
+        """Test that a disallowed extension is rejected when its part begins."""
+        response, stream, total = _post_counting(logged_in_client, '/api/community-images', {
+            'title': 'Wrong type',
+            'images': [(io.BytesIO(b'x' * (5 * 1024 * 1024)), 'notes.txt')]
+        })
+
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Invalid file type: notes.txt'
+        assert stream.consumed < total
+
+    def test_request_over_limit_not_read(self, logged_in_client):
+        """Test that a body larger than the endpoint allows gets 413 without being parsed."""
+        response, stream, total = _post_counting(logged_in_client, '/api/upload', {
+            'image': (io.BytesIO(PNG + b'x' * (22 * 1024 * 1024)), 'large.png')
+        })
+
+        assert response.status_code == 413
+        assert 'error' in response.get_json()
+        assert stream.consumed == 0
+
+    def test_single_upload_size_limit(self, logged_in_client):
+        """Test that /api/upload enforces the per-file limit."""
+        response = logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(PNG + b'x' * (20 * 1024 * 1024 + 1)), 'large.png')
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 400
+        assert '20mb' in response.get_json()['error'].lower()
+
+    def test_update_skips_invalid_types(self, logged_in_client):
+        """Test that album updates still ignore unsupported files."""
+        created = logged_in_client.post('/api/community-images', data={
+            'title': 'Album',
+            'images': [(io.BytesIO(PNG), 'a.png')]
+        }, content_type='multipart/form-data').get_json()
+
+        response = logged_in_client.put(f"/api/community-images/{created['id']}", data={
+            'title': 'Album',
+            'images': [(io.BytesIO(b'text'), 'notes.txt'), (io.BytesIO(GIF), 'b.gif')]
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 200
+        album = logged_in_client.get(f"/api/community-images/{created['id']}").get_json()
+        assert len(album['images']) == 1
+        assert album['images'][0].endswith('.gif')
+
+
+class TestMagicBytes:
+    """Test cases for checking file contents against their extension."""
+
+    def test_sniff_image_types(self):
+        """Test recognizing supported formats and known non-images."""
+        from streaming_upload import sniff_image_type
+
+        assert sniff_image_type(PNG) == 'png'
+        assert sniff_image_type(b'\xff\xd8\xff\xe0') == 'jpg'
+        assert sniff_image_type(GIF) == 'gif'
+        assert sniff_image_type(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == 'webp'
+        assert sniff_image_type(b'  <svg xmlns="http://www.w3.org/2000/svg">') == 'foreign'
+        assert sniff_image_type(b'%PDF-1.7') == 'foreign'
+        assert sniff_image_type(b'test image') is None
+
+    def test_matching_signature_accepted(self, logged_in_client):
+        """Test that real image bytes upload under their own extension."""
+        response = logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(b'\xff\xd8\xff\xe0' + b'\x00' * 32), 'photo.jpeg')
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 200
+
+    def test_mismatched_signature_rejected(self, logged_in_client):
+        """Test that a GIF named .png is rejected."""
+        response = logged_in_client.post('/api/community-images', data={
+            'title': 'Mislabelled',
+            'images': [(io.BytesIO(GIF), 'photo.png')]
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 400
+        assert 'does not match' in response.get_json()['error']
+
+    def test_markup_disguised_as_image_rejected(self, logged_in_client):
+        """Test that HTML uploaded with an image extension is rejected, even when short."""
+        response = logged_in_client.post('/api/upload', data={
+            'image': (io.BytesIO(b'<script>'), 'evil.png')
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 400
+
+    def test_resumable_upload_sniffs_first_chunk(self, logged_in_client):
+        """Test that the first PATCH of a resumable upload is checked too."""
+        upload_id = logged_in_client.post('/api/uploads', json={
+            'filename': 'photo.png', 'length': len(GIF)
+        }).get_json()['id']
+
+        response = logged_in_client.patch(f'/api/uploads/{upload_id}', data=GIF, headers={
+            'Upload-Offset': '0',
+            'Content-Type': 'application/offset+octet-stream'
+        })
+
+        assert response.status_code == 400
+        assert logged_in_client.head(f'/api/uploads/{upload_id}').headers['Upload-Offset'] == '0'
+
+    def test_unrecognized_bytes_rejected(self, logged_in_client):
+        """Test that text or arbitrary binary named as an image is rejected."""
+        for body in (b'just some text, not an image', b'\x00\x01\x02\x03' * 8, b'tiny'):
+            response = logged_in_client.post('/api/upload', data={
+                'image': (io.BytesIO(body), 'photo.png')
+            }, content_type='multipart/form-data')
+
+            assert response.status_code == 400
+
+    def test_signature_split_across_patches(self, logged_in_client):
+        """Test that a signature spread over small PATCHes is checked as a whole."""
+        def patch(upload_id, offset, data):
+            return logged_in_client.patch(f'/api/uploads/{upload_id}', data=data, headers={
+                'Upload-Offset': str(offset),
+                'Content-Type': 'application/offset+octet-stream'
+            })
+
+        body = PNG + b'\x00' * 24
+        good = logged_in_client.post('/api/uploads', json={
+            'filename': 'photo.png', 'length': len(body)
+        }).get_json()['id']
+        for offset in range(0, len(body), 3):
+            assert patch(good, offset, body[offset:offset + 3]).status_code == 204
+
+        bad = logged_in_client.post('/api/uploads', json={
+            'filename': 'photo.png', 'length': len(body)
+        }).get_json()['id']
+        assert patch(bad, 0, body[:3]).status_code == 204
+        assert patch(bad, 3, b'XYZ').status_code == 400
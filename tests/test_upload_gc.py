@@ -0,0 +1,210 @@
+"""
+Test cases for the incremental orphaned-upload garbage collector.
+"""
+import io
+import os
+import time
+
+import pytest
+
+from tests.conftest import PNG
+
+
+OLD = time.time() - 2 * 24 * 3600
+
+
+@pytest.fixture
+def store(app):
+    import app as app_module
+    return app_module.get_blob_store()
+
+
+def _orphan(store, data, ext='png', mtime=OLD):
+    """Store a file without any row referencing it"""
+    filename, _ = store.save(io.BytesIO(data), ext)
+    os.utime(store.path(filename), (mtime, mtime))
+    return filename
+
+
+def _write_flat(path):
+    """Write a file outside the shard layout"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'legacy')
+    os.utime(path, (OLD, OLD))
+
+
+def _referenced(client, store, data):
+    response = client.post('/api/upload', data={
+        'image': (io.BytesIO(PNG + data), 'photo.png')
+    }, content_type='multipart/form-data')
+    filename = response.get_json()['file']
+    os.utime(store.path(filename), (OLD, OLD))
+    return filename
+
+
+class TestCollect:
+    """Test cases for what a pass removes and keeps."""
+
+    def test_reclaims_only_unreferenced(self, logged_in_client, store):
+        """Test that orphans are deleted and counted while referenced files stay."""
+        import models
+        import upload_gc
+
+        orphan = _orphan(store, b'orphaned bytes')
+        kept = _referenced(logged_in_client, store, b'referenced bytes')
+
+        report = upload_gc.collect_batch(store)
+
+        assert report['reclaimed'] == [orphan]
+        assert report['pass_finished']
+        assert not store.exists(orphan)
+        assert store.exists(kept)
+        state = models.get_gc_state()
+        assert state['files_reclaimed'] == 1
+        assert state['bytes_reclaimed'] == len(b'orphaned bytes')
+        assert state['passes_completed'] == 1
+        assert state['cursor'] is None
+
+    def test_grace_period_protects_new_files(self, app, store):
+        """Test that a file still within the grace period is left alone."""
+        import upload_gc
+
+        fresh = _orphan(store, b'in flight', mtime=time.time())
+
+        upload_gc.collect_batch(store)
+
+        assert store.exists(fresh)
+
+    def test_dedup_refreshes_grace_period(self, app, store):
+        """Test that re-uploading existing content renews its mtime."""
+        filename = _orphan(store, b'same content')
+
+        store.save(io.BytesIO(b'same content'), 'png')
+
+        assert os.path.getmtime(store.path(filename)) > OLD + 3600
+
+    def test_hand_placed_files_untouched(self, app, store):
+        """Test that files the app did not name are never collected."""
+        import upload_gc
+
+        legacy = [os.path.join(store.root, 'writing', 'cover.jpg'),
+                  os.path.join(store.root, 'writing', 'img-1700000000-1234.png'),
+                  os.path.join(store.root, 'flat-upload.png')]
+        for path in legacy:
+            _write_flat(path)
+
+        upload_gc.collect_batch(store)
+
+        assert all(os.path.exists(path) for path in legacy)
+
+    def test_flat_app_uploads_collected(self, app, store):
+        """Test that unreferenced img-/community- uploads at the root are reclaimed."""
+        import models
+        import upload_gc
+
+        orphans = ['community-1700000000-4321.jpg', 'img-1700000000-1234.png',
+                   'img-1700000000-1234-320w.webp']
+        kept = 'img-1700000001-5678.png'
+        for name in orphans + [kept]:
+            _write_flat(os.path.join(store.root, name))
+        with models.db_connection() as conn:
+            conn.execute('INSERT INTO blobs (filename, ref_count) VALUES (?, 1)', (kept,))
+            conn.commit()
+
+        report = upload_gc.collect_batch(store)
+
+        assert report['reclaimed'] == sorted(orphans)
+        assert store.exists(kept)
+
+    def test_derivatives_follow_their_source(self, logged_in_client, store):
+        """Test that variants of a referenced image stay and stray variants go."""
+        import models
+        import upload_gc
+
+        source = _referenced(logged_in_client, store, b'with variants')
+        variant = f"{source.rsplit('.', 1)[0]}-320w.webp"
+        stray = f"{_orphan(store, b'gone').rsplit('.', 1)[0]}-320w.webp"
+        for name in (variant, stray):
+            with open(store.path(name), 'wb') as f:
+                f.write(b'webp')
+            os.utime(store.path(name), (OLD, OLD))
+        models.record_derivatives(source, [(320, 'webp', variant, 4)])
+
+        upload_gc.collect_batch(store)
+
+        assert store.exists(variant)
+        assert not store.exists(stray)
+
+    def test_incoming_leftovers(self, logged_in_client, store):
+        """Test that stale temp files go but parts of live upload sessions stay."""
+        import upload_gc
+
+        upload_id = logged_in_client.post('/api/uploads', json={
+            'filename': 'photo.png', 'length': 10
+        }).get_json()['id']
+        part = os.path.join(store.incoming_dir(), f'{upload_id}.part')
+        leftover = os.path.join(store.incoming_dir(), 'tmpabandoned')
+        open(leftover, 'wb').close()
+        for path in (part, leftover):
+            os.utime(path, (OLD, OLD))
+
+        upload_gc.collect_batch(store)
+
+        assert os.path.exists(part)
+        assert not os.path.exists(leftover)
+
+
+class TestIncremental:
+    """Test cases for batching, the persisted cursor and dry runs."""
+
+    def test_cursor_resumes_between_batches(self, app, store):
+        """Test that small batches walk the store across calls and then restart."""
+        import models
+        import upload_gc
+
+        orphans = sorted(_orphan(store, f'orphan {i}'.encode()) for i in range(3))
+
+        first = upload_gc.collect_batch(store, batch_size=2)
+        assert first['reclaimed'] == orphans[:2]
+        assert not first['pass_finished']
+        assert models.get_gc_state()['cursor'] == orphans[1]
+
+        second = upload_gc.collect_batch(store, batch_size=2)
+        assert second['reclaimed'] == orphans[2:]
+        assert second['pass_finished']
+        assert models.get_gc_state()['files_scanned'] == 3
+
+    def test_cursor_moves_from_shards_to_flat_files(self, app, store):
+        """Test that the walk continues with root-level uploads after the shards."""
+        import upload_gc
+
+        sharded = _orphan(store, b'sharded orphan')
+        flat = 'img-1700000000-1234.png'
+        _write_flat(os.path.join(store.root, flat))
+
+        assert upload_gc.collect_batch(store, batch_size=1)['reclaimed'] == [sharded]
+        assert upload_gc.collect_batch(store, batch_size=1)['reclaimed'] == [flat]
+        assert upload_gc.collect_batch(store, batch_size=1)['pass_finished']
+
+    def test_dry_run_command(self, app, store):
+        """Test that --dry-run lists orphans without deleting or moving the cursor."""
+        import models
+
+        orphan = _orphan(store, b'would go')
+
+        result = app.test_cli_runner().invoke(args=['gc-uploads', '--dry-run'])
+
+        assert f'Would remove {orphan}' in result.output
+        assert '8 bytes reclaimable' in result.output
+        assert store.exists(orphan)
+        assert models.get_gc_state()['files_scanned'] == 0
+
+    def test_command_reports_reclaimed_bytes(self, app, logged_in_client, store):
+        """Test that a full run reports totals and /api/stats exposes them."""
+        _orphan(store, b'1234')
+
+        result = app.test_cli_runner().invoke(args=['gc-uploads'])
+
+        assert 'reclaimed 1 (4 bytes)' in result.output
+        assert logged_in_client.get('/api/stats').get_json()['gc']['bytes_reclaimed'] == 4
@@ -0,0 +1,80 @@
+"""
+Test cases for the single-writer queue with group commit.
+"""
+import threading
+
+import pytest
+
+
+class TestWriteQueue:
+    """Test cases for funnelling mutations through the writer thread."""
+
+    def test_concurrent_writes_all_commit(self, app):
+        """Test that concurrent creates are all committed and acknowledged."""
+        import models
+
+        ids = []
+        errors = []
+        lock = threading.Lock()
+
+        def create(i):
+            try:
+                post_id = models.create_text_post(f'Post {i}', None, 'Body', None, [], 1, True)
+                with lock:
+                    ids.append(post_id)
+            except Exception as e:
+                errors.append(e)
+
+        before = models.get_write_queue_stats()
+        threads = [threading.Thread(target=create, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(set(ids)) == 20
+        assert len(models.get_all_text_posts()) == 20
+
+        after = models.get_write_queue_stats()
+        committed = after['committed_operations'] - before['committed_operations']
+        batches = after['batches'] - before['batches']
+        assert committed == 20
+        assert 1 <= batches <= 20
+
+    def test_failed_operation_is_isolated(self, app):
+        """Test that one failing mutation does not roll back its batch."""
+        import models
+
+        def bad_operation(conn):
+            conn.execute("INSERT INTO images (filename, description) VALUES ('x.png', '')")
+            raise RuntimeError('boom')
+
+        with pytest.raises(RuntimeError):
+            models._run_write(bad_operation)
+
+        models.save_image_metadata('good.png', '')
+        filenames = [row['filename'] for row in models.get_all_images()]
+        assert filenames == ['good.png']
+        assert models.get_write_queue_stats()['failed_operations'] >= 1
+
+    def test_direct_mode(self, app, monkeypatch):
+        """Test that writes still work with the queue disabled."""
+        import models
+
+        monkeypatch.setattr(models, 'WRITE_QUEUE_ENABLED', False)
+        before = models.get_write_queue_stats()['submitted']
+
+        post_id = models.create_text_post('Direct', None, 'Body', None, [], 1, True)
+
+        assert models.get_text_post_by_id(post_id)['title'] == 'Direct'
+        assert models.get_write_queue_stats()['submitted'] == before
+
+    def test_stats_endpoint_reports_queue(self, logged_in_client):
+        """Test that /api/stats includes write queue metrics."""
+        logged_in_client.post('/api/text-posts', json={'title': 'T', 'content': 'C'})
+
+        stats = logged_in_client.get('/api/stats').get_json()['write_queue']
+        for key in ('queue_depth', 'batches', 'committed_operations', 'commit_ms_avg', 'commit_ms_max'):
+            assert key in stats
+        assert stats['committed_operations'] >= 1
@@ -0,0 +1,225 @@
+"""
+Test cases for slug-routed /writing articles and the writing page import.
+"""
+import os
+import sqlite3
+
+import pytest
+
+
+CONTENT = 'First paragraph.\n\nSecond paragraph.'
+
+
+def _post(client, title, published=True, **fields):
+    return client.post('/api/text-posts', json={
+        'title': title, 'content': CONTENT, 'published': published, **fields
+    })
+
+
+def _slug(client, response):
+    return client.get(f"/api/text-posts/{response.get_json()['id']}").get_json()['slug']
+
+
+class TestSlugs:
+    """Test cases for text post slugs."""
+
+    def test_slug_generated_from_title(self, logged_in_client):
+        """Test that a post gets a lowercase ASCII slug from its title."""
+        response = _post(logged_in_client, 'Sound & Space: Café Acoustics')
+        assert _slug(logged_in_client, response) == 'sound-space-cafe-acoustics'
+
+    def test_duplicate_titles_get_suffix(self, logged_in_client):
+        """Test that a second post with the same title gets a numbered slug."""
+        first = _post(logged_in_client, 'Tidal Tower')
+        second = _post(logged_in_client, 'Tidal Tower')
+        assert _slug(logged_in_client, first) == 'tidal-tower'
+        assert _slug(logged_in_client, second) == 'tidal-tower-2'
+
+    def test_explicit_slug(self, logged_in_client):
+        """Test that a chosen slug is kept and can be changed later."""
+        response = _post(logged_in_client, 'Anything', slug='chosen-name')
+        assert _slug(logged_in_client, response) == 'chosen-name'
+
+        response = logged_in_client.put(f"/api/text-posts/{response.get_json()['id']}", json={
+            'title': 'Anything', 'content': CONTENT, 'slug': 'renamed'
+        })
+        assert response.status_code == 200
+        assert _slug(logged_in_client, response) == 'renamed'
+
+    def test_taken_or_malformed_slug_rejected(self, logged_in_client):
+        """Test that a slug in use or not in slug form is a 400."""
+        _post(logged_in_client, 'Ice Archive')
+
+        assert _post(logged_in_client, 'Other', slug='ice-archive').status_code == 400
+        assert _post(logged_in_client, 'Other', slug='Not A Slug').status_code == 400
+
+    def test_non_string_slug_rejected(self, logged_in_client):
+        """Test that a slug of the wrong JSON type is a 400, not a server error."""
+        response = _post(logged_in_client, 'Typed', slug=42)
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Slug must be a string'
+
+        post = _post(logged_in_client, 'Typed')
+        response = logged_in_client.put(f"/api/text-posts/{post.get_json()['id']}", json={
+            'title': 'Typed', 'content': CONTENT, 'slug': ['typed']
+        })
+        assert response.status_code == 400
+
+    def test_migration_backfills_slugs(self, app):
+        """Test that init_db adds and fills the slug column on an older database."""
+        import models
+        models.create_text_post('Old Post', '', 'Body', 'Essays', [], None, True)
+        with sqlite3.connect(models.DATABASE_PATH) as conn:
+            conn.execute('DROP INDEX idx_text_posts_slug')
+            conn.execute('ALTER TABLE text_posts DROP COLUMN slug')
+
+        models.init_db()
+
+        assert models.get_text_post_by_slug('old-post')['title'] == 'Old Post'
+
+
+class TestArticleRoute:
+    """Test cases for /writing/<slug>."""
+
+    def test_renders_published_post(self, logged_in_client, client):
+        """Test that a published post is rendered with its paragraphs."""
+        _post(logged_in_client, 'Lava Foundry', subtitle='Mount Etna slopes')
+        logged_in_client.post('/api/logout')
+
+        response = client.get('/writing/lava-foundry')
+
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        assert '<h1 class="article-title">Lava Foundry</h1>' in html
+        assert 'Mount Etna slopes' in html
+        assert '<p>First paragraph.</p>' in html
+        assert '<p>Second paragraph.</p>' in html
+
+    def test_content_is_escaped(self, logged_in_client):
+        """Test that post text cannot inject markup."""
+        _post(logged_in_client, '<script>alert(1)</script>', slug='escaped')
+
+        html = logged_in_client.get('/writing/escaped').get_data(as_text=True)
+
+        assert '<script>alert(1)</script>' not in html
+        assert '&lt;script&gt;' in html
+
+    def test_draft_hidden_from_visitors(self, logged_in_client, app):
+        """Test that an unpublished post is only visible to the admin."""
+        _post(logged_in_client, 'Secret Draft', published=False)
+        assert logged_in_client.get('/writing/secret-draft').status_code == 200
+
+        with app.app_context():
+            assert app.test_client().get('/writing/secret-draft').status_code == 404
+
+    def test_falls_back_to_legacy_page(self, client):
+        """Test that a slug with no post serves the hand-written page."""
+        response = client.get('/writing/cloud-farm')
+        assert response.status_code == 200
+        assert b'Cloud Farm' in response.data
+
+        assert client.get('/writing/no-such-article').status_code == 404
+
+    def test_html_suffix_still_resolves(self, logged_in_client, client):
+        """Test that /writing/<name>.html URLs reach the legacy page and the post."""
+        response = client.get('/writing/cloud-farm.html')
+        assert response.status_code == 200
+        assert b'Cloud Farm' in response.data
+
+        _post(logged_in_client, 'Suffixed')
+        assert b'<p>First paragraph.</p>' in logged_in_client.get('/writing/suffixed.html').data
+
+    def test_cached_until_next_write(self, logged_in_client):
+        """Test that a rendered article is reused until content changes."""
+        import app as app_module
+        post = _post(logged_in_client, 'Cached Article').get_json()
+
+        logged_in_client.get('/writing/cached-article')
+        hits = app_module.fragment_cache.stats()['hits']
+        logged_in_client.get('/writing/cached-article')
+        assert app_module.fragment_cache.stats()['hits'] == hits + 1
+
+        logged_in_client.put(f"/api/text-posts/{post['id']}", json={
+            'title': 'Retitled', 'content': CONTENT, 'published': True
+        })
+        assert b'Retitled' in logged_in_client.get('/writing/cached-article').data
+
+    def test_conditional_get(self, logged_in_client):
+        """Test that an unchanged article answers If-None-Match with 304."""
+        _post(logged_in_client, 'Conditional')
+        etag = logged_in_client.get('/writing/conditional').headers['ETag']
+
+        response = logged_in_client.get('/writing/conditional', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+
+    def test_related_posts_link_by_slug(self, logged_in_client):
+        """Test that "More Writing" links other published posts by slug."""
+        _post(logged_in_client, 'Main Article')
+        _post(logged_in_client, 'Other Article')
+
+        html = logged_in_client.get('/writing/main-article').get_data(as_text=True)
+
+        assert 'href="/writing/other-article"' in html
+
+
+class TestImport:
+    """Test cases for importing the hand-written writing pages."""
+
+    def test_parse_article(self):
+        """Test that a writing page's fields are read from its markup."""
+        import app as app_module
+        from writing_import import parse_article
+
+        path = os.path.join(app_module.HTDOCS_FOLDER, 'writing', 'cloud-farm.html')
+        with open(path, encoding='utf-8') as f:
+            article = parse_article(f.read())
+
+        assert article['title'] == 'Cloud Farm'
+        assert article['category'] == 'World Building'
+        assert 'World Building' in article['tags']
+        assert article['reading_time'] == 3
+        assert article['created_at'] == '2025-09-01 00:00:00'
+        assert len(article['content'].split('\n\n')) == 3
+
+    def test_parse_rejects_page_without_article(self):
+        """Test that a page with no article title or body is an error."""
+        from writing_import import parse_article
+
+        with pytest.raises(ValueError):
+            parse_article('<html><body><p>Not an article</p></body></html>')
+
+    def test_import_command_is_idempotent(self, app, runner):
+        """Test that the pages are imported once and re-runs skip them."""
+        import app as app_module
+        from models import get_all_text_posts, get_text_post_by_slug
+        pages = [name for name in os.listdir(os.path.join(app_module.HTDOCS_FOLDER, 'writing'))
+                 if name.endswith('.html')]
+
+        result = runner.invoke(args=['import-writing'])
+        assert result.exit_code == 0
+        assert f'{len(pages)} imported' in result.output
+        post = get_text_post_by_slug('lines-meet-light')
+        assert post['published'] and post['category'] == 'Essays'
+
+        result = runner.invoke(args=['import-writing'])
+        assert '0 imported' in result.output
+        assert len(get_all_text_posts()) == len(pages)
+
+    def test_dry_run_imports_nothing(self, app, runner):
+        """Test that --dry-run only lists the pages."""
+        from models import get_all_text_posts
+
+        result = runner.invoke(args=['import-writing', '--dry-run'])
+
+        assert 'Would import cloud-farm' in result.output
+        assert get_all_text_posts() == []
+
+    def test_imported_page_served_from_database(self, app, runner, client):
+        """Test that an imported slug is rendered from the template."""
+        runner.invoke(args=['import-writing'])
+
+        html = client.get('/writing/cloud-farm').get_data(as_text=True)
+
+        assert 'Cloud Farm' in html
+        assert 'More Writing' in html
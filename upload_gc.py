@@ -0,0 +1,161 @@
+"""
+Incremental garbage collection of orphaned uploads.
+
+Files can outlive their references: a crash between writing an upload and
+committing its row, a failed cleanup, or a release job that never ran. The
+collector walks the hash-sharded layout of the BlobStore in path order, then
+the flat uploads the app wrote before it (img-<epoch>-<nnnn>.<ext> and
+community-<epoch>-<nnnn>.<ext> at the root), a batch at a time, and removes
+files that no row references (blobs with a zero count and derivatives of
+such blobs). The position reached is kept in
+gc_state so each batch is short and later runs resume where the last one
+stopped; once the walk reaches the end, stale partial files in .incoming are
+swept and the next pass starts over.
+
+Files modified within the grace period are never touched, which covers
+uploads still between being written and having their row committed. Files
+with any other name or in other directories (hand-placed assets such as
+uploads/writing/) are never considered.
+"""
+import os
+import re
+import time
+
+import jobs
+from models import find_unreferenced_uploads, collect_unreferenced_uploads
+from models import get_gc_state, record_gc_progress, get_upload_session
+from storage import BlobStore
+
+BATCH_SIZE = 500
+GRACE_PERIOD = 60 * 60
+# Pause between batches of a background pass
+BATCH_DELAY = 1
+JOB_KIND = 'gc-uploads'
+
+# <sha256>.<ext> blobs and their <sha256>-<width>w.<ext> derivatives
+_STORED_NAME = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(-\d+w)?\.[a-z0-9]+$')
+# Flat names the app generated before content addressing, and their derivatives
+_LEGACY_NAME = re.compile(r'^(?:img|community)-\d+-\d{4}(-\d+w)?\.[a-z0-9]+$')
+
+
+def _iter_stored(store, after=None):
+    """Yield (relpath, size, mtime) for sharded files, then flat legacy ones.
+
+    Sharded paths contain a slash and flat names do not, so the cursor says
+    which of the two walks to resume.
+    """
+    if not after or '/' in after:
+        yield from store.iter_sharded(after=after)
+        after = None
+    yield from store.iter_flat(after=after)
+
+
+def _candidates(files, grace_period):
+    """Stored files old enough to be collected, as {relpath: size}"""
+    cutoff = time.time() - grace_period
+    return {relpath: size for relpath, size, mtime in files
+            if mtime < cutoff and (_STORED_NAME.match(relpath) or _LEGACY_NAME.match(relpath))}
+
+
+def _stale_incoming(store, grace_period):
+    """Partial files in .incoming past the grace period and not owned by a live upload session"""
+    cutoff = time.time() - grace_period
+    stale = []
+    for entry in os.scandir(store.incoming_dir()):
+        if not entry.is_file() or entry.stat().st_mtime >= cutoff:
+            continue
+        if entry.name.endswith('.part') and get_upload_session(entry.name[:-len('.part')]):
+            continue
+        stale.append(entry)
+    return stale
+
+
+def _sweep_incoming(store, grace_period):
+    """Remove stale .incoming files; returns (files, bytes) reclaimed"""
+    files = reclaimed = 0
+    for entry in _stale_incoming(store, grace_period):
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        files += 1
+        reclaimed += size
+    return files, reclaimed
+
+
+def collect_batch(store, batch_size=BATCH_SIZE, grace_period=GRACE_PERIOD):
+    """Scan the next batch_size stored files from the persisted cursor and reclaim orphans.
+
+    Returns a report dict: scanned, reclaimed (stored filenames removed),
+    files_reclaimed and bytes_reclaimed (including .incoming leftovers at the
+    end of a pass) and pass_finished.
+    """
+    state = get_gc_state()
+    files = []
+    for item in _iter_stored(store, after=state['cursor']):
+        files.append(item)
+        if len(files) == batch_size:
+            break
+    pass_finished = len(files) < batch_size
+
+    sizes = _candidates(files, grace_period)
+    reclaimed = collect_unreferenced_uploads(sizes, store.remove) if sizes else []
+    reclaimed_files = len(reclaimed)
+    reclaimed_bytes = sum(sizes[filename] for filename in reclaimed)
+    if pass_finished:
+        incoming_files, incoming_bytes = _sweep_incoming(store, grace_period)
+        reclaimed_files += incoming_files
+        reclaimed_bytes += incoming_bytes
+
+    cursor = None if pass_finished else files[-1][0]
+    record_gc_progress(cursor, len(files), reclaimed_files, reclaimed_bytes, pass_finished)
+    return {
+        'scanned': len(files),
+        'reclaimed': reclaimed,
+        'files_reclaimed': reclaimed_files,
+        'bytes_reclaimed': reclaimed_bytes,
+        'pass_finished': pass_finished,
+    }
+
+
+def dry_run(store, grace_period=GRACE_PERIOD, batch_size=BATCH_SIZE):
+    """Report what a full pass would reclaim without deleting anything or moving the cursor"""
+    orphans = []
+    scanned = total_bytes = 0
+    batch = []
+
+    def flush():
+        nonlocal total_bytes
+        sizes = _candidates(batch, grace_period)
+        for filename in find_unreferenced_uploads(sizes):
+            orphans.append((filename, sizes[filename]))
+            total_bytes += sizes[filename]
+        batch.clear()
+
+    for item in _iter_stored(store):
+        scanned += 1
+        batch.append(item)
+        if len(batch) == batch_size:
+            flush()
+    flush()
+
+    for entry in _stale_incoming(store, grace_period):
+        size = entry.stat().st_size
+        orphans.append((f'{os.path.basename(store.incoming_dir())}/{entry.name}', size))
+        total_bytes += size
+    return {'scanned': scanned, 'orphans': orphans, 'bytes': total_bytes}
+
+
+@jobs.handler(JOB_KIND)
+def _run_job(payload):
+    report = collect_batch(BlobStore(payload['root']), payload.get('batch_size', BATCH_SIZE),
+                           payload.get('grace_period', GRACE_PERIOD))
+    if not report['pass_finished']:
+        jobs.enqueue(JOB_KIND, [payload], delay=BATCH_DELAY)
+
+
+def schedule(store, batch_size=BATCH_SIZE, grace_period=GRACE_PERIOD):
+    """Run one pass in the background, one batch per job"""
+    jobs.enqueue(JOB_KIND, [{'root': store.root, 'batch_size': batch_size,
+                             'grace_period': grace_period}])
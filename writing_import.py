@@ -0,0 +1,154 @@
+"""
+Import the hand-written htdocs/writing pages as text posts.
+
+Each page becomes a post whose slug is the file name, so the
+/writing/<slug> links in writing.html keep working once the page is served
+from the database. Title, subtitle, date, reading time, tags and the
+article paragraphs are read from the page's markup; posts whose slug
+already exists are skipped, so the import can be re-run.
+
+The pages' image prompt and hero-upload sidebar have no text_posts
+counterpart and are not imported.
+"""
+import os
+import re
+from html.parser import HTMLParser
+
+from models import create_text_post, get_text_post_by_slug
+
+# Tag that files a page under writing.html's "World Building" filter;
+# everything else is an essay
+WORLD_BUILDING_TAG = 'World Building'
+
+# Elements without an end tag, which must not be pushed on the nesting stack
+_VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                  'source', 'track', 'wbr'}
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_READING_TIME_RE = re.compile(r'^(\d+) min read$')
+
+
+class _ArticleParser(HTMLParser):
+    """Collect the text of the article's marked-up parts"""
+
+    # class attribute -> field, for elements whose whole text is one value
+    _FIELDS = {'article-title': 'title', 'article-subtitle': 'subtitle'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = {}
+        self.meta = []
+        self.tags = []
+        self.paragraphs = []
+        self._stack = []
+        self._capture = None
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_ELEMENTS:
+            return
+        classes = (dict(attrs).get('class') or '').split()
+        self._stack.append(classes)
+        if self._capture is not None:
+            return
+        field = next((self._FIELDS[c] for c in classes if c in self._FIELDS), None)
+        if field:
+            self._start(field)
+        elif tag == 'span' and 'tag' in classes and self._inside('article-tags'):
+            self._start('tag')
+        elif tag == 'span' and self._inside('article-meta', depth=1):
+            self._start('meta')
+        elif tag == 'p' and self._inside('article-content'):
+            self._start('paragraph')
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/>, <img/>: nothing to nest
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_ELEMENTS or not self._stack:
+            return
+        self._stack.pop()
+        if self._capture is not None and len(self._stack) == self._capture_depth:
+            self._finish()
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._text.append(data)
+
+    def _inside(self, cls, depth=None):
+        parents = self._stack[:-1]
+        if depth is not None:
+            parents = parents[-depth:]
+        return any(cls in classes for classes in parents)
+
+    def _start(self, kind):
+        self._capture = kind
+        self._capture_depth = len(self._stack) - 1
+        self._text = []
+
+    def _finish(self):
+        text = ''.join(self._text).strip()
+        kind, self._capture = self._capture, None
+        if not text:
+            return
+        if kind == 'tag':
+            self.tags.append(text)
+        elif kind == 'meta':
+            self.meta.append(text)
+        elif kind == 'paragraph':
+            self.paragraphs.append(text)
+        else:
+            self.fields.setdefault(kind, text)
+
+
+def parse_article(html):
+    """Post fields from a writing page; raises ValueError if it has no title or body"""
+    parser = _ArticleParser()
+    parser.feed(html)
+    parser.close()
+    if 'title' not in parser.fields or not parser.paragraphs:
+        raise ValueError('Page has no article title or content')
+
+    created_at = reading_time = None
+    for item in parser.meta:
+        if _DATE_RE.match(item):
+            created_at = f'{item} 00:00:00'
+        match = _READING_TIME_RE.match(item)
+        if match:
+            reading_time = int(match.group(1))
+    return {
+        'title': parser.fields['title'],
+        'subtitle': parser.fields.get('subtitle', ''),
+        'content': '\n\n'.join(parser.paragraphs),
+        'category': WORLD_BUILDING_TAG if WORLD_BUILDING_TAG in parser.tags else 'Essays',
+        'tags': parser.tags,
+        'reading_time': reading_time,
+        'created_at': created_at,
+    }
+
+
+def import_directory(directory, published=True, dry_run=False):
+    """Create a post for each page in directory whose slug is not taken yet.
+
+    Returns (imported, skipped, failed) lists of (slug, detail) pairs.
+    """
+    imported, skipped, failed = [], [], []
+    for name in sorted(os.listdir(directory)):
+        slug, ext = os.path.splitext(name)
+        if ext != '.html':
+            continue
+        if get_text_post_by_slug(slug):
+            skipped.append((slug, 'slug exists'))
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                article = parse_article(f.read())
+            if not dry_run:
+                create_text_post(article['title'], article['subtitle'], article['content'],
+                                 article['category'], article['tags'], article['reading_time'],
+                                 published, slug=slug, created_at=article['created_at'])
+        except (OSError, ValueError) as e:
+            failed.append((slug, str(e)))
+            continue
+        imported.append((slug, article['title']))
+    return imported, skipped, failed